@@ -1,6 +1,18 @@
 from __future__ import division
 
+import json
+import os
+
 from . import der, ecdsa
+from .ellipticcurve import FixedBaseTable
+
+# directory the generator tables are saved to and loaded from, so that they
+# are built once rather than in every process; None keeps them in memory only
+table_dir = None
+
+def set_table_dir(path):
+    global table_dir
+    table_dir = path
 
 class UnknownCurveError(Exception):
     pass
@@ -21,6 +33,51 @@ class Curve:
         self.signature_length = 2*self.baselen
         self.oid = oid
         self.encoded_oid = der.encode_oid(*oid)
+        self._generator_table = None
+
+    # bits of the scalar handled by each row of the generator table
+    TABLE_WINDOW = 6
+
+    def generator_table(self):
+        """Return the FixedBaseTable of the generator, used for key generation
+        and signing. It is built on first use, or loaded from table_dir (and
+        saved there once built)."""
+        if self._generator_table is None:
+            table = self._load_table()
+            if table is None:
+                table = FixedBaseTable(self.generator, self.TABLE_WINDOW)
+                self._save_table(table)
+            self._generator_table = table
+        return self._generator_table
+
+    def _table_file(self):
+        return os.path.join(table_dir, "%s-w%d.json" % (self.name, self.TABLE_WINDOW))
+
+    def _load_table(self):
+        if not table_dir:
+            return None
+        try:
+            with open(self._table_file()) as f:
+                saved = json.load(f)
+            if saved["curve"] != self.name:
+                return None
+            return FixedBaseTable(self.generator, self.TABLE_WINDOW, saved["rows"])
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            # missing, unreadable or stale table: build it again
+            return None
+
+    def _save_table(self, table):
+        if not table_dir:
+            return
+        file_name = self._table_file()
+        try:
+            with open(file_name + ".tmp", "w") as f:
+                json.dump({"curve": self.name, "rows": table.to_list()}, f)
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            os.rename(file_name + ".tmp", file_name)
+        except (IOError, OSError):
+            pass
 
 NIST192p = Curve("NIST192p", ecdsa.curve_192, ecdsa.generator_192,
                  (1, 2, 840, 10045, 3, 1, 1), "prime192v1")
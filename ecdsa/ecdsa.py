@@ -84,7 +84,7 @@ class Public_key( object ):
     n = generator.order()
     if not n:
       raise RuntimeError("Generator point must have order.")
-    if not n * point == ellipticcurve.INFINITY:
+    if not n * ellipticcurve.PointJacobi.from_affine( point ) == ellipticcurve.INFINITY:
       raise RuntimeError("Generator point order is bad.")
     if point.x() < 0 or n <= point.x() or point.y() < 0 or n <= point.y():
       raise RuntimeError("Generator point has x or y out of range.")
@@ -106,7 +106,7 @@ class Public_key( object ):
     c = numbertheory.inverse_mod( s, n )
     u1 = ( hash * c ) % n
     u2 = ( r * c ) % n
-    xy = u1 * G + u2 * self.point
+    xy = ellipticcurve.multi_scalar_mul( [ ( G, u1 ), ( self.point, u2 ) ] )
     v = xy.x() % n
     return v == r
 
@@ -116,13 +116,15 @@ class Private_key( object ):
   """Private key for ECDSA.
   """
 
-  def __init__( self, public_key, secret_multiplier ):
+  def __init__( self, public_key, secret_multiplier, generator_table = None ):
     """public_key is of class Public_key;
-    secret_multiplier is a large integer.
+    secret_multiplier is a large integer;
+    generator_table (optional) is a FixedBaseTable of the generator.
     """
 
     self.public_key = public_key
     self.secret_multiplier = secret_multiplier
+    self.generator_table = generator_table
 
   def sign( self, hash, random_k ):
     """Return a signature for the provided hash, using the provided
@@ -142,7 +144,10 @@ class Private_key( object ):
     G = self.public_key.generator
     n = G.order()
     k = random_k % n
-    p1 = k * G
+    if self.generator_table:
+      p1 = self.generator_table.multiply( k )
+    else:
+      p1 = k * ellipticcurve.PointJacobi.from_affine( G )
     r = p1.x()
     if r == 0: raise RuntimeError("amazingly unlucky random number r")
     s = ( numbertheory.inverse_mod( k, n ) * \
@@ -198,7 +203,7 @@ def point_is_valid( generator, x, y ):
     return False
   if not curve.contains_point( x, y ):
     return False
-  if not n*ellipticcurve.Point( curve, x, y ) == \
+  if not n*ellipticcurve.PointJacobi( curve, x, y, 1 ) == \
      ellipticcurve.INFINITY:
     return False
   return True
@@ -75,6 +75,9 @@ class Point( object ):
 
   def __eq__( self, other ):
     """Return True if the points are identical, False otherwise."""
+    if not isinstance( other, Point ):
+      # lets PointJacobi.__eq__ handle mixed comparisons
+      return NotImplemented
     if self.__curve == other.__curve \
        and self.__x == other.__x \
        and self.__y == other.__y:
@@ -82,6 +85,12 @@ class Point( object ):
     else:
       return False
 
+  def __ne__( self, other ):
+    result = self.__eq__( other )
+    if result is NotImplemented:
+      return result
+    return not result
+
   def __add__( self, other ):
     """Add one point to another point."""
 
@@ -181,6 +190,415 @@ class Point( object ):
 # This one point is the Point At Infinity for all purposes:
 INFINITY = Point( None, None, None )
 
+
+class PointJacobi( object ):
+  """A point on an elliptic curve in Jacobian coordinates: (x, y, z) stands
+     for the affine point (x/z^2, y/z^3), and z == 0 for the point at
+     infinity. Additions and doublings need no modular inversion; the
+     single inversion is paid when the affine coordinates are read."""
+  def __init__( self, curve, x, y, z, order = None ):
+    """curve, x, y, z, order; order (optional) is the order of this point."""
+    self.__curve = curve
+    self.__x = x
+    self.__y = y
+    self.__z = z
+    self.__order = order
+
+  @staticmethod
+  def from_affine( point ):
+    """Return the Jacobian form of an affine Point."""
+    if point == INFINITY:
+      return PointJacobi( None, 0, 1, 0 )
+    return PointJacobi( point.curve(), point.x(), point.y(), 1, point.order() )
+
+  def __affine( self ):
+    """Return the affine (x, y) coordinates, None for the point at infinity."""
+    if not self.__z:
+      return None
+    if self.__z == 1:
+      return self.__x, self.__y
+    p = self.__curve.p()
+    z_inv = numbertheory.inverse_mod( self.__z, p )
+    zz_inv = z_inv * z_inv % p
+    return self.__x * zz_inv % p, self.__y * zz_inv * z_inv % p
+
+  def to_affine( self ):
+    """Return the equivalent affine Point (INFINITY for the point at infinity)."""
+    xy = self.__affine()
+    if xy is None:
+      return INFINITY
+    return Point( self.__curve, xy[0], xy[1] )
+
+  def __eq__( self, other ):
+    """Return True if the points are the same point, False otherwise."""
+    if isinstance( other, Point ):
+      other = PointJacobi.from_affine( other )
+    if not self.__z or not other.__z:
+      return not self.__z and not other.__z
+    if self.__curve != other.__curve:
+      return False
+    p = self.__curve.p()
+    zz1 = self.__z * self.__z % p
+    zz2 = other.__z * other.__z % p
+    return ( self.__x * zz2 - other.__x * zz1 ) % p == 0 \
+       and ( self.__y * zz2 * other.__z - other.__y * zz1 * self.__z ) % p == 0
+
+  def __ne__( self, other ):
+    return not self == other
+
+  @staticmethod
+  def _double( X1, Y1, Z1, p, a ):
+    """Double a point given as Jacobian coordinates (dbl-2007-bl)."""
+    if not Y1 or not Z1:
+      return 0, 1, 0
+    XX = X1 * X1 % p
+    YY = Y1 * Y1 % p
+    YYYY = YY * YY % p
+    ZZ = Z1 * Z1 % p
+    S = 2 * ( ( X1 + YY ) * ( X1 + YY ) - XX - YYYY ) % p
+    M = ( 3 * XX + a * ZZ * ZZ ) % p
+    X3 = ( M * M - 2 * S ) % p
+    Y3 = ( M * ( S - X3 ) - 8 * YYYY ) % p
+    Z3 = 2 * Y1 * Z1 % p
+    return X3, Y3, Z3
+
+  @staticmethod
+  def _add( X1, Y1, Z1, X2, Y2, Z2, p, a ):
+    """Add two points given as Jacobian coordinates (add-1998-cmo-2);
+       the multiplications by Z2 are skipped when Z2 == 1 (mixed addition)."""
+    if not Z1:
+      return X2, Y2, Z2
+    if not Z2:
+      return X1, Y1, Z1
+    Z1Z1 = Z1 * Z1 % p
+    if Z2 == 1:
+      U1, S1 = X1, Y1
+    else:
+      Z2Z2 = Z2 * Z2 % p
+      U1 = X1 * Z2Z2 % p
+      S1 = Y1 * Z2 * Z2Z2 % p
+    H = ( X2 * Z1Z1 - U1 ) % p
+    r = ( Y2 * Z1 * Z1Z1 - S1 ) % p
+    if not H:
+      if not r:
+        return PointJacobi._double( X1, Y1, Z1, p, a )
+      return 0, 1, 0
+    HH = H * H % p
+    HHH = H * HH % p
+    V = U1 * HH % p
+    X3 = ( r * r - HHH - 2 * V ) % p
+    Y3 = ( r * ( V - X3 ) - S1 * HHH ) % p
+    Z3 = Z1 * H % p
+    if Z2 != 1:
+      Z3 = Z3 * Z2 % p
+    return X3, Y3, Z3
+
+  def __add__( self, other ):
+    """Add one point (Jacobian or affine) to another point."""
+    if isinstance( other, Point ):
+      other = PointJacobi.from_affine( other )
+    if not other.__z: return self
+    if not self.__z: return other
+    assert self.__curve == other.__curve
+    p = self.__curve.p()
+    X3, Y3, Z3 = self._add( self.__x, self.__y, self.__z,
+                            other.__x, other.__y, other.__z,
+                            p, self.__curve.a() )
+    return PointJacobi( self.__curve, X3, Y3, Z3 )
+
+  def __radd__( self, other ):
+    return self + other
+
+  def __mul__( self, other ):
+    """Multiply a point by an integer."""
+    e = other
+    if self.__order: e = e % self.__order
+    if e == 0 or not self.__z:
+      return PointJacobi( self.__curve, 0, 1, 0 )
+    assert e > 0
+
+    # the additions are mixed: this point is made affine once, up front
+    x, y = self.__affine()
+    p = self.__curve.p()
+    a = self.__curve.a()
+    negative_y = -y % p
+    _double = self._double
+    _add = self._add
+
+    # From X9.62 D.3.2, as in Point.__mul__:
+
+    e3 = 3 * e
+    i = 1 << ( e3.bit_length() - 2 )
+    X3, Y3, Z3 = x, y, 1
+    while i > 1:
+      X3, Y3, Z3 = _double( X3, Y3, Z3, p, a )
+      if ( e3 & i ) != 0 and ( e & i ) == 0:
+        X3, Y3, Z3 = _add( X3, Y3, Z3, x, y, 1, p, a )
+      if ( e3 & i ) == 0 and ( e & i ) != 0:
+        X3, Y3, Z3 = _add( X3, Y3, Z3, x, negative_y, 1, p, a )
+      i = i // 2
+
+    return PointJacobi( self.__curve, X3, Y3, Z3, self.__order )
+
+  def __rmul__( self, other ):
+    """Multiply a point by an integer."""
+
+    return self * other
+
+  def __str__( self ):
+    return str( self.to_affine() )
+
+  def double( self ):
+    """Return a new point that is twice the old."""
+    if not self.__z:
+      return self
+    X3, Y3, Z3 = self._double( self.__x, self.__y, self.__z,
+                               self.__curve.p(), self.__curve.a() )
+    return PointJacobi( self.__curve, X3, Y3, Z3, self.__order )
+
+  def x( self ):
+    """Return the affine x coordinate (None for the point at infinity)."""
+    xy = self.__affine()
+    return xy[0] if xy else None
+
+  def x_matches( self, r, n ):
+    """Is the affine x coordinate congruent to r modulo n? Checked as
+       X == x * Z^2 for every candidate x, without an inversion (ECDSA
+       verification only needs x mod n)."""
+    if not self.__z:
+      return False
+    p = self.__curve.p()
+    zz = self.__z * self.__z % p
+    x = r % n
+    while x < p:
+      if ( self.__x - x * zz ) % p == 0:
+        return True
+      x += n
+    return False
+
+  def y( self ):
+    """Return the affine y coordinate (None for the point at infinity)."""
+    xy = self.__affine()
+    return xy[1] if xy else None
+
+  def curve( self ):
+    return self.__curve
+
+  def order( self ):
+    return self.__order
+
+def _to_affine_many( points, p ):
+  """Affine (x, y) of a list of Jacobian (X, Y, Z) triples, with a single
+     inversion (Montgomery's trick); None for the points at infinity."""
+  products = []
+  product = 1
+  for X, Y, Z in points:
+    if Z:
+      product = product * Z % p
+    products.append( product )
+  product_inv = numbertheory.inverse_mod( product, p )
+  affine = [ None ] * len( points )
+  for i in range( len( points ) - 1, -1, -1 ):
+    X, Y, Z = points[ i ]
+    if not Z:
+      continue
+    z_inv = product_inv * products[ i - 1 ] % p if i else product_inv
+    product_inv = product_inv * Z % p
+    zz_inv = z_inv * z_inv % p
+    affine[ i ] = ( X * zz_inv % p, Y * zz_inv * z_inv % p )
+  return affine
+
+
+def wnaf( k, width ):
+  """Width-w non-adjacent form of k >= 0, least significant digit first:
+     every digit is 0 or odd with |d| < 2^(width-1), and no two of any
+     width consecutive digits are non-zero."""
+  digits = []
+  half = 1 << ( width - 1 )
+  mask = ( 1 << width ) - 1
+  while k:
+    if k & 1:
+      d = k & mask
+      if d >= half:
+        d -= mask + 1
+      k -= d
+    else:
+      d = 0
+    digits.append( d )
+    k >>= 1
+  return digits
+
+
+def odd_multiples( point, width = 4 ):
+  """Affine (x, y) of P, 3P, 5P ... (2^(width-1) - 1)P for an affine point P,
+     as used by multi_scalar_mul (None for the multiples at infinity)."""
+  curve = point.curve()
+  p = curve.p()
+  a = curve.a()
+  x, y = point.x(), point.y()
+  X2, Y2, Z2 = PointJacobi._double( x, y, 1, p, a )
+  multiples = [ ( x, y, 1 ) ]
+  for i in range( ( 1 << ( width - 2 ) ) - 1 ):
+    X, Y, Z = multiples[ -1 ]
+    multiples.append( PointJacobi._add( X2, Y2, Z2, X, Y, Z, p, a ) )
+  return _to_affine_many( multiples, p )
+
+
+def multi_scalar_mul( pairs, width = 4, multiples = None ):
+  """Return the sum of k * point for the (point, k) pairs as a PointJacobi.
+
+     Straus' interleaving (Shamir's trick): every scalar is written in wNAF
+     and all of them share one chain of doublings, so u1 * G + u2 * Q costs
+     about as many doublings as a single multiplication. Each point gets a
+     small table of its odd multiples, made affine for mixed additions;
+     multiples (optional) lists tables from odd_multiples() computed
+     earlier, one per pair (or None), for points used over and over."""
+  curve = None
+  order = None
+  tables = []
+  for n, ( point, k ) in enumerate( pairs ):
+    if isinstance( point, PointJacobi ):
+      point = point.to_affine()
+    if point == INFINITY:
+      continue
+    if point.order():
+      k = k % point.order()
+      order = point.order()
+    if not k:
+      continue
+    curve = point.curve()
+    if multiples and multiples[ n ]:
+      tables.append( ( wnaf( k, width ), multiples[ n ] ) )
+    else:
+      tables.append( ( wnaf( k, width ), odd_multiples( point, width ) ) )
+  if not tables:
+    return PointJacobi( curve, 0, 1, 0 )
+
+  p = curve.p()
+  a = curve.a()
+  _double = PointJacobi._double
+  _add = PointJacobi._add
+  X3, Y3, Z3 = 0, 1, 0
+  for i in range( max( len( digits ) for digits, multiples in tables ) - 1, -1, -1 ):
+    X3, Y3, Z3 = _double( X3, Y3, Z3, p, a )
+    for digits, multiples in tables:
+      if i >= len( digits ) or not digits[ i ]:
+        continue
+      d = digits[ i ]
+      xy = multiples[ abs( d ) // 2 ]
+      if xy is None:
+        continue
+      if d > 0:
+        X3, Y3, Z3 = _add( X3, Y3, Z3, xy[ 0 ], xy[ 1 ], 1, p, a )
+      else:
+        X3, Y3, Z3 = _add( X3, Y3, Z3, xy[ 0 ], -xy[ 1 ] % p, 1, p, a )
+  return PointJacobi( curve, X3, Y3, Z3, order )
+
+
+class FixedBaseTable( object ):
+  """Precomputed multiples of a fixed point (a curve generator) for fast
+     scalar multiplication: row i holds j * 2^(window*i) * point for
+     j = 1 .. 2^window - 1, in affine coordinates, so point * k costs one
+     mixed addition per window of k and no doublings. The order of the
+     point must be known and much larger than 2^window."""
+  def __init__( self, point, window = 6, rows = None ):
+    """point, window, rows; rows (optional) are the rows of a table built
+       earlier, as returned by to_list()."""
+    assert point.order()
+    self.__curve = point.curve()
+    self.__order = point.order()
+    self.window = window
+    self.rows_needed = ( self.__order.bit_length() + window - 1 ) // window
+    if rows is None:
+      self.__rows = self.__build( point.x(), point.y() )
+    else:
+      self.__rows = self.__from_list( point, rows )
+
+  def __build( self, x, y ):
+    p = self.__curve.p()
+    a = self.__curve.a()
+    size = 1 << self.window
+    rows = []
+    for i in range( self.rows_needed ):
+      points = []
+      X3, Y3, Z3 = 0, 1, 0
+      for j in range( 1, size ):
+        X3, Y3, Z3 = PointJacobi._add( X3, Y3, Z3, x, y, 1, p, a )
+        points.append( ( X3, Y3, Z3 ) )
+      # all the points of a row are made affine with one inversion
+      row = [ None ] + _to_affine_many( points, p )
+      rows.append( row )
+      # the next row starts at 2^window times this one
+      x, y = row[ size // 2 ]
+      X3, Y3, Z3 = PointJacobi._double( x, y, 1, p, a )
+      next_base = PointJacobi( self.__curve, X3, Y3, Z3 ).to_affine()
+      x, y = next_base.x(), next_base.y()
+    return rows
+
+  def __from_list( self, point, rows ):
+    """Check and unpack rows saved by to_list(); raises ValueError if they
+       do not belong to this point and window. The row bases are
+       recomputed and every other entry is checked to be the previous one
+       plus the row base, with the affine addition formulas multiplied
+       out so that no inversions are needed."""
+    if len( rows ) != self.rows_needed:
+      raise ValueError( "wrong number of rows" )
+    size = 1 << self.window
+    p = self.__curve.p()
+    a = self.__curve.a()
+    x, y = point.x(), point.y()
+    unpacked = []
+    for flat in rows:
+      if len( flat ) != 2 * ( size - 1 ):
+        raise ValueError( "wrong row length" )
+      row = [ None ] + list( zip( flat[ 0::2 ], flat[ 1::2 ] ) )
+      if row[ 1 ] != ( x, y ):
+        raise ValueError( "row does not start at the expected multiple" )
+      for j in range( 1, size - 1 ):
+        x1, y1 = row[ j ]
+        x3, y3 = row[ j + 1 ]
+        if j == 1:
+          # 2 * base, slope ( 3 x^2 + a ) / 2 y
+          num = ( 3 * x * x + a ) % p
+          den = 2 * y % p
+        else:
+          # row[ j ] + base, slope ( y - y1 ) / ( x - x1 )
+          num = ( y - y1 ) % p
+          den = ( x - x1 ) % p
+        if not den \
+           or ( x3 + x1 + x ) * den * den % p != num * num % p \
+           or ( y3 + y1 ) * den % p != num * ( x1 - x3 ) % p:
+          raise ValueError( "row entry is not the previous one plus the row base" )
+      unpacked.append( row )
+      x, y = row[ size // 2 ]
+      X3, Y3, Z3 = PointJacobi._double( x, y, 1, p, a )
+      next_base = PointJacobi( self.__curve, X3, Y3, Z3 ).to_affine()
+      x, y = next_base.x(), next_base.y()
+    return unpacked
+
+  def to_list( self ):
+    """Return the rows as lists of integers x1, y1, x2, y2... (for saving)."""
+    return [ [ c for xy in row[ 1: ] for c in xy ] for row in self.__rows ]
+
+  def multiply( self, k ):
+    """Return point * k as a PointJacobi."""
+    k = k % self.__order
+    p = self.__curve.p()
+    a = self.__curve.a()
+    mask = ( 1 << self.window ) - 1
+    _add = PointJacobi._add
+    X3, Y3, Z3 = 0, 1, 0
+    for row in self.__rows:
+      if not k:
+        break
+      digit = k & mask
+      if digit:
+        x, y = row[ digit ]
+        X3, Y3, Z3 = _add( X3, Y3, Z3, x, y, 1, p, a )
+      k >>= self.window
+    return PointJacobi( self.__curve, X3, Y3, Z3, self.__order )
+
+
 def __main__():
 
   class FailedTest(Exception): pass
@@ -1,6 +1,8 @@
 import binascii
 
 from . import ecdsa
+from . import ellipticcurve
+from . import numbertheory
 from . import der
 from . import rfc6979
 from .curves import NIST192p, find_curve
@@ -112,6 +114,87 @@ class VerifyingKey:
             return True
         raise BadSignatureError
 
+    # multiples of the public point for verify_batch, computed once per key
+    _point_multiples = None
+    _point_table = None
+
+    def _odd_multiples(self):
+        if self._point_multiples is None:
+            self._point_multiples = ellipticcurve.odd_multiples(self.pubkey.point)
+        return self._point_multiples
+
+    def _fixed_base_table(self):
+        if self._point_table is None:
+            point = self.pubkey.point
+            self._point_table = ellipticcurve.FixedBaseTable(
+                ellipticcurve.Point(point.curve(), point.x(), point.y(), self.curve.order),
+                BATCH_TABLE_WINDOW)
+        return self._point_table
+
+# signatures by the same key in one verify_batch call above which the key's
+# point gets its own fixed-base table (cheaper than wNAF from about 8 on)
+BATCH_TABLE_MIN = 16
+
+# window of those tables: smaller than the generator's, they are built per key
+BATCH_TABLE_WINDOW = 4
+
+def verify_batch(items, sigdecode=sigdecode_string):
+    """Verify many (VerifyingKey, signature, digest) triples at once.
+
+    Returns a list with one boolean per triple, so that the bad signatures
+    are pinpointed; a signature that cannot be decoded counts as bad.
+    Rather than verifying each triple from scratch, the work is shared:
+    the s values of a curve are inverted together (one modular inversion),
+    u1 * G comes from the curve's generator table, the odd multiples of
+    each public key are computed once per key, and x(R) is compared with r
+    without converting R to affine coordinates."""
+    results = [False] * len(items)
+    pending = {}    # curve order -> [(index, key, r, s, number)]
+    for i, (vk, signature, digest) in enumerate(items):
+        if len(digest) > vk.curve.baselen:
+            raise BadDigestError("this curve (%s) is too short "
+                                 "for your digest (%d)" % (vk.curve.name,
+                                                           8*len(digest)))
+        n = vk.pubkey.order
+        try:
+            r, s = sigdecode(signature, n)
+        except (AssertionError, ValueError, der.UnexpectedDER):
+            continue
+        if 1 <= r < n and 1 <= s < n:
+            pending.setdefault(n, []).append((i, vk, r, s,
+                                              string_to_number(digest)))
+
+    # keys with many signatures get a fixed-base table of their point, like
+    # the generator's; the others go through wNAF with cached odd multiples
+    counts = {}
+    for group in pending.values():
+        for i, vk, r, s, number in group:
+            counts[id(vk)] = counts.get(id(vk), 0) + 1
+
+    for n, group in pending.items():
+        # inverses of all the s values with a single inversion
+        products = []
+        product = 1
+        for i, vk, r, s, number in group:
+            product = product * s % n
+            products.append(product)
+        product_inv = numbertheory.inverse_mod(product, n)
+        for j in range(len(group) - 1, -1, -1):
+            i, vk, r, s, number = group[j]
+            c = product_inv * products[j - 1] % n if j else product_inv
+            product_inv = product_inv * s % n
+            u1 = number * c % n
+            u2 = r * c % n
+            if counts[id(vk)] >= BATCH_TABLE_MIN or vk._point_table is not None:
+                xy = vk.curve.generator_table().multiply(u1) + \
+                     vk._fixed_base_table().multiply(u2)
+            else:
+                xy = vk.curve.generator_table().multiply(u1) + \
+                     ellipticcurve.multi_scalar_mul([(vk.pubkey.point, u2)],
+                                                    multiples=[vk._odd_multiples()])
+            results[i] = xy.x_matches(r, n)
+    return results
+
 class SigningKey:
     def __init__(self, _error__please_use_generate=None):
         if not _error__please_use_generate:
@@ -135,12 +218,13 @@ class SigningKey:
         self.baselen = curve.baselen
         n = curve.order
         assert 1 <= secexp < n
-        pubkey_point = curve.generator*secexp
+        generator_table = curve.generator_table()
+        pubkey_point = generator_table.multiply(secexp).to_affine()
         pubkey = ecdsa.Public_key(curve.generator, pubkey_point)
         pubkey.order = n
         self.verifying_key = VerifyingKey.from_public_point(pubkey_point, curve,
                                                             hashfunc)
-        self.privkey = ecdsa.Private_key(pubkey, secexp)
+        self.privkey = ecdsa.Private_key(pubkey, secexp, generator_table)
         self.privkey.order = n
         return self
 
@@ -4,21 +4,27 @@ import unittest
 import os
 import time
 import shutil
+import tempfile
 import subprocess
 from binascii import hexlify, unhexlify
 from hashlib import sha1, sha256, sha512
 
 from .six import b, print_, binary_type
 from .keys import SigningKey, VerifyingKey
-from .keys import BadSignatureError
+from .keys import BadSignatureError, BadDigestError, verify_batch
 from . import util
 from .util import sigencode_der, sigencode_strings
-from .util import sigdecode_der, sigdecode_strings
+from .util import sigdecode_der, sigdecode_strings, sigdecode_string
 from .curves import Curve, UnknownCurveError
+from . import curves
+from . import ecdsa
 from .curves import NIST192p, NIST224p, NIST256p, NIST384p, NIST521p, SECP256k1
-from .ellipticcurve import Point
+from .ellipticcurve import Point, PointJacobi, CurveFp, INFINITY
+from .ellipticcurve import FixedBaseTable, multi_scalar_mul, wnaf
 from . import der
+from . import keys
 from . import rfc6979
+from . import numbertheory
 
 class SubprocessError(Exception):
     pass
@@ -657,6 +663,291 @@ class RFC6979(unittest.TestCase):
             hash_func = sha512,
             expected = int("16200813020EC986863BEDFC1B121F605C1215645018AEA1A7B215A564DE9EB1B38A67AA1128B80CE391C4FB71187654AAA3431027BFC7F395766CA988C964DC56D", 16))
 
+class Jacobi(unittest.TestCase):
+    def test_add_double(self):
+        # X9.62 B.3 examples
+        c = CurveFp(23, 1, 1)
+        p1 = PointJacobi.from_affine(Point(c, 3, 10))
+        p2 = Point(c, 9, 7)
+        self.assertEqual((p1 + p2).to_affine(), Point(c, 17, 20))
+        self.assertEqual((p1 + p1).to_affine(), Point(c, 7, 12))
+        self.assertEqual(p1.double().to_affine(), Point(c, 7, 12))
+        self.assertEqual(p1 + Point(c, 3, 13), INFINITY)
+
+    def test_multiply_small_curve(self):
+        c = CurveFp(23, 1, 1)
+        g = Point(c, 13, 7, 7)
+        check = INFINITY
+        for i in range(7 + 1):
+            self.assertEqual(i * PointJacobi.from_affine(g), check)
+            self.assertEqual((i * PointJacobi.from_affine(g)).to_affine(), check)
+            check = check + g
+
+    def test_multiply_matches_affine(self):
+        for curve in [NIST192p, NIST256p, NIST521p, SECP256k1]:
+            g = curve.generator
+            jg = PointJacobi.from_affine(g)
+            for k in [1, 2, 3, curve.order - 1,
+                      util.randrange(curve.order), util.randrange(curve.order)]:
+                expected = g * k
+                result = jg * k
+                self.assertEqual(result, expected)
+                self.assertEqual((result.x(), result.y()),
+                                 (expected.x(), expected.y()))
+            self.assertEqual(jg * curve.order, INFINITY)
+
+    def test_sum_matches_affine(self):
+        g = NIST256p.generator
+        jg = PointJacobi.from_affine(g)
+        a, b = util.randrange(NIST256p.order), util.randrange(NIST256p.order)
+        self.assertEqual((jg * a + jg * b).to_affine(), g * a + g * b)
+        self.assertEqual(jg * a + jg * (NIST256p.order - a), INFINITY)
+
+    def test_compare_with_affine(self):
+        g = NIST256p.generator
+        jg = PointJacobi.from_affine(g) * 3
+        g3 = g * 3
+        self.assertTrue(jg == g3)
+        self.assertTrue(g3 == jg)
+        self.assertFalse(jg != g3)
+        self.assertFalse(g3 != jg)
+        self.assertTrue(g != jg)
+        self.assertTrue(jg != g)
+        self.assertFalse(jg == g)
+        self.assertFalse(g == jg)
+        self.assertTrue(INFINITY == jg * NIST256p.order)
+        self.assertTrue(jg * NIST256p.order == INFINITY)
+        self.assertTrue(INFINITY != jg)
+
+class MultiScalar(unittest.TestCase):
+    def test_wnaf(self):
+        for width in range(2, 7):
+            for k in [0, 1, 2, 7, 2**64 - 1, util.randrange(NIST521p.order)]:
+                digits = wnaf(k, width)
+                self.assertEqual(sum(d << i for i, d in enumerate(digits)), k)
+                for i, d in enumerate(digits):
+                    self.assertTrue(d == 0 or (d % 2 == 1 and abs(d) < 2**(width-1)))
+                    if d:
+                        self.assertEqual(digits[i+1:i+width], [0] * len(digits[i+1:i+width]))
+
+    def test_small_curve(self):
+        # every combination on the X9.62 curve of order 7
+        c = CurveFp(23, 1, 1)
+        g = Point(c, 13, 7, 7)
+        q = Point(c, 13, 7) * 3
+        for u1 in range(8):
+            for u2 in range(8):
+                self.assertEqual(multi_scalar_mul([(g, u1), (q, u2)]),
+                                 u1 * g + u2 * q)
+
+    def test_matches_separate(self):
+        for curve in [NIST192p, NIST256p, SECP256k1]:
+            g = curve.generator
+            n = curve.order
+            q = g * util.randrange(n)
+            for u1, u2 in [(1, 1), (0, 5), (5, 0), (0, 0), (n - 1, 1),
+                           (util.randrange(n), util.randrange(n)),
+                           (util.randrange(n), util.randrange(n))]:
+                expected = u1 * g + u2 * q
+                result = multi_scalar_mul([(g, u1), (q, u2)])
+                self.assertEqual(result, expected)
+                self.assertEqual(result.to_affine(), expected)
+            # u1 * G + u2 * Q with Q = G and Q = -G
+            minus_g = Point(g.curve(), g.x(), -g.y() % g.curve().p())
+            self.assertEqual(multi_scalar_mul([(g, 3), (g, 4)]), g * 7)
+            self.assertEqual(multi_scalar_mul([(g, 3), (minus_g, 3)]), INFINITY)
+
+    def test_matches_separate_jacobi(self):
+        for curve in [NIST224p, NIST384p, NIST521p]:
+            jg = PointJacobi.from_affine(curve.generator)
+            q = (jg * util.randrange(curve.order)).to_affine()
+            u1, u2 = util.randrange(curve.order), util.randrange(curve.order)
+            self.assertEqual(multi_scalar_mul([(curve.generator, u1), (q, u2)]),
+                             jg * u1 + PointJacobi.from_affine(q) * u2)
+
+    def test_verifies_matches_separate(self):
+        for curve in [NIST192p, NIST256p, SECP256k1]:
+            sk = SigningKey.generate(curve=curve)
+            vk = sk.get_verifying_key()
+            pubkey = vk.pubkey
+            n = curve.order
+            for i in range(4):
+                digest = util.randrange(n)
+                signature = sk.privkey.sign(digest, util.randrange(n))
+                for h, sig in [(digest, signature),
+                               (digest + 1, signature),
+                               (digest, ecdsa.Signature(signature.r, signature.s + 1))]:
+                    c = numbertheory.inverse_mod(sig.s, n)
+                    xy = (h * c % n) * curve.generator + (sig.r * c % n) * pubkey.point
+                    self.assertEqual(pubkey.verifies(h, sig), xy.x() % n == sig.r)
+            sig = sk.sign(b("data"))
+            self.assertTrue(vk.verify(sig, b("data")))
+            self.assertRaises(BadSignatureError, vk.verify, sig, b("other data"))
+
+class GeneratorTable(unittest.TestCase):
+    def test_multiply_matches_jacobi(self):
+        for curve in [NIST192p, NIST224p, NIST256p, NIST384p, NIST521p, SECP256k1]:
+            table = curve.generator_table()
+            jg = PointJacobi.from_affine(curve.generator)
+            for k in [1, 2, curve.order - 1, curve.order + 5,
+                      util.randrange(curve.order)]:
+                self.assertEqual(table.multiply(k), jg * k)
+            self.assertEqual(table.multiply(0), INFINITY)
+            self.assertEqual(table.multiply(curve.order), INFINITY)
+
+    def test_persisted(self):
+        tmpdir = tempfile.mkdtemp()
+        def fresh_curve():
+            return Curve(NIST192p.name, NIST192p.curve, NIST192p.generator,
+                         NIST192p.oid)
+        try:
+            curves.set_table_dir(tmpdir)
+            built = fresh_curve().generator_table()
+            file_name = fresh_curve()._table_file()
+            self.assertTrue(os.path.exists(file_name))
+            loaded = fresh_curve()._load_table()
+            self.assertEqual(loaded.to_list(), built.to_list())
+            # a table that does not belong to the generator is rebuilt
+            rows = built.to_list()
+            rows[0][2] += 1
+            self.assertRaises(ValueError, FixedBaseTable, NIST192p.generator,
+                              built.window, rows)
+            # so is one with entries that are on the curve but out of place
+            rows = built.to_list()
+            rows[1][8:12] = rows[1][10:12] + rows[1][8:10]
+            self.assertRaises(ValueError, FixedBaseTable, NIST192p.generator,
+                              built.window, rows)
+            rows = built.to_list()
+            g5 = NIST192p.generator * 5
+            rows[2][-2:] = [g5.x(), g5.y()]
+            self.assertRaises(ValueError, FixedBaseTable, NIST192p.generator,
+                              built.window, rows)
+            with open(file_name, "w") as f:
+                f.write("{}")
+            self.assertEqual(fresh_curve()._load_table(), None)
+            self.assertEqual(fresh_curve().generator_table().to_list(),
+                             built.to_list())
+        finally:
+            curves.set_table_dir(None)
+            shutil.rmtree(tmpdir)
+
+    def test_speed(self):
+        # keygen and signing throughput with and without the generator table
+        if not BENCH:
+            return
+        print_()
+        for curve in (NIST192p, NIST224p, NIST256p, NIST384p, NIST521p):
+            start = time.time()
+            table = FixedBaseTable(curve.generator, Curve.TABLE_WINDOW)
+            build_time = time.time() - start
+            jg = PointJacobi.from_affine(curve.generator)
+            secexps = [util.randrange(curve.order) for i in range(20)]
+            start = time.time()
+            for secexp in secexps:
+                (jg * secexp).to_affine()
+            keygen_plain = len(secexps) / (time.time() - start)
+            start = time.time()
+            for secexp in secexps:
+                table.multiply(secexp).to_affine()
+            keygen_table = len(secexps) / (time.time() - start)
+            pub = ecdsa.Public_key(curve.generator, table.multiply(secexps[0]).to_affine())
+            plain_key = ecdsa.Private_key(pub, secexps[0])
+            table_key = ecdsa.Private_key(pub, secexps[0], table)
+            start = time.time()
+            for k in secexps:
+                plain_key.sign(12345, k)
+            sign_plain = len(secexps) / (time.time() - start)
+            start = time.time()
+            for k in secexps:
+                table_key.sign(12345, k)
+            sign_table = len(secexps) / (time.time() - start)
+            print_("%s: table build=%0.3fs, keygen=%d/s -> %d/s, sign=%d/s -> %d/s" \
+                  % (curve.name, build_time, keygen_plain, keygen_table,
+                     sign_plain, sign_table))
+
+class BatchVerify(unittest.TestCase):
+    def _individual(self, items, sigdecode=sigdecode_string):
+        results = []
+        for vk, sig, digest in items:
+            try:
+                results.append(vk.verify_digest(sig, digest, sigdecode))
+            except (BadSignatureError, AssertionError, der.UnexpectedDER):
+                results.append(False)
+        return results
+
+    def test_matches_individual(self):
+        items = []
+        for curve in [NIST192p, NIST256p, SECP256k1]:
+            for key in range(2):
+                sk = SigningKey.generate(curve=curve)
+                vk = sk.get_verifying_key()
+                for i in range(3):
+                    digest = sha1(b("message %d" % i)).digest()
+                    sig = sk.sign_digest(digest)
+                    r, s = sigdecode_string(sig, curve.order)
+                    items.append((vk, sig, digest))
+                    items.append((vk, sig, sha1(b("other")).digest()))
+                    items.append((vk, util.sigencode_string(r, s + 1, curve.order), digest))
+                items.append((vk, util.sigencode_string(0, s, curve.order), digest))
+                items.append((vk, sig[:-1], digest))
+        results = verify_batch(items)
+        self.assertEqual(results, self._individual(items))
+        self.assertEqual(results.count(True), 3 * 2 * 3)
+
+    def test_many_by_one_key(self):
+        # enough signatures for the key to get its own fixed-base table
+        sk = SigningKey.generate(curve=SECP256k1)
+        vk = sk.get_verifying_key()
+        items = []
+        for i in range(keys.BATCH_TABLE_MIN + 4):
+            digest = sha1(b("message %d" % i)).digest()
+            sig = sk.sign_digest(digest)
+            if i % 5 == 0:
+                digest = sha1(b("tampered %d" % i)).digest()
+            items.append((vk, sig, digest))
+        results = verify_batch(items)
+        self.assertEqual(results, self._individual(items))
+        self.assertEqual(results.count(False), 4)
+
+    def test_der(self):
+        sk = SigningKey.generate(curve=NIST256p)
+        vk = sk.get_verifying_key()
+        digest = sha1(b("data")).digest()
+        sig = sk.sign_digest(digest, sigencode=sigencode_der)
+        items = [(vk, sig, digest), (vk, sig + b("junk"), digest),
+                 (vk, sig, sha1(b("more data")).digest())]
+        self.assertEqual(verify_batch(items, sigdecode_der), [True, False, False])
+
+    def test_empty_and_bad_digest(self):
+        self.assertEqual(verify_batch([]), [])
+        sk = SigningKey.generate()
+        vk = sk.get_verifying_key()
+        self.assertRaises(BadDigestError, verify_batch,
+                          [(vk, sk.sign(b("data")), sha512(b("data")).digest())])
+
+    def test_speed(self):
+        # throughput of verify_batch against one verify_digest per signature
+        if not BENCH:
+            return
+        print_()
+        signing_keys = [SigningKey.generate(curve=NIST256p) for i in range(10)]
+        signed = []
+        for i in range(10000):
+            sk = signing_keys[i % len(signing_keys)]
+            digest = sha1(b("message %d" % i)).digest()
+            signed.append((sk.get_verifying_key(), sk.sign_digest(digest), digest))
+        for count in (1, 100, 10000):
+            items = signed[:count]
+            start = time.time()
+            for vk, sig, digest in items:
+                vk.verify_digest(sig, digest)
+            single = count / (time.time() - start)
+            start = time.time()
+            self.assertTrue(all(verify_batch(items)))
+            batch = count / (time.time() - start)
+            print_("NIST256p, %d signatures: verify=%d/s, verify_batch=%d/s" \
+                  % (count, single, batch))
+
 def __main__():
     unittest.main()
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+# *************************************************************************
+# * FEA command line runner                                               *
+# *                                                                       *
+# * Runs the email, credit card and bitcoin validations of the Autopsy    *
+# * report modules on exported keyword hits, outside Autopsy, and writes  *
+# * the same CSV/XLS/text reports. Timings are printed for each stage.    *
+# *                                                                       *
+# * Hits are read from CSV (value,source per line) or JSONL (one object   *
+# * per line with "value" - or "email", "card", "address" - and "source") *
+# *                                                                       *
+# * usage: python fea_cli.py email hits.csv --output-dir out --dns        *
+# *        python fea_cli.py card hits.jsonl                              *
+# *        python fea_cli.py bitcoin hits.csv --blockchain                *
+# *************************************************************************
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+from jm_email_report import EmailReport
+from jm_email_report import EmailReportWriter
+from jm_email_report import lookupDomains
+from jm_email_report import lookupWayback
+from jm_card_report import CardPrefilter
+from jm_card_report import CardReport
+from jm_card_report import CardReportWriter
+from jm_card_parallel import ParallelCardValidator
+from jm_bitcoin_report import BlockchainReport
+from jm_bitcoin_report import BlockchainReportWriter
+from jm_bitcoin_report import analyzeHits
+from jm_bitcoin_report import validateHits
+from jm_base58 import Base58CheckValidator
+from jm_blockchain_client import BlockchainClient
+from jm_blockchain_client import MockBlockchainBackend
+from jm_tld_registry import TLDRegistry
+from jm_iin_index import IINIndex
+
+
+# JSONL keys accepted for the hit value, besides "value"
+VALUE_KEYS = ("value", "email", "card", "address")
+
+
+if sys.version_info[0] < 3:
+    # the Python 2 (and Jython 2.7) csv module only handles byte strings, so
+    # fields are decoded after parsing
+    def readRows(fileName):
+        with open(fileName, "rb") as f:
+            for row in csv.reader(f):
+                yield [field.decode("utf-8") for field in row]
+else:
+    def readRows(fileName):
+        with io.open(fileName, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                yield row
+
+
+def readHits(fileName):
+    # returns the (value, source) pairs of a CSV or JSONL export
+    hits = []
+    if fileName.lower().endswith((".jsonl", ".json")):
+        with io.open(fileName, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                hit = json.loads(line)
+                value = None
+                for key in VALUE_KEYS:
+                    if key in hit:
+                        value = hit[key]
+                        break
+                if value is None:
+                    raise ValueError("no hit value in: " + line)
+                hits.append((value, hit.get("source", "")))
+    else:
+        for row in readRows(fileName):
+            if row and row[0].strip():
+                hits.append((row[0].strip(), row[1].strip() if len(row) > 1 else ""))
+    return hits
+
+
+class StageTimer(object):
+
+    def __init__(self, out=sys.stderr):
+        self.out = out
+        self.timings = []
+        self.started = None
+
+    def start(self, stage):
+        self.stop()
+        self.started = (stage, time.time())
+
+    def stop(self):
+        if self.started:
+            stage, started = self.started
+            self.timings.append((stage, time.time() - started))
+            self.started = None
+
+    def report(self):
+        self.stop()
+        for stage, elapsed in self.timings:
+            self.out.write("%-10s %9.3f s\n" % (stage, elapsed))
+        self.out.write("%-10s %9.3f s\n" % ("total", sum(elapsed for stage, elapsed in self.timings)))
+
+
+def runEmail(args, timer):
+    from jm_domain_lookup import DomainResolver
+    from jm_verdict_cache import VerdictCache
+    from jm_wayback import WaybackClient
+
+    timer.start("read")
+    hits = readHits(args.input)
+
+    timer.start("validate")
+    tldRegistry = TLDRegistry(args.tld_cache).load()
+    reportDB = EmailReport(tldRegistry.tlds)
+    reportDB.addNewEmailRecords([value for value, source in hits], [source for value, source in hits])
+
+    if args.dns:
+        timer.start("lookup")
+        verdictCache = VerdictCache(args.cache) if args.cache else None
+        resolver = DomainResolver(maxInFlight = args.threads)
+        invalidDomains = lookupDomains(reportDB, resolver, verdictCache)
+        sys.stderr.write("domain lookup - %s\n" % resolver.getStats())
+        if args.wayback:
+            waybackClient = WaybackClient()
+            lookupWayback(reportDB, invalidDomains, waybackClient, verdictCache)
+            sys.stderr.write("wayback lookup - %s\n" % waybackClient.getStats())
+        if verdictCache:
+            verdictCache.close()
+
+    timer.start("write")
+    fileName = os.path.join(args.output_dir, args.name + "_FEA.csv")
+    fileNameExcel = os.path.join(args.output_dir, args.name + "_FEA.xls")
+    reportWriter = EmailReportWriter(None if args.no_csv else fileName, None if args.no_xls else fileNameExcel)
+    reportWriter.write(reportDB)
+    reportWriter.close()
+    return len(hits)
+
+
+def runCard(args, timer):
+    timer.start("read")
+    hits = readHits(args.input)
+
+    timer.start("validate")
+    iinIndex = IINIndex(args.iin_table or IINIndex.SNAPSHOT_FILE).load()
+    validator = ParallelCardValidator(iinIndex, workers = args.workers)
+    cardReport = CardReport(iinIndex, validator = validator)
+    prefilter = CardPrefilter()
+    ccNumbers = [ccNumber for ccNumber, sourceFile in hits]
+    sourceFiles = [sourceFile for ccNumber, sourceFile in hits]
+    if args.remove_false_positives:
+        ccNumbers, sourceFiles = prefilter.filterHits(ccNumbers, sourceFiles)
+    else:
+        prefilter.countHits(ccNumbers)
+    sys.stderr.write("prefilter - %s\n" % prefilter.getStats())
+    hitRecords = cardReport.addHits(ccNumbers, sourceFiles)
+    validator.close()
+    sys.stderr.write("card validation - %s\n" % validator.getStats())
+    sys.stderr.write("card numbers - %s\n" % cardReport.getStats())
+
+    timer.start("write")
+    fileName = os.path.join(args.output_dir, "FEA-CC-JM.csv")
+    fileNameExcel = os.path.join(args.output_dir, args.name + "_CC_FEA.xls")
+    reportWriter = CardReportWriter(None if args.no_csv else fileName, None if args.no_xls else fileNameExcel, aggregated = not args.per_hit, dropInvalid = args.remove_false_positives)
+    if args.per_hit:
+        for record, sourceFile in zip(hitRecords, sourceFiles):
+            reportWriter.writeHit(record.ccNumber, record.valid, sourceFile, record.iin)
+    else:
+        reportWriter.write(cardReport)
+    if args.rejects_summary:
+        reportWriter.writeRejects(prefilter)
+    reportWriter.close()
+    sys.stderr.write("report - %s\n" % reportWriter.getStats())
+    return len(hits)
+
+
+def runBitcoin(args, timer):
+    from jm_verdict_cache import VerdictCache
+
+    timer.start("read")
+    hits = readHits(args.input)
+
+    timer.start("validate")
+    recordDB = BlockchainReport()
+    for bcAddress, sourceFile in hits:
+        recordDB.addHit(bcAddress, sourceFile)
+    validator = Base58CheckValidator()
+    wallets = validateHits(recordDB, validator)
+
+    # every distinct address is validated and looked up once; as in the report
+    # module, wallets derived from private keys are always looked up, offline
+    # runs go to the mock backend and report them without balances
+    timer.start("lookup")
+    fileName = os.path.join(args.output_dir, "FEA-BitCoin.txt")
+    fileNameExcel = os.path.join(args.output_dir, args.name + "_BitCoin_FEA.xls")
+    reportWriter = BlockchainReportWriter(fileName, fileNameExcel)
+    if args.blockchain:
+        backend = BlockchainClient(secondsPerAddress = args.timeout, batchSize = args.batch_size, firstSeen = args.first_seen)
+    else:
+        backend = MockBlockchainBackend(batchSize = args.batch_size)
+    resultCache = VerdictCache(args.cache) if args.cache else None
+    for line in analyzeHits(recordDB, args.blockchain, backend, resultCache = resultCache, wallets = wallets):
+        reportWriter.writeLine(line)
+    reportWriter.close(len(hits))
+    backend.close()
+    sys.stderr.write("bitcoin hits - %s\n" % recordDB.getStats())
+    sys.stderr.write("Base58Check validation - %s\n" % validator.getStats())
+    sys.stderr.write("blockchain.info lookups - %s\n" % backend.getStats())
+    if resultCache:
+        sys.stderr.write("verdict cache - %s\n" % resultCache.getStats())
+        resultCache.close()
+
+    timer.start("write")
+    reportWriter.write(recordDB, args.blockchain)
+    return len(hits)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate exported email, credit card and bitcoin keyword hits outside Autopsy and write the FEA reports")
+    subparsers = parser.add_subparsers(dest="command")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("input", help="CSV (value,source) or JSONL file with the keyword hits")
+    common.add_argument("--output-dir", default=".", help="directory for the reports (default: current directory)")
+    common.add_argument("--name", default="cli", help="case name used in the report file names")
+
+    email = subparsers.add_parser("email", parents=[common], help="validate email addresses")
+    email.add_argument("--no-csv", action="store_true", help="do not write the CSV report")
+    email.add_argument("--no-xls", action="store_true", help="do not write the Excel report")
+    email.add_argument("--dns", action="store_true", help="check domains with DNS lookups")
+    email.add_argument("--wayback", action="store_true", help="check unresolved domains in the Wayback Machine (requires --dns)")
+    email.add_argument("--threads", type=int, default=64, help="maximum number of DNS queries in flight")
+    email.add_argument("--cache", help="verdict cache database, reused across runs")
+    email.add_argument("--tld-cache", help="local copy of the IANA TLD list, refreshed when stale")
+
+    card = subparsers.add_parser("card", parents=[common], help="validate credit card numbers (Luhn)")
+    card.add_argument("--no-csv", action="store_true", help="do not write the CSV report")
+    card.add_argument("--no-xls", action="store_true", help="do not write the Excel report")
+    card.add_argument("--iin-table", help="IIN range table to use instead of the bundled one")
+    card.add_argument("--remove-false-positives", action="store_true", help="drop card numbers rejected by the prefilter or failing the Luhn check")
+    card.add_argument("--rejects-summary", action="store_true", help="add a summary sheet of the false positive hits (rejected or flagged) to the Excel report")
+    card.add_argument("--workers", type=int, help="number of validation workers (default: one per processor, 1 to validate serially)")
+    card.add_argument("--per-hit", action="store_true", help="one row per hit instead of one per distinct card number")
+
+    bitcoin = subparsers.add_parser("bitcoin", parents=[common], help="validate bitcoin addresses and private keys")
+    bitcoin.add_argument("--blockchain", action="store_true", help="query blockchain.info for valid addresses")
+    bitcoin.add_argument("--timeout", type=float, default=5, help="average seconds between address lookups on blockchain.info")
+    bitcoin.add_argument("--batch-size", type=int, default=BlockchainClient.BATCH_SIZE, help="addresses per blockchain.info request")
+    bitcoin.add_argument("--first-seen", action="store_true", help="also query the first seen date of active addresses (one request per address)")
+    bitcoin.add_argument("--cache", help="blockchain.info results cache database, reused across runs")
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.error("a command (email, card or bitcoin) is required")
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    timer = StageTimer()
+    run = {"email": runEmail, "card": runCard, "bitcoin": runBitcoin}[args.command]
+    count = run(args, timer)
+    sys.stderr.write("%s: %d hits\n" % (args.command, count))
+    timer.report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# *************************************************************************
+# * Class: stream blackboard artifacts in fixed-size pages                *
+# *************************************************************************
+
+
+class ArtifactSource(object):
+
+    # number of artifacts fetched from the case database per query
+    PAGE_SIZE = 500
+
+    def __init__(self, fetcher, pageSize=PAGE_SIZE):
+        # fetcher must provide fetchPage(afterArtifactId, limit), returning the
+        # next artifacts ordered by artifact id, and countArtifacts()
+        self.fetcher = fetcher
+        self.pageSize = max(1, pageSize)
+
+    def countArtifacts(self):
+        return self.fetcher.countArtifacts()
+
+    def iterPages(self):
+        # only one page is held in memory at a time; pages are keyed on the
+        # last artifact id seen, so no OFFSET scans are needed
+        lastArtifactId = None
+        while True:
+            page = self.fetcher.fetchPage(lastArtifactId, self.pageSize)
+            if not page:
+                return
+            yield page
+            if len(page) < self.pageSize:
+                return
+            lastArtifactId = page[-1].getArtifactID()
+
+    def iterArtifacts(self):
+        for page in self.iterPages():
+            for artifactItem in page:
+                yield artifactItem
+
+    def iterAttributes(self, attributeType):
+        for artifactItem in self.iterArtifacts():
+            for attributeItem in artifactItem.getAttributes(attributeType):
+                yield artifactItem, attributeItem
+
+
+class BlackboardFetcher(object):
+    # pages through the Autopsy case database with SleuthkitCase.getMatchingArtifacts()
+
+    def __init__(self, sleuthkitCase, whereClause):
+        self.sleuthkitCase = sleuthkitCase
+        self.whereClause = whereClause
+
+    @classmethod
+    def forArtifactType(cls, sleuthkitCase, artifactType):
+        return cls(sleuthkitCase, "blackboard_artifacts.artifact_type_id = " + str(artifactType.getTypeID()))
+
+    @classmethod
+    def forSetName(cls, sleuthkitCase, setNameAttributeType, setName):
+        return cls(sleuthkitCase, "blackboard_artifacts.artifact_id IN (SELECT artifact_id FROM blackboard_attributes WHERE attribute_type_id = "
+                   + str(setNameAttributeType.getTypeID()) + " AND value_text = '" + setName.replace("'", "''") + "')")
+
+    def fetchPage(self, afterArtifactId, limit):
+        clause = self.whereClause
+        if afterArtifactId is not None:
+            clause = clause + " AND blackboard_artifacts.artifact_id > " + str(afterArtifactId)
+        return self.sleuthkitCase.getMatchingArtifacts(clause + " ORDER BY blackboard_artifacts.artifact_id LIMIT " + str(limit))
+
+    def countArtifacts(self):
+        query = self.sleuthkitCase.executeQuery("SELECT COUNT(*) AS count FROM blackboard_artifacts WHERE " + self.whereClause)
+        try:
+            resultSet = query.getResultSet()
+            resultSet.next()
+            return int(resultSet.getLong("count"))
+        finally:
+            query.close()
+
+
+
+# *************************************************************************
+# * Synthetic in-memory blackboard                                        *
+# *                                                                       *
+# * Stand-in for the Autopsy case database, so that the report pipelines  *
+# * can be run (and their throughput and memory measured) outside         *
+# * Autopsy. Artifacts are generated on demand, page by page.             *
+# *************************************************************************
+
+class SyntheticBlackboard(object):
+
+    def __init__(self, numArtifacts, makeValue, attributesPerArtifact=1, numFiles=1000):
+        # makeValue(n) returns the display string of the n-th keyword hit
+        self.numArtifacts = numArtifacts
+        self.makeValue = makeValue
+        self.attributesPerArtifact = attributesPerArtifact
+        self.numFiles = max(1, numFiles)
+        self.queryCount = 0
+
+    def countArtifacts(self):
+        return self.numArtifacts
+
+    def fetchPage(self, afterArtifactId, limit):
+        self.queryCount += 1
+        first = 0 if afterArtifactId is None else afterArtifactId + 1
+        last = min(first + limit, self.numArtifacts)
+        return [SyntheticArtifact(self, artifactId) for artifactId in range(first, last)]
+
+    def findAllFilesWhere(self, whereClause):
+        # understands the "obj_id = n" and "obj_id IN (n, ...)" clauses used by the report modules
+        self.queryCount += 1
+        ids = whereClause.split("(", 1)[-1].split("=", 1)[-1].rstrip(")").split(",")
+        return [SyntheticFile(int(objId)) for objId in ids if objId.strip()]
+
+
+class SyntheticArtifact(object):
+
+    def __init__(self, blackboard, artifactId):
+        self.blackboard = blackboard
+        self.artifactId = artifactId
+
+    def getArtifactID(self):
+        return self.artifactId
+
+    def getObjectID(self):
+        # id of the source file, as for a BlackboardArtifact
+        return self.artifactId % self.blackboard.numFiles
+
+    def getAttributes(self, attributeType=None):
+        base = self.artifactId * self.blackboard.attributesPerArtifact
+        return [SyntheticAttribute(self, self.blackboard.makeValue(base + n)) for n in range(self.blackboard.attributesPerArtifact)]
+
+
+class SyntheticAttribute(object):
+
+    def __init__(self, artifact, value):
+        self.artifact = artifact
+        self.value = value
+
+    def getDisplayString(self):
+        return self.value
+
+    def getParentArtifact(self):
+        return self.artifact
+
+
+class SyntheticFile(object):
+
+    def __init__(self, objId):
+        self.objId = objId
+
+    def getId(self):
+        return self.objId
+
+    def getName(self):
+        return "file%d.bin" % self.objId
@@ -0,0 +1,133 @@
+# *************************************************************************
+# * Functions/Class: Base58 (bitcoin alphabet) codec and memoised         *
+# * Base58Check validation of wallet addresses and private keys           *
+# *************************************************************************
+import binascii
+
+from collections import OrderedDict
+from hashlib import sha256
+
+
+B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# reverse lookup table: character code -> digit value, -1 for characters
+# outside the alphabet
+B58_VALUES = [-1] * 256
+for value, char in enumerate(B58_ALPHABET):
+    B58_VALUES[ord(char)] = value
+B58_VALUES = tuple(B58_VALUES)
+
+# decoded length of a version byte + 20 byte hash + 4 byte checksum address
+ADDRESS_BYTES = 25
+
+
+def decodeInt(text, values=B58_VALUES):
+    # Base58 string -> integer; raises ValueError on characters outside the alphabet
+    n = 0
+    try:
+        for char in text:
+            value = values[ord(char)]
+            if value < 0:
+                raise ValueError("invalid base58 character %r" % char)
+            n = n * 58 + value
+    except IndexError as e:
+        raise ValueError("invalid base58 character %r" % char)
+    return n
+
+
+def encodeInt(n, alphabet=B58_ALPHABET):
+    # integer -> Base58 string (no leading '1's for zero bytes)
+    digits = []
+    while n:
+        n, digit = divmod(n, 58)
+        digits.append(alphabet[digit])
+    return ''.join(reversed(digits))
+
+
+def byteLength(n):
+    return (n.bit_length() + 7) // 8
+
+
+if hasattr(int, "to_bytes"):
+    def intToBytes(n, length):
+        return n.to_bytes(length, 'big')
+else:
+    def intToBytes(n, length):
+        # no int.to_bytes before Python 3, a single hex conversion instead
+        if not length:
+            return b''
+        return binascii.unhexlify('%0*x' % (length * 2, n))
+
+
+def decode(text):
+    # Base58 string -> bytes, leading '1's decode to zero bytes
+    n = decodeInt(text)
+    zeros = len(text) - len(text.lstrip('1'))
+    return b'\0' * zeros + intToBytes(n, byteLength(n))
+
+
+def encode(data):
+    zeros = len(data) - len(data.lstrip(b'\0'))
+    return '1' * zeros + encodeInt(int(binascii.hexlify(data), 16) if data else 0)
+
+
+def checksum(data):
+    return sha256(sha256(data).digest()).digest()[:4]
+
+
+def decodeCheck(text):
+    # Base58Check string -> payload (version byte included), None if the checksum fails
+    data = decode(text)
+    if len(data) < 4 or data[-4:] != checksum(data[:-4]):
+        return None
+    return data[:-4]
+
+
+def encodeCheck(payload):
+    return encode(payload + checksum(payload))
+
+
+def isValidBase58Check(text, minBytes=ADDRESS_BYTES):
+    # checksum test of the report modules: the number is decoded into at least
+    # minBytes bytes (25, a wallet address) whatever its leading '1's
+    try:
+        n = decodeInt(text)
+    except ValueError as e:
+        return False
+    data = intToBytes(n, max(minBytes, byteLength(n)))
+    return data[-4:] == checksum(data[:-4])
+
+
+class Base58CheckValidator(object):
+
+    # maximum number of memoised results
+    CACHE_SIZE = 100000
+
+    def __init__(self, cacheSize=CACHE_SIZE):
+        self.cacheSize = max(1, cacheSize)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def isValid(self, text):
+        # repeated strings (the same wallet address all over a case) are
+        # checked once, least recently used results are dropped first
+        cache = self.cache
+        if text in cache:
+            self.hits += 1
+            valid = cache.pop(text)
+            cache[text] = valid
+            return valid
+        self.misses += 1
+        valid = cache[text] = isValidBase58Check(text)
+        if len(cache) > self.cacheSize:
+            cache.popitem(last=False)
+        return valid
+
+    def isValidMany(self, texts):
+        # batch version of isValid, returns a list of booleans
+        isValid = self.isValid
+        return [isValid(text) for text in texts]
+
+    def getStats(self):
+        return "%d cache hits, %d cache misses" % (self.hits, self.misses)
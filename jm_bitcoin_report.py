@@ -0,0 +1,337 @@
+# *************************************************************************
+# * Bitcoin address/private key validation and report writer             *
+# *                                                                       *
+# * Pure Python, shared by the Autopsy report module                      *
+# * (reportmoduleBCWallet.py) and the command line runner (fea_cli.py)    *
+# *************************************************************************
+import hashlib
+import binascii
+
+import xlwt
+
+from collections import OrderedDict
+
+from jm_base58 import decodeCheck
+from jm_base58 import encodeCheck
+from jm_base58 import intToBytes
+from jm_base58 import isValidBase58Check
+from jm_secp256k1 import publicKey
+
+
+# time to live (in seconds) of cached blockchain.info results; balances change,
+# so they are kept for a day rather than the verdict cache's 30 days
+BLOCKCHAIN_TTL = 24 * 3600
+
+
+#   /$$$$$$$  /$$   /$$                         /$$                                 /$$       /$$                                       
+#  | $$__  $$|__/  | $$                        |__/                                | $$      | $$                                       
+#  | $$  \ $$ /$$ /$$$$$$    /$$$$$$$  /$$$$$$  /$$ /$$$$$$$         /$$$$$$   /$$$$$$$  /$$$$$$$  /$$$$$$   /$$$$$$   /$$$$$$$ /$$$$$$$
+#  | $$$$$$$ | $$|_  $$_/   /$$_____/ /$$__  $$| $$| $$__  $$       |____  $$ /$$__  $$ /$$__  $$ /$$__  $$ /$$__  $$ /$$_____//$$_____/
+#  | $$__  $$| $$  | $$    | $$      | $$  \ $$| $$| $$  \ $$        /$$$$$$$| $$  | $$| $$  | $$| $$  \__/| $$$$$$$$|  $$$$$$|  $$$$$$ 
+#  | $$  \ $$| $$  | $$ /$$| $$      | $$  | $$| $$| $$  | $$       /$$__  $$| $$  | $$| $$  | $$| $$      | $$_____/ \____  $$\____  $$
+#  | $$$$$$$/| $$  |  $$$$/|  $$$$$$$|  $$$$$$/| $$| $$  | $$      |  $$$$$$$|  $$$$$$$|  $$$$$$$| $$      |  $$$$$$$ /$$$$$$$//$$$$$$$/
+#  |_______/ |__/   \___/   \_______/ \______/ |__/|__/  |__/       \_______/ \_______/ \_______/|__/       \_______/|_______/|_______/ 
+#                                                                                                                                       
+#                                                                                                                                       
+#             
+
+# TODO: consider "deep" validation: https://bitcointalk.org/index.php?topic=1026.0
+
+def check_bc(bc):
+    # Base58Check test of a wallet address or private key (False for strings
+    # with characters outside the Base58 alphabet)
+    return isValidBase58Check(bc)
+
+def getAddressFromPrivateKey(wifpriv):
+    # generate public wallet address for a WIF private key via the secp256k1
+    # generator table; keys flagged as compressed (52 characters, K/L prefix)
+    # give the address of the compressed public key. None if the string is not
+    # a WIF key or its secret is outside the range of the curve
+    try:
+        payload = decodeCheck(wifpriv)
+    except ValueError:
+        return None
+    if payload is None:
+        return None
+    if len(payload) == 34 and payload[33:] == b'\x01':
+        compressed = True
+    elif len(payload) == 33:
+        compressed = False
+    else:
+        return None
+    try:
+        x, y = publicKey(int(binascii.hexlify(payload[1:33]), 16))
+    except ValueError:
+        return None
+
+    if compressed:
+        pubkey = (b'\x03' if y & 1 else b'\x02') + intToBytes(x, 32)
+    else:
+        pubkey = b'\x04' + intToBytes(x, 32) + intToBytes(y, 32)
+    pubkeyHash = hashlib.new('ripemd160', hashlib.sha256(pubkey).digest()).digest()
+    return encodeCheck(b'\x00' + pubkeyHash)
+
+def lookupAddresses(addresses, backend, resultCache=None):
+    # returns a dict of wallet address -> (balance, received, first seen) for the
+    # distinct addresses, reusing results of previous runs from resultCache (a
+    # VerdictCache); the others are sent to backend (e.g. a BlockchainClient) in
+    # batches; failed lookups are not cached
+    results = {}
+    if resultCache:
+        for address, (positive, value) in resultCache.getMany("blockchain", addresses).items():
+            results[address] = tuple(value.split("|"))
+    newResults = []
+    for address, (balance, received, timeFirstSeen) in backend.lookupMany([address for address in addresses if not address in results]).items():
+        results[address] = (balance, received, timeFirstSeen)
+        if balance != "n.a." and received != "n.a.":
+            newResults.append((address, True, "|".join((balance, received, timeFirstSeen))))
+    if resultCache:
+        resultCache.putMany("blockchain", newResults, BLOCKCHAIN_TTL)
+    return results
+
+def validateHits(recordDB, validator=None):
+    # validates the distinct keyword hits of recordDB and returns the wallets
+    # found, as (keyword hit, wallet address, private key or None) tuples;
+    # validator (a Base58CheckValidator) memoises the checksum tests
+    isValid = validator.isValid if validator else check_bc
+    wallets = []
+    for keywordHit in recordDB.getAllHits():
+        bcAddress = keywordHit.keyword
+        if not isValid(bcAddress):
+            continue
+        if len(bcAddress) < 51:
+            wallets.append((keywordHit, bcAddress, None))
+            continue
+        # candidate private key found
+        candidatePublicAddress = getAddressFromPrivateKey(bcAddress)
+        # candidate wallet address found
+        if candidatePublicAddress and isValid(candidatePublicAddress):
+            wallets.append((keywordHit, candidatePublicAddress, bcAddress))
+    return wallets
+
+
+def analyzeHits(recordDB, blockchainCheck, backend, validator=None, resultCache=None, wallets=None):
+    # queries every distinct wallet address of recordDB once and returns the
+    # lines of the text report; the hits are validated first, unless the
+    # wallets of validateHits are given
+    if wallets is None:
+        wallets = validateHits(recordDB, validator)
+
+    # wallets derived from private keys are always checked
+    addresses = []
+    pending = set()
+    for keywordHit, walletAddress, privateKey in wallets:
+        if (blockchainCheck or privateKey) and not walletAddress in pending:
+            pending.add(walletAddress)
+            addresses.append(walletAddress)
+    results = lookupAddresses(addresses, backend, resultCache)
+
+    lines = []
+    for keywordHit, walletAddress, privateKey in wallets:
+        occurrences = " - hits: %d - sources: %s;\n" % (keywordHit.hits, keywordHit.getSources())
+        if privateKey:
+            balance, received, timeFirstSeen = results[walletAddress]
+            recordDB.addPrivateWallet(walletAddress, timeFirstSeen, balance, received, privateKey, keywordHit)
+            lines.append("*** PRIVATE KEY FOUND: %s with wallet address: %s - first seen on: %s - account balance:  %s BTC - total received: %s BTC" % (privateKey, walletAddress, timeFirstSeen, balance, received) + occurrences)
+        elif blockchainCheck:
+            balance, received, timeFirstSeen = results[walletAddress]
+            recordDB.addBlockchainRecord(walletAddress, 0, timeFirstSeen, balance, received, keywordHit)
+            lines.append("Wallet address: %s - first seen on: %s - account balance:  %s BTC - total received: %s BTC" % (walletAddress, timeFirstSeen, balance, received) + occurrences)
+        else:
+            recordDB.addBlockchainRecord(walletAddress, 0, 0, 0, 0, keywordHit)
+            lines.append("Wallet address: %s (user opted out of Blockchain check)" % walletAddress + occurrences)
+    return lines
+
+
+#   /$$$$$$$                                            /$$                     /$$                                                 
+#  | $$__  $$                                          | $$                    | $$                                                 
+#  | $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$   /$$$$$$  /$$$$$$          /$$$$$$$| $$  /$$$$$$   /$$$$$$$ /$$$$$$$  /$$$$$$   /$$$$$$$
+#  | $$$$$$$/ /$$__  $$ /$$__  $$ /$$__  $$ /$$__  $$|_  $$_/         /$$_____/| $$ |____  $$ /$$_____//$$_____/ /$$__  $$ /$$_____/
+#  | $$__  $$| $$$$$$$$| $$  \ $$| $$  \ $$| $$  \__/  | $$          | $$      | $$  /$$$$$$$|  $$$$$$|  $$$$$$ | $$$$$$$$|  $$$$$$ 
+#  | $$  \ $$| $$_____/| $$  | $$| $$  | $$| $$        | $$ /$$      | $$      | $$ /$$__  $$ \____  $$\____  $$| $$_____/ \____  $$
+#  | $$  | $$|  $$$$$$$| $$$$$$$/|  $$$$$$/| $$        |  $$$$/      |  $$$$$$$| $$|  $$$$$$$ /$$$$$$$//$$$$$$$/|  $$$$$$$ /$$$$$$$/
+#  |__/  |__/ \_______/| $$____/  \______/ |__/         \___/         \_______/|__/ \_______/|_______/|_______/  \_______/|_______/ 
+#                      | $$                                                                                                         
+#                      | $$                                                                                                         
+#                      |__/                                                                                                         
+
+
+class BlockchainReport(object):
+
+    # maximum number of distinct source files listed for each hit
+    MAX_SOURCES = 20
+
+    def __init__(self, maxSources=MAX_SOURCES):
+        self.hitList = OrderedDict()    # keyword -> KeywordHit, in order of first occurrence
+        self.hitCount = 0
+        self.maxSources = maxSources
+        self.recordList = {}
+        self.recordCount = 0
+        self.privateKeysList = {}
+        self.privateKeysCount = 0
+
+    def addHit(self, keyword, sourceFile=""):
+        # repeated keyword hits (the same wallet address all over a case) are
+        # collapsed into one KeywordHit, analyzed and looked up only once
+        keywordHit = self.hitList.get(keyword)
+        if keywordHit is None:
+            keywordHit = self.hitList[keyword] = self.KeywordHit(keyword)
+        keywordHit.addSource(sourceFile, self.maxSources)
+        self.hitCount += 1
+
+    def addBlockchainRecord(self, walletAddress, walletType, timeFirstSeen, totalBalance, totalReceived, keywordHit=None):
+        self.recordCount += 1
+        newRecord = self.BlockchainRecord(walletAddress, walletType, timeFirstSeen, totalBalance, totalReceived, None, keywordHit)
+        self.recordList[walletAddress] = newRecord
+
+    def addPrivateWallet(self, walletAddress, timeFirstSeen, totalBalance, totalReceived, privateKey, keywordHit=None):
+        self.privateKeysCount += 1
+        newRecord = self.BlockchainRecord(walletAddress, 1, timeFirstSeen, totalBalance, totalReceived, privateKey, keywordHit)
+        self.privateKeysList[privateKey] = newRecord
+
+    def getAllHits(self):
+        return self.hitList.values()
+
+    def getAllRecords(self):
+        return self.recordList.values()
+
+    def getAllPrivateKeyRecords(self):
+        return self.privateKeysList.values()
+
+    def getStats(self):
+        return "%d hits, %d distinct, %d wallet addresses, %d private keys" % (self.hitCount, len(self.hitList), self.recordCount, self.privateKeysCount)
+
+    class KeywordHit(object):
+        __slots__ = ("keyword", "hits", "sources", "moreSources")
+
+        def __init__(self, keyword):
+            self.keyword = keyword
+            self.hits = 0
+            self.sources = []
+            self.moreSources = False
+
+        def addSource(self, sourceFile, maxSources):
+            self.hits += 1
+            if sourceFile in self.sources:
+                return
+            if len(self.sources) < maxSources:
+                self.sources.append(sourceFile)
+            else:
+                self.moreSources = True
+
+        def getSources(self):
+            # distinct source files, ", ..." marks that the list was cut short
+            if self.moreSources:
+                return ", ".join(self.sources + ["..."])
+            return ", ".join(self.sources)
+
+    class BlockchainRecord(object):
+        # no per-instance dict, records are kept in memory for the whole report run
+        __slots__ = ("walletAddress", "walletType", "timeFirstSeen", "totalBalance", "totalReceived", "privateKey", "keywordHit")
+
+        def __init__(self, walletAddress, walletType, timeFirstSeen, totalBalance, totalReceived, privateKey=None, keywordHit=None):
+            self.walletAddress = walletAddress
+            self.walletType = walletType
+            self.timeFirstSeen = timeFirstSeen
+            self.totalBalance = totalBalance
+            self.totalReceived = totalReceived
+            self.privateKey = privateKey
+            self.keywordHit = keywordHit
+
+        def getHits(self):
+            return self.keywordHit.hits if self.keywordHit else 1
+
+        def getSources(self):
+            return self.keywordHit.getSources() if self.keywordHit else ""
+
+        def getPrivateKey(self):
+            return self.privateKey
+
+        def getAddressType(self):
+            return self.walletType
+
+        def getAddress(self):
+            return self.walletAddress
+
+        def getTimeFirstSeen(self):
+            return self.timeFirstSeen
+
+        def getAccountBalance(self):
+            return self.totalBalance
+
+        def getTotalReceived(self):
+            return self.totalReceived
+
+
+# ***********************************************************************
+# * Report writer: text report lines from analyzeHits, Excel workbook   *
+# * from the BlockchainReport at the end                                *
+# ***********************************************************************
+
+class BlockchainReportWriter(object):
+
+    def __init__(self, fileName, fileNameExcel):
+        self.fileNameExcel = fileNameExcel
+        self.report = open(fileName, 'w')
+        self.report.write("Attributes from artifacts\n")
+
+    def writeLine(self, line):
+        self.report.write(line)
+
+    def write(self, recordDB, blockchainCheck):
+        # configure excel report
+        book = xlwt.Workbook(encoding="utf-8")
+        sheetPublicAddresses = book.add_sheet("FEA_BC_Public_wallets")
+        sheetPrivateAddresses = book.add_sheet("FEA_BC_Private_wallets")
+        styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
+        sheetPublicAddresses.write(0,0,"Address", styleRowHeaders)
+        sheetPublicAddresses.write(0,1,"Time 1st seen", styleRowHeaders)
+        sheetPublicAddresses.write(0,2,"Balance", styleRowHeaders)
+        sheetPublicAddresses.write(0,3,"Total Received", styleRowHeaders)
+        sheetPublicAddresses.write(0,4,"Blockchain.info", styleRowHeaders)
+        sheetPublicAddresses.write(0,5,"Hits", styleRowHeaders)
+        sheetPublicAddresses.write(0,6,"Sources", styleRowHeaders)
+        sheetPrivateAddresses.write(0,0,"Private Key", styleRowHeaders)
+        sheetPrivateAddresses.write(0,1,"Wallet Address", styleRowHeaders)
+        sheetPrivateAddresses.write(0,2,"Balance", styleRowHeaders)
+        sheetPrivateAddresses.write(0,3,"Time 1st seen", styleRowHeaders)
+        sheetPrivateAddresses.write(0,4,"Total received", styleRowHeaders)
+        sheetPrivateAddresses.write(0,5,"Hits", styleRowHeaders)
+        sheetPrivateAddresses.write(0,6,"Sources", styleRowHeaders)
+
+        # write excel report
+        baseCellPublic = 1
+        baseCellPrivate = 1
+        for row in recordDB.getAllRecords():
+            # write public wallet addresses in subsheet
+            if row.getAddressType() == 0:
+                sheetPublicAddresses.write(baseCellPublic, 0, row.getAddress())
+                if blockchainCheck:
+                    sheetPublicAddresses.write(baseCellPublic, 1, row.getTimeFirstSeen())
+                    sheetPublicAddresses.write(baseCellPublic, 2, row.getAccountBalance())
+                    sheetPublicAddresses.write(baseCellPublic, 3, row.getTotalReceived())
+                    sheetPublicAddresses.write(baseCellPublic, 4, "https://blockchain.info/address/" + row.getAddress())
+                else:
+                    for n in range(1, 4):
+                        sheetPublicAddresses.write(baseCellPublic, n, "n.a")
+                    sheetPublicAddresses.write(baseCellPublic, 4, "user opted out of blockchain.info check")
+                sheetPublicAddresses.write(baseCellPublic, 5, row.getHits())
+                sheetPublicAddresses.write(baseCellPublic, 6, row.getSources())
+                baseCellPublic += 1
+
+        for row in recordDB.getAllPrivateKeyRecords():
+            # write private key addresses in subsheet
+            sheetPrivateAddresses.write(baseCellPrivate, 0, row.getPrivateKey())
+            sheetPrivateAddresses.write(baseCellPrivate, 1, row.getAddress())
+            sheetPrivateAddresses.write(baseCellPrivate, 2, row.getAccountBalance())
+            sheetPrivateAddresses.write(baseCellPrivate, 3, row.getTimeFirstSeen())
+            sheetPrivateAddresses.write(baseCellPrivate, 4, row.getTotalReceived())
+            sheetPrivateAddresses.write(baseCellPrivate, 5, row.getHits())
+            sheetPrivateAddresses.write(baseCellPrivate, 6, row.getSources())
+            baseCellPrivate += 1
+
+        book.save(self.fileNameExcel)
+
+    def close(self, artifactCount):
+        self.report.write("Artifacts processed = %d" % artifactCount)
+        self.report.close()
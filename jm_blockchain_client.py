@@ -0,0 +1,208 @@
+# *************************************************************************
+# * Classes: wallet address lookup backends, a rate-limited client of     *
+# * blockchain.info batching many addresses per request, and a mock       *
+# *************************************************************************
+import datetime
+import json
+import socket
+import time
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+from threading import Lock
+
+from jm_rate_limiter import TokenBucket
+from jm_source_resolver import iterChunks
+
+
+# (balance, received, first seen) reported for addresses that could not be looked up
+NOT_AVAILABLE = ("n.a.", "n.a.", "n.a.")
+
+
+def formatBalance(satoshis):
+    # satoshis -> BTC string with all eight decimals, in integer arithmetic
+    return "%d.%08d" % divmod(int(satoshis), 100000000)
+
+
+def formatFirstSeen(timestamp):
+    if not timestamp:
+        return "n.a."
+    return datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Lookup backends provide lookupMany(addresses), returning a dict of address ->
+# (balance, received, first seen) strings for every address given, splitting
+# the addresses into requests of at most batchSize addresses, close() and
+# getStats().
+
+class BlockchainClient(object):
+
+    HOST = "blockchain.info"
+
+    # addresses per /balance request ("active" takes a pipe-separated list)
+    BATCH_SIZE = 100
+
+    # requests allowed per configured "timeout between calls" (the old client
+    # sent three queries per address, one address per timeout)
+    REQUESTS_PER_PERIOD = 3
+
+    # retries of requests answered with 429/5xx or failed connections, and base backoff in seconds
+    RETRIES = 3
+    BACKOFF = 1.0
+
+    # socket timeout in seconds
+    TIMEOUT = 30
+
+    def __init__(self, host=HOST, port=None, https=True, secondsPerAddress=None, batchSize=BATCH_SIZE, firstSeen=False,
+                 retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT, clock=time.time, sleep=time.sleep):
+        # secondsPerAddress is the module's "timeout between calls"; requests may
+        # go out in bursts of REQUESTS_PER_PERIOD, and the client only waits
+        # before a request is sent. The first seen date has no multi-address
+        # endpoint and costs a request per address with transactions, so it is
+        # only queried if firstSeen is set
+        self.host = host
+        self.port = port
+        self.https = https
+        self.batchSize = max(1, batchSize)
+        self.firstSeen = firstSeen
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep
+        self.rateLimiter = None
+        if secondsPerAddress:
+            self.rateLimiter = TokenBucket(float(self.REQUESTS_PER_PERIOD) / secondsPerAddress,
+                                           self.REQUESTS_PER_PERIOD, clock, sleep)
+        self.connection = None
+        self.lock = Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.splits = 0
+        self.addresses = 0
+
+    def connect(self):
+        if self.https:
+            return httplib.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return httplib.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def query(self, path):
+        # returns the decoded JSON answer to a request, or None if it failed
+        return self.request(path)[1]
+
+    def request(self, path):
+        # returns (HTTP status, decoded JSON answer) for a request; the answer is
+        # None if it failed, the status None if no response was received
+        status = None
+        wait = self.backoff
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                self.sleep(wait)
+                wait = wait * 2
+            if self.rateLimiter:
+                self.rateLimiter.acquire()
+            if self.connection is None:
+                self.connection = self.connect()
+            self.requests += 1
+            try:
+                self.connection.request("GET", path)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (httplib.HTTPException, socket.error):
+                self.connection.close()
+                self.connection = None
+                continue
+            status = response.status
+            if response.status == 429 or response.status >= 500:
+                retryAfter = response.getheader("Retry-After")
+                if retryAfter and retryAfter.isdigit():
+                    wait = max(wait, int(retryAfter))
+                continue
+            if response.status != 200:
+                break
+            try:
+                return status, json.loads(data.decode("utf-8"))
+            except ValueError:
+                break
+        self.failures += 1
+        return status, None
+
+    def lookupMany(self, addresses):
+        # one /balance request per batch of addresses, plus one first seen query
+        # per address with transactions if firstSeen is set
+        results = {}
+        with self.lock:
+            for batch in iterChunks(addresses, self.batchSize):
+                self.addresses += len(batch)
+                self.lookupBatch(batch, results)
+        return results
+
+    def lookupBatch(self, batch, results):
+        status, answer = self.request("/balance?active=" + "|".join(batch))
+        if answer is None and status is not None and 400 <= status < 500 and len(batch) > 1:
+            # the whole request is rejected if any one address is (e.g. a testnet
+            # address that passed Base58Check), so halve the batch until only the
+            # rejected addresses are left without a balance
+            self.splits += 1
+            middle = len(batch) // 2
+            self.lookupBatch(batch[:middle], results)
+            self.lookupBatch(batch[middle:], results)
+            return
+        for address in batch:
+            info = answer.get(address) if isinstance(answer, dict) else None
+            if not info or "final_balance" not in info:
+                results[address] = NOT_AVAILABLE
+                continue
+            timeFirstSeen = "n.a."
+            if self.firstSeen and info.get("n_tx"):
+                timeFirstSeen = formatFirstSeen(self.query("/q/addressfirstseen/" + address))
+            results[address] = (formatBalance(info["final_balance"]), formatBalance(info.get("total_received", 0)), timeFirstSeen)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def getStats(self):
+        waited = self.rateLimiter.waitTime if self.rateLimiter else 0
+        return "%d addresses, %d requests, %d retries, %d failed, %d rejected batches split, %.1f s waiting on the rate limit" % (
+            self.addresses, self.requests, self.retried, self.failures, self.splits, waited)
+
+
+
+# *************************************************************************
+# * Mock blockchain backend                                               *
+# *                                                                       *
+# * Stand-in for blockchain.info, so that the Bitcoin report can be run   *
+# * (and its batching checked) offline. Answers from an in-memory table,  *
+# * counting the batched requests the real client would send.             *
+# *************************************************************************
+
+class MockBlockchainBackend(object):
+
+    def __init__(self, results=None, default=NOT_AVAILABLE, batchSize=BlockchainClient.BATCH_SIZE):
+        # results maps addresses to (balance, received, first seen) tuples,
+        # every other address is answered with default
+        self.results = results or {}
+        self.default = default
+        self.batchSize = max(1, batchSize)
+        self.requests = 0
+        self.addresses = 0
+
+    def lookupMany(self, addresses):
+        results = {}
+        for batch in iterChunks(addresses, self.batchSize):
+            self.requests += 1
+            self.addresses += len(batch)
+            for address in batch:
+                results[address] = self.results.get(address, self.default)
+        return results
+
+    def close(self):
+        pass
+
+    def getStats(self):
+        return "%d addresses, %d requests (mock)" % (self.addresses, self.requests)
@@ -0,0 +1,119 @@
+# *************************************************************************
+# * Class: validates card numbers in parallel, sharding batches across a  *
+# * pool of threads (Jython) or worker processes (CPython)                *
+# *************************************************************************
+import sys
+
+try:
+    from Queue import Queue
+    from Queue import Empty
+except ImportError:
+    from queue import Queue
+    from queue import Empty
+from threading import Thread
+
+from jm_card_report import validateCards
+from jm_source_resolver import iterChunks
+
+
+def cpuCount():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        pass
+    try:
+        from java.lang import Runtime
+        return Runtime.getRuntime().availableProcessors()
+    except ImportError:
+        return 1
+
+
+# IIN index of a worker process, set once when the process starts
+workerIINIndex = None
+
+def initWorker(iinIndex):
+    global workerIINIndex
+    workerIINIndex = iinIndex
+
+def validateChunk(ccNumbers):
+    return validateCards(ccNumbers, workerIINIndex)
+
+
+class ParallelCardValidator(object):
+
+    # batches smaller than this are validated in the calling thread
+    MIN_PARALLEL = 20000
+
+    # card numbers in each shard handed to a worker
+    CHUNK_SIZE = 5000
+
+    def __init__(self, iinIndex=None, workers=None, useProcesses=None, chunkSize=CHUNK_SIZE, minParallel=MIN_PARALLEL):
+        # Jython threads run in parallel (there is no GIL), CPython needs processes
+        self.iinIndex = iinIndex
+        self.workers = max(1, workers or cpuCount())
+        if useProcesses is None:
+            useProcesses = not sys.platform.startswith("java")
+        self.useProcesses = useProcesses
+        self.chunkSize = chunkSize
+        self.minParallel = minParallel
+        self.pool = None
+        self.batches = 0
+        self.parallelBatches = 0
+
+    def validate(self, ccNumbers):
+        # returns the same (Luhn results, IIN tuples) lists as validateCards,
+        # in the order of ccNumbers
+        self.batches += 1
+        if self.workers == 1 or len(ccNumbers) < self.minParallel:
+            return validateCards(ccNumbers, self.iinIndex)
+        self.parallelBatches += 1
+
+        chunks = list(iterChunks(ccNumbers, self.chunkSize))
+        if self.useProcesses:
+            if self.pool is None:
+                import multiprocessing
+                self.pool = multiprocessing.Pool(self.workers, initWorker, (self.iinIndex,))
+            results = self.pool.map(validateChunk, chunks)
+        else:
+            results = self.validateWithThreads(chunks)
+
+        valid = []
+        iins = []
+        for chunkValid, chunkIINs in results:
+            valid.extend(chunkValid)
+            iins.extend(chunkIINs)
+        return valid, iins
+
+    def validateWithThreads(self, chunks):
+        q_in = Queue()
+        for n in range(len(chunks)):
+            q_in.put(n)
+        results = [None] * len(chunks)
+
+        def worker():
+            while True:
+                try:
+                    n = q_in.get(block = False)
+                except Empty:
+                    return
+                results[n] = validateCards(chunks[n], self.iinIndex)
+
+        thread_pool = list()
+        for i in range(min(self.workers, len(chunks))):
+            t = Thread(target=worker)
+            t.start()
+            thread_pool.append(t)
+        for t in thread_pool:
+            t.join()
+        return results
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def getStats(self):
+        return "%d workers (%s), %d of %d batches validated in parallel" % (self.workers,
+            "processes" if self.useProcesses else "threads", self.parallelBatches, self.batches)
@@ -0,0 +1,413 @@
+# *************************************************************************
+# * Credit card (Luhn) validation and report writer                       *
+# *                                                                       *
+# * Pure Python, shared by the Autopsy report module (reportmoduleCC.py)  *
+# * and the command line runner (fea_cli.py)                              *
+# *************************************************************************
+import sys
+
+import xlwt
+
+from jm_iin_index import IIN_UNKNOWN
+
+
+if sys.version_info[0] < 3:
+    # the CSV report is a byte file on Python 2 (and Jython), issuer names read
+    # from the IIN table are unicode
+    def encodeRow(row):
+        if isinstance(row, unicode):
+            return row.encode("utf-8")
+        return row
+else:
+    def encodeRow(row):
+        return row
+
+
+#   /$$                 /$$                
+#  | $$                | $$                
+#  | $$       /$$   /$$| $$$$$$$  /$$$$$$$ 
+#  | $$      | $$  | $$| $$__  $$| $$__  $$
+#  | $$      | $$  | $$| $$  \ $$| $$  \ $$
+#  | $$      | $$  | $$| $$  | $$| $$  | $$
+#  | $$$$$$$$|  $$$$$$/| $$  | $$| $$  | $$
+#  |________/ \______/ |__/  |__/|__/  |__/
+#                                          
+
+# Luhn sums are computed from a table of the contribution of every 4 digit
+# block (doubled, plain, doubled, plain digit - right aligned), so that a
+# card number is checked with a handful of slices and dict lookups. Numbers
+# are zero padded on the left to a multiple of 4 digits, which leaves the
+# sum unchanged; non-digit characters are simply not found in the table
+
+# sum of the digits of 2 * d, for d = 0..9
+DOUBLED_DIGITS = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+# padded length of the common (up to 20 digits) case
+LUHN_WIDTH = 20
+
+def buildLuhnTable():
+    pairs = {}
+    for a in range(10):
+        for b in range(10):
+            pairs["%d%d" % (a, b)] = DOUBLED_DIGITS[a] + b
+    table = {}
+    for high, highSum in pairs.items():
+        for low, lowSum in pairs.items():
+            table[high + low] = highSum + lowSum
+    return table
+
+LUHN_TABLE = buildLuhnTable()
+
+def luhnSum(number, table=LUHN_TABLE):
+    # raises KeyError if number has anything but digits
+    if len(number) <= LUHN_WIDTH:
+        p = number.zfill(LUHN_WIDTH)
+        return table[p[:4]] + table[p[4:8]] + table[p[8:12]] + table[p[12:16]] + table[p[16:]]
+    p = number.zfill(len(number) + (-len(number) % 4))
+    return sum([table[p[i:i + 4]] for i in range(0, len(p), 4)])
+
+def luhn_checksum(card_number):
+    try:
+        return luhnSum(str(card_number)) % 10
+    except KeyError as e:
+        raise ValueError("not a card number: %r" % (card_number,))
+
+def is_luhn_valid(card_number):
+    try:
+        return luhnSum(str(card_number)) % 10 == 0
+    except KeyError as e:
+        return False
+
+def luhnValidMany(cardNumbers, table=LUHN_TABLE):
+    # bulk version of is_luhn_valid, returns a list of booleans; the common
+    # case is inlined to avoid a function call per number
+    results = []
+    append = results.append
+    for number in cardNumbers:
+        try:
+            n = len(number)
+            if n == 16:
+                # most common PAN length, no padding needed
+                append((table[number[:4]] + table[number[4:8]] + table[number[8:12]] + table[number[12:]]) % 10 == 0)
+            elif n <= LUHN_WIDTH:
+                p = number.zfill(LUHN_WIDTH)
+                append((table[p[:4]] + table[p[4:8]] + table[p[8:12]] + table[p[12:16]] + table[p[16:]]) % 10 == 0)
+            else:
+                append(luhnSum(number, table) % 10 == 0)
+        except KeyError as e:
+            append(False)
+    return results
+
+def validateCards(ccNumbers, iinIndex=None):
+    # returns the (Luhn results, IIN tuples) lists of a batch of card numbers
+    valid = luhnValidMany(ccNumbers)
+    if iinIndex:
+        return valid, iinIndex.classifyMany(ccNumbers)
+    return valid, [IIN_UNKNOWN] * len(ccNumbers)
+
+
+
+# ***********************************************************************
+# * Prefilter: cheap checks that reject obviously invalid card numbers  *
+# * before they are validated and written                               *
+# ***********************************************************************
+
+class CardPrefilter(object):
+
+    # shortest and longest card numbers of any scheme (see iin-ranges.csv)
+    MIN_LENGTH = 12
+    MAX_LENGTH = 19
+
+    # numbers with a run of this many zeros are rejected
+    ZERO_RUN = 8
+
+    # rejection reasons
+    BAD_LENGTH = "wrong length"
+    NOT_DIGITS = "not only digits"
+    REPEATED_DIGIT = "same digit repeated"
+    SEQUENTIAL = "sequential digits"
+    ZEROS = "run of zeros"
+    REASONS = (BAD_LENGTH, NOT_DIGITS, REPEATED_DIGIT, SEQUENTIAL, ZEROS)
+
+    # every ascending/descending digit sequence up to MAX_LENGTH is a substring of these
+    ASCENDING = "0123456789" * 3
+    DESCENDING = "9876543210" * 3
+
+    def __init__(self, minLength=MIN_LENGTH, maxLength=MAX_LENGTH, zeroRun=ZERO_RUN):
+        self.minLength = minLength
+        self.maxLength = maxLength
+        self.zeros = "0" * zeroRun
+        self.checked = 0
+        self.counts = dict((reason, 0) for reason in self.REASONS)
+        # whether the counted hits were removed (filterHits) or only flagged (countHits)
+        self.removing = False
+
+    def check(self, ccNumber):
+        # returns the reason to reject a card number, or None; every check is a
+        # single scan done by a string method, no per-digit work in Python
+        n = len(ccNumber)
+        if n < self.minLength or n > self.maxLength:
+            return self.BAD_LENGTH
+        if not ccNumber.isdigit():
+            return self.NOT_DIGITS
+        if ccNumber == ccNumber[0] * n:
+            return self.REPEATED_DIGIT
+        if ccNumber in self.ASCENDING or ccNumber in self.DESCENDING:
+            return self.SEQUENTIAL
+        if self.zeros in ccNumber:
+            return self.ZEROS
+        return None
+
+    def countHits(self, ccNumbers):
+        # counts the rejections of a batch of hits without removing them
+        check = self.check
+        counts = self.counts
+        for ccNumber in ccNumbers:
+            reason = check(ccNumber)
+            if reason is not None:
+                counts[reason] += 1
+        self.checked += len(ccNumbers)
+
+    def filterHits(self, ccNumbers, sourceFiles):
+        # returns the (card numbers, source files) of the hits that pass the checks
+        self.removing = True
+        check = self.check
+        counts = self.counts
+        keptNumbers = []
+        keptSourceFiles = []
+        for ccNumber, sourceFile in zip(ccNumbers, sourceFiles):
+            reason = check(ccNumber)
+            if reason is None:
+                keptNumbers.append(ccNumber)
+                keptSourceFiles.append(sourceFile)
+            else:
+                counts[reason] += 1
+        self.checked += len(ccNumbers)
+        return keptNumbers, keptSourceFiles
+
+    def getRejected(self):
+        return sum(self.counts.values())
+
+    def getStats(self):
+        return "%d hits checked, %d rejected (%s)" % (self.checked, self.getRejected(),
+            ", ".join("%s: %d" % (reason, self.counts[reason]) for reason in self.REASONS))
+
+
+
+# ***********************************************************************
+# * CARD REPORT class                                                   *
+# *                                                                     *
+# * One CardRecord per distinct card number, validated once, with its   *
+# * number of hits and a bounded list of the source files it was found  *
+# * in                                                                  *
+# ***********************************************************************
+
+class CardReport(object):
+
+    # maximum number of distinct source files listed for a card number
+    MAX_SOURCES = 20
+
+    def __init__(self, iinIndex=None, maxSources=MAX_SOURCES, validator=None):
+        # validator, e.g. a ParallelCardValidator, replaces validateCards for
+        # the new card numbers of each batch
+        self.records = {}           # card number -> CardRecord
+        self.recordList = []        # records, in order of first appearance
+        self.hitCount = 0
+        self.iinIndex = iinIndex
+        self.maxSources = maxSources
+        self.validator = validator
+
+    def addHits(self, ccNumbers, sourceFiles):
+        # adds a batch of hits and returns their records, in order; only card
+        # numbers not seen before are Luhn checked and classified
+        records = self.records
+        newRecords = []
+        hitRecords = []
+        for ccNumber, sourceFile in zip(ccNumbers, sourceFiles):
+            record = records.get(ccNumber)
+            if record is None:
+                record = records[ccNumber] = self.CardRecord(ccNumber)
+                self.recordList.append(record)
+                newRecords.append(record)
+            record.addSource(sourceFile, self.maxSources)
+            hitRecords.append(record)
+        self.hitCount += len(hitRecords)
+
+        if newRecords:
+            newNumbers = [record.ccNumber for record in newRecords]
+            if self.validator:
+                validList, iinList = self.validator.validate(newNumbers)
+            else:
+                validList, iinList = validateCards(newNumbers, self.iinIndex)
+            for record, valid, iin in zip(newRecords, validList, iinList):
+                record.valid = valid
+                record.iin = iin
+        return hitRecords
+
+    def getAllRecords(self):
+        return self.recordList
+
+    def getTotalRecords(self):
+        return len(self.recordList)
+
+    def getStats(self):
+        return "%d hits, %d distinct card numbers" % (self.hitCount, len(self.recordList))
+
+    class CardRecord(object):
+        # no per-instance dict, one per distinct card number
+        __slots__ = ("ccNumber", "valid", "iin", "hits", "sources", "moreSources")
+
+        def __init__(self, ccNumber):
+            self.ccNumber = ccNumber
+            self.valid = False
+            self.iin = IIN_UNKNOWN
+            self.hits = 0
+            self.sources = []
+            self.moreSources = False
+
+        def addSource(self, sourceFile, maxSources):
+            self.hits += 1
+            if sourceFile in self.sources:
+                return
+            if len(self.sources) < maxSources:
+                self.sources.append(sourceFile)
+            else:
+                self.moreSources = True
+
+        def getSources(self):
+            # distinct source files, ", ..." marks that the list was cut short
+            if self.moreSources:
+                return ", ".join(self.sources + ["..."])
+            return ", ".join(self.sources)
+
+
+
+# ***********************************************************************
+# * Report writer (CSV and/or Excel workbook), one row per card number  *
+# * (aggregated) or per hit                                             *
+# ***********************************************************************
+
+class CardReportWriter(object):
+
+    CSV_HEADER = "card number;valid;source;brand;length check;issuer\n"
+
+    # aggregated reports also have the number of hits of each card number
+    CSV_HEADER_AGGREGATED = "card number;valid;source;brand;length check;issuer;hits\n"
+
+    # reason reported in the rejects summary for rows that fail the Luhn check
+    NOT_VALID = "failed Luhn check"
+
+    # status of the hits counted in the rejects summary
+    REJECTED = "rejected"
+    FLAGGED = "flagged (kept)"
+
+    def __init__(self, fileNameCSV=None, fileNameExcel=None, aggregated=False, dropInvalid=False):
+        # with dropInvalid, card numbers that fail the Luhn check are counted
+        # but never reach the CSV file or the workbook
+        self.fileNameCSV = fileNameCSV
+        self.fileNameExcel = fileNameExcel
+        self.aggregated = aggregated
+        self.dropInvalid = dropInvalid
+        self.baseCell = 0
+        self.writtenRows = 0
+        self.invalidHits = 0
+        self.droppedRows = 0
+        self.droppedHits = 0
+
+        # Create Excel Workbook
+        if fileNameExcel:
+            self.book = xlwt.Workbook(encoding="utf-8")
+            self.sheetFalsePositives = self.book.add_sheet("Autopsy Credit Cards")
+            styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
+            self.sheetFalsePositives.write(0,0,"Card Number", styleRowHeaders)
+            self.sheetFalsePositives.write(0,1,"Valid", styleRowHeaders)
+            self.sheetFalsePositives.write(0,2,"Source", styleRowHeaders)
+            self.sheetFalsePositives.write(0,3,"Brand", styleRowHeaders)
+            self.sheetFalsePositives.write(0,4,"Length check", styleRowHeaders)
+            self.sheetFalsePositives.write(0,5,"Issuer", styleRowHeaders)
+            if aggregated:
+                self.sheetFalsePositives.write(0,6,"Hits", styleRowHeaders)
+
+        # Open report CSV file for writing
+        if fileNameCSV:
+            self.report = open(fileNameCSV, 'w')
+
+            # write csv header row
+            if aggregated:
+                self.report.write(self.CSV_HEADER_AGGREGATED)
+            else:
+                self.report.write(self.CSV_HEADER)
+
+    def writeHit(self, ccNumber, valid, sourceFile, iin=IIN_UNKNOWN, hits=None):
+        # iin is the (brand, length check, issuer) tuple of IINIndex.classify;
+        # hits is only written by aggregated reports
+        if not valid:
+            self.invalidHits += hits or 1
+            if self.dropInvalid:
+                self.droppedRows += 1
+                self.droppedHits += hits or 1
+                return
+        self.writtenRows += 1
+
+        brand, lengthCheck, issuer = iin
+        if self.fileNameExcel:
+            self.baseCell += 1
+            self.sheetFalsePositives.write(self.baseCell,0, ccNumber)
+            if valid:
+                self.sheetFalsePositives.write(self.baseCell,1, "Valid")
+            else:
+                self.sheetFalsePositives.write(self.baseCell,1, "Not Valid")
+            self.sheetFalsePositives.write(self.baseCell,2,sourceFile)
+            self.sheetFalsePositives.write(self.baseCell,3,brand)
+            self.sheetFalsePositives.write(self.baseCell,4,lengthCheck)
+            if issuer:
+                self.sheetFalsePositives.write(self.baseCell,5,issuer)
+            if self.aggregated:
+                self.sheetFalsePositives.write(self.baseCell,6,hits)
+
+        if self.fileNameCSV:
+            if valid:
+                row = "%s;Valid;%s;%s;%s;%s" % (ccNumber,sourceFile,brand,lengthCheck,issuer)
+            else:
+                row = "%s;Not Valid;%s;%s;%s;%s" % (ccNumber,sourceFile,brand,lengthCheck,issuer)
+            if self.aggregated:
+                self.report.write(encodeRow("%s;%d\n" % (row, hits)))
+            else:
+                self.report.write(encodeRow(row + "\n"))
+
+    def write(self, cardReport):
+        # one row per distinct card number, in order of first appearance
+        for record in cardReport.getAllRecords():
+            self.writeHit(record.ccNumber, record.valid, record.getSources(), record.iin, record.hits)
+
+    def writeRejects(self, prefilter=None):
+        # compact summary sheet of the false positive hits, by reason, and whether
+        # they were left out of the report or only flagged in it
+        if not self.fileNameExcel:
+            return
+        sheetRejects = self.book.add_sheet("Rejects")
+        styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
+        sheetRejects.write(0,0,"Reason", styleRowHeaders)
+        sheetRejects.write(0,1,"Hits", styleRowHeaders)
+        sheetRejects.write(0,2,"Status", styleRowHeaders)
+        baseCell = 1
+        if prefilter:
+            status = self.REJECTED if prefilter.removing else self.FLAGGED
+            for reason in prefilter.REASONS:
+                sheetRejects.write(baseCell,0,reason)
+                sheetRejects.write(baseCell,1,prefilter.counts[reason])
+                sheetRejects.write(baseCell,2,status)
+                baseCell += 1
+        sheetRejects.write(baseCell,0,self.NOT_VALID)
+        sheetRejects.write(baseCell,1,self.invalidHits)
+        sheetRejects.write(baseCell,2,self.REJECTED if self.dropInvalid else self.FLAGGED)
+
+    def getStats(self):
+        return "%d rows written, %d hits not valid, %d rows (%d hits) dropped as not valid" % (self.writtenRows, self.invalidHits,
+            self.droppedRows, self.droppedHits)
+
+    def close(self):
+        if self.fileNameCSV:
+            self.report.close()
+        if self.fileNameExcel:
+            self.book.save(self.fileNameExcel)
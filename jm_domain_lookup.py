@@ -1,31 +1,221 @@
 # *************************************************************************
-# * Class (Task): check if domain is valid by performing DNS Lookup on it *
+# * Class: check if domains are valid by performing DNS Lookups on them   *
 # *************************************************************************
-import os
-import urllib2
-import java.net.InetAddress
-import java.net.UnknownHostException
-import random
-
-from time import sleep
+import socket
+import time
 
+try:
+    from Queue import Queue
+    from Queue import Empty
+except ImportError:
+    from queue import Queue
+    from queue import Empty
 from threading import Thread
+from threading import Lock
+from threading import Event
+
+from jm_rate_limiter import TokenBucket
+
+try:
+    import java.net.InetAddress
+    import java.net.UnknownHostException
+
+    def javaLookup(name):
+        try:
+            java.net.InetAddress.getByName(name)
+            return True
+        except java.net.UnknownHostException as e:
+            return False
+except ImportError:
+    javaLookup = None
+
+
+# getaddrinfo errors that mean the name does not exist; anything else (e.g.
+# EAI_AGAIN, a temporary resolver failure) is left to the retry logic
+NAME_NOT_FOUND = set(getattr(socket, code) for code in ("EAI_NONAME", "EAI_NODATA") if hasattr(socket, code))
+
+
+def socketLookup(name):
+    try:
+        socket.gethostbyname(name)
+        return True
+    except socket.gaierror as e:
+        if e.args and e.args[0] in NAME_NOT_FOUND:
+            return False
+        raise
+
+
+class LookupTimeout(Exception):
+    pass
+
+
+class LookupTask(object):
+    # a query handed to the lookup threads; cancelled once its caller gave up on it
+
+    def __init__(self, name):
+        self.name = name
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.done = Event()
+
 
+# result of a name that could not be resolved after all retries (timeouts or
+# resolver errors): neither valid nor invalid, and never cached
+UNKNOWN = None
 
-class DomainLookupTask(Thread):
-    def __init__ (self, qu_in, qu_out_valid, qu_out_invalid):
-        Thread.__init__(self)
-        self.qu_in = qu_in
-        self.qu_out_valid = qu_out_valid
-        self.qu_out_invalid = qu_out_invalid
-    def run(self):
-        # wait for 0-2 seconds before starting task
-        sleep(random.uniform(0,2))
-        while (not self.qu_in.empty()):
-            url = self.qu_in.get(block = True, timeout = 5)
+
+class DomainResolver(object):
+
+    # maximum number of queries in flight at any time
+    MAX_IN_FLIGHT = 64
+
+    # seconds to wait for a single query before it is abandoned and retried
+    TIMEOUT = 5.0
+
+    # maximum number of threads running the (blocking) lookups, per in-flight query
+    HELPERS_PER_QUERY = 2
+
+    # number of retries of a failed or timed out query, and base backoff (doubled on each retry)
+    RETRIES = 2
+    BACKOFF = 0.5
+
+    def __init__(self, lookup=None, maxInFlight=MAX_IN_FLIGHT, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF, rateLimit=None,
+                 maxHelpers=None):
+        # lookup(name) must return True if name resolves and False if it does not
+        # exist; any exception it raises is treated as a transient failure
+        self.lookup = lookup or javaLookup or socketLookup
+        self.maxInFlight = max(1, maxInFlight)
+        self.maxHelpers = max(1, maxHelpers or self.HELPERS_PER_QUERY * self.maxInFlight)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.rateLimiter = TokenBucket(rateLimit) if rateLimit else None
+        self.lock = Lock()
+        self.results = {}
+        self.inFlight = {}
+        self.tasks = Queue()
+        self.helpers = 0
+        self.pending = 0
+        self.queries = 0
+        self.failures = 0
+
+    def lookupWithTimeout(self, name):
+        if not self.timeout:
+            return self.lookup(name)
+        # blocking resolvers have no timeout of their own, so the query runs on
+        # one of a bounded set of lookup threads and is abandoned if it does not
+        # answer in time; a thread stuck on a hung query stays busy, and once all
+        # of them are, queries simply time out instead of starting new threads
+        task = LookupTask(name)
+        with self.lock:
+            self.pending += 1
+            if self.pending > self.helpers and self.helpers < self.maxHelpers:
+                self.helpers += 1
+                t = Thread(target=self.runLookups)
+                t.daemon = True
+                t.start()
+        self.tasks.put(task)
+        if not task.done.wait(self.timeout):
+            task.cancelled = True
+            raise LookupTimeout(name)
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def runLookups(self):
+        while True:
+            task = self.tasks.get()
+            if not task.cancelled:
+                try:
+                    task.result = self.lookup(task.name)
+                except Exception as e:
+                    task.error = e
+                task.done.set()
+            with self.lock:
+                self.pending -= 1
+
+    def query(self, name):
+        # True if name resolves, False if it does not exist, UNKNOWN if every attempt failed
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            if self.rateLimiter:
+                self.rateLimiter.acquire()
+            with self.lock:
+                self.queries += 1
             try:
-                inetHost = java.net.InetAddress.getByName(url)
-                hostName = inetHost.getHostName()
-                self.qu_out_valid.put(url)
-            except java.net.UnknownHostException as e:
-                self.qu_out_invalid.put(url)
\ No newline at end of file
+                return bool(self.lookupWithTimeout(name))
+            except Exception as e:
+                pass
+        # name could not be resolved after all retries
+        with self.lock:
+            self.failures += 1
+        return UNKNOWN
+
+    def resolve(self, name):
+        # concurrent requests for the same name share a single query
+        with self.lock:
+            if name in self.results:
+                return self.results[name]
+            pending = self.inFlight.get(name)
+            if pending is None:
+                pending = self.inFlight[name] = Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            pending.wait()
+            return self.results[name]
+        valid = UNKNOWN
+        try:
+            valid = self.query(name)
+        finally:
+            with self.lock:
+                self.results[name] = valid
+                del self.inFlight[name]
+            pending.set()
+        return valid
+
+    def resolveAll(self, names, onResult=None):
+        # resolves every name with up to maxInFlight concurrent queries and returns
+        # the (valid, invalid, unknown) lists; onResult(name, valid) is called as
+        # results arrive, with valid True, False or UNKNOWN
+        q_in = Queue()
+        queued = set()
+        for name in names:
+            if not name in queued:
+                queued.add(name)
+                q_in.put(name)
+        valid = []
+        invalid = []
+        unknown = []
+
+        def worker():
+            while True:
+                try:
+                    name = q_in.get(block = False)
+                except Empty:
+                    return
+                isValid = self.resolve(name)
+                with self.lock:
+                    if isValid is UNKNOWN:
+                        unknown.append(name)
+                    elif isValid:
+                        valid.append(name)
+                    else:
+                        invalid.append(name)
+                if onResult:
+                    onResult(name, isValid)
+
+        thread_pool = list()
+        for i in range(min(self.maxInFlight, q_in.qsize())):
+            t = Thread(target=worker)
+            t.start()
+            thread_pool.append(t)
+        for t in thread_pool:
+            t.join()
+        return valid, invalid, unknown
+
+    def getStats(self):
+        return "%d names, %d queries, %d unresolved after retries, %d lookup threads" % (len(self.results), self.queries, self.failures, self.helpers)
@@ -0,0 +1,31 @@
+# *************************************************************************
+# * Functions: parse and syntax-check email addresses (once per address)  *
+# *************************************************************************
+import re
+
+# alphanumeric syntax check (RFC5322, adjusted to the most common implementations)
+EMAIL_PATTERN = re.compile(r'^[_a-z0-9-]+(\.[_a-z0-9-]+)*@[a-z0-9-]+(\.[a-z0-9-]+)*(\.[a-z]{2,4})$')
+
+
+def parseEmail(email, match=EMAIL_PATTERN.match):
+    # returns an (email, localPart, domain, tld, alphaCheck) tuple for the
+    # lower case address; domain is what follows the last "@" and tld what
+    # follows the last ".", as the report has always shown them
+    email = email.lower()
+    localPart, at, domain = email.rpartition("@")
+    tld = email[email.rfind(".") + 1:]
+    return (email, localPart, domain, tld, match(email) is not None)
+
+
+def parseEmails(emails):
+    # batch version of parseEmail; repeated addresses (common in keyword hits)
+    # are parsed once and share the same tuple
+    parsedByEmail = {}
+    parsed = []
+    append = parsed.append
+    for email in emails:
+        result = parsedByEmail.get(email)
+        if result is None:
+            result = parsedByEmail[email] = parseEmail(email)
+        append(result)
+    return parsed
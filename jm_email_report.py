@@ -0,0 +1,339 @@
+# *************************************************************************
+# * Email report store, domain/Wayback lookup stages and report writer    *
+# *                                                                       *
+# * Pure Python, shared by the Autopsy report module (reportmodule.py)    *
+# * and the command line runner (fea_cli.py)                              *
+# *************************************************************************
+import xlwt
+
+from jm_email_parser import EMAIL_PATTERN
+from jm_email_parser import parseEmail
+from jm_email_parser import parseEmails
+
+
+#   /$$$$$$$                                            /$$            /$$$$$$  /$$                             
+#  | $$__  $$                                          | $$           /$$__  $$| $$                             
+#  | $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$   /$$$$$$  /$$$$$$        | $$  \__/| $$  /$$$$$$   /$$$$$$$ /$$$$$$$
+#  | $$$$$$$/ /$$__  $$ /$$__  $$ /$$__  $$ /$$__  $$|_  $$_/        | $$      | $$ |____  $$ /$$_____//$$_____/
+#  | $$__  $$| $$$$$$$$| $$  \ $$| $$  \ $$| $$  \__/  | $$          | $$      | $$  /$$$$$$$|  $$$$$$|  $$$$$$ 
+#  | $$  \ $$| $$_____/| $$  | $$| $$  | $$| $$        | $$ /$$      | $$    $$| $$ /$$__  $$ \____  $$\____  $$
+#  | $$  | $$|  $$$$$$$| $$$$$$$/|  $$$$$$/| $$        |  $$$$/      |  $$$$$$/| $$|  $$$$$$$ /$$$$$$$//$$$$$$$/
+#  |__/  |__/ \_______/| $$____/  \______/ |__/         \___/         \______/ |__/ \_______/|_______/|_______/ 
+#                      | $$                                                                                     
+#                      | $$                                                                                     
+#                      |__/                                                                                         
+# ***********************************************************************
+# * EMAIL REPORT class                                                  *
+# *                                                                     *
+# * Maintains full list of email as EmailRecord class objects, indexed  *
+# * by domain                                                           *
+# *                                                                     *
+# ***********************************************************************
+
+class EmailReport(object):
+
+    def __init__(self, tldList):
+        self.recordList = []
+        self.recordCount = 0
+
+        # indexes maintained as records are added, so that queries and bulk
+        # updates only touch the records belonging to the affected domain
+        self.domainIndex = {}           # domain -> list of EmailRecord
+        self.domainList = []            # domains, in order of first appearance
+        self.tldValidDomains = set()    # domains with at least one valid TLD record
+        self.validDomains = set()       # domains confirmed by DNS lookup
+        self.validEmails = []           # first record of each valid (email, source file) pair
+        self.validEmailSources = {}     # email -> source file, or set of source files
+        self.stringPool = {}
+
+        # set of valid (upper case) TLDs, e.g. a TLDRegistry
+        self.tldList = tldList
+
+    def addEmailRecord(self, newEmailRecord):
+        self.recordList.append(newEmailRecord)
+        self.recordCount += 1
+
+        domain = newEmailRecord.getDomain()
+        domainRecords = self.domainIndex.get(domain)
+        if domainRecords is None:
+            domainRecords = self.domainIndex[domain] = []
+            self.domainList.append(domain)
+        domainRecords.append(newEmailRecord)
+
+        if newEmailRecord.getTLDCheck():
+            self.tldValidDomains.add(domain)
+            if newEmailRecord.alphaCheck:
+                # most addresses come from a single source file, so a set is
+                # only allocated once a second one shows up
+                email = newEmailRecord.getEmail()
+                sourceFile = newEmailRecord.getSourceFile()
+                sources = self.validEmailSources.get(email)
+                if sources is None:
+                    self.validEmailSources[email] = sourceFile
+                elif isinstance(sources, set):
+                    if sourceFile in sources:
+                        return
+                    sources.add(sourceFile)
+                elif sources == sourceFile:
+                    return
+                else:
+                    self.validEmailSources[email] = set((sources, sourceFile))
+                self.validEmails.append(newEmailRecord)
+
+    def addNewEmailRecord(self, email, sourceFile):
+        self.addParsedEmailRecord(parseEmail(email), sourceFile)
+
+    def addNewEmailRecords(self, emails, sourceFiles):
+        # parses and validates a whole batch of addresses in one go
+        for parsed, sourceFile in zip(parseEmails(emails), sourceFiles):
+            self.addParsedEmailRecord(parsed, sourceFile)
+
+    def addParsedEmailRecord(self, parsed, sourceFile):
+        newRecord = self.EmailRecord(parsed[0], self.shareString(sourceFile), False, False, False, parsed)
+        newRecord.domain = self.shareString(newRecord.domain)
+        newRecord.tld = self.shareString(newRecord.tld)
+        newRecord.checkTLD(self.tldList)
+        self.addEmailRecord(newRecord)
+
+    def shareString(self, value):
+        # domains, TLDs and source files repeat across records, keep a single copy of each
+        return self.stringPool.setdefault(value, value)
+
+    def getRecordById(self, id):
+        if 0 <= id < self.recordCount:
+            return self.recordList[id]
+        return None
+
+    def getAllRecords(self):
+        return self.recordList
+
+    def getTotalRecords(self):
+        return self.recordCount
+
+    def getListOfUniqueDomains(self):
+        # returns list of de-duped list of domains with valid TLDs
+        return [d for d in self.domainList if d in self.tldValidDomains]
+
+    def getListOfValidDomains(self):
+        return [d for d in self.domainList if d in self.tldValidDomains and d in self.validDomains]
+
+    def getListOfValidEmailAddresses(self):
+        return [(rec.getEmail(), rec.getSourceFile()) for rec in self.validEmails]
+
+    def getHitsForDomain(self, domain):
+        return len(self.domainIndex.get(domain, ()))
+
+    def setDomains(self, domain, lookup):
+        for rec in self.domainIndex.get(domain, ()):
+            rec.setDomainCheck(lookup)
+        if lookup:
+            self.validDomains.add(domain)
+        else:
+            self.validDomains.discard(domain)
+
+    def setWaybackResult(self, domain, wb):
+        for rec in self.domainIndex.get(domain, ()):
+            rec.wb = wb
+
+    def updateDomainCheck(self, id, domainCheck):
+        self.recordList[id].setDomainCheck(domainCheck)
+
+    def getReportRows(self):
+        for r in self.recordList:
+            yield r.getEmailReportRow()
+
+    def getUniqueReportRows(self):
+        uniqueList = []
+        seen = set()
+        for r in self.getReportRows():
+            if not r in seen:
+                seen.add(r)
+                uniqueList.append(r)
+        return uniqueList
+
+
+    class EmailRecord(object):
+        # no per-instance dict, records are kept in memory for the whole report run
+        __slots__ = ("email", "domain", "tld", "alphaCheck", "sourceFile", "tldCheck", "domainCheck", "wb", "domainChecked")
+
+        def __init__(self, email, sourceFile, tldCheck, domainCheck, domainChecked, parsed=None):
+            # the address is split and syntax-checked once, here
+            if parsed is None:
+                parsed = parseEmail(email)
+            self.email = email
+            self.domain = parsed[2]
+            self.tld = parsed[3]
+            self.alphaCheck = parsed[4]
+            self.sourceFile = sourceFile
+            self.tldCheck = tldCheck
+            self.domainCheck = domainCheck
+            self.wb = "n.a.;"
+            self.domainChecked = domainChecked
+
+        def setDomainCheck(self, domainCheck):
+            self.domainCheck = domainCheck
+            self.domainChecked = True
+
+        def getDomain(self):
+            return self.domain
+
+        def getEmail(self):
+            return self.email
+
+        def getSourceFile(self):
+            return self.sourceFile
+
+        def getTLD(self):
+            return self.tld
+
+        def getTLDCheck(self):
+            return self.tldCheck
+
+        def getAlphaCheck(self):
+            return self.alphaCheck
+
+        def checkAlpha(self):
+            self.alphaCheck = EMAIL_PATTERN.match(self.email) is not None
+
+        def checkTLD(self, tldList):
+            self.tldCheck = self.tld.upper() in tldList
+
+        def getEmailReportRow(self):
+            alphaCheckRes = "0"
+            tldRes = "0"
+            domainRes = "0"
+            domainCheckedStatus = "0"
+            if self.alphaCheck:
+                alphaCheckRes = "1"
+            if self.tldCheck:
+                tldRes = "1"
+            if self.domainCheck:
+                domainRes = "1"
+            if self.domainChecked:
+                domainCheckedStatus = "1"
+            return self.email + ";" + alphaCheckRes + ";" + self.getTLD() + ";"  + tldRes + ";" + self.getDomain() + ";" + domainCheckedStatus + ";" + domainRes + ";" + self.wb
+
+
+# ***********************************************************************
+# * Lookup stages                                                       *
+# ***********************************************************************
+
+def lookupDomains(reportDB, resolver, verdictCache=None):
+    # resolves every unique domain with a valid TLD (reusing cached verdicts)
+    # and returns the list of domains that do not resolve; domains the resolver
+    # could not get an answer for are left as not checked, and not cached
+    uniqueDomains = reportDB.getListOfUniqueDomains()
+    cachedDomains = {}
+    if verdictCache:
+        cachedDomains = verdictCache.getMany("dns", uniqueDomains)
+    invalidDomains = []
+    for url, (valid, value) in cachedDomains.items():
+        reportDB.setDomains(url, valid)
+        if not valid:
+            invalidDomains.append(url)
+
+    validDomains, newInvalidDomains, unknownDomains = resolver.resolveAll([url for url in uniqueDomains if not url in cachedDomains])
+
+    newVerdicts = []
+    for url in validDomains:
+        reportDB.setDomains(url, True)
+        newVerdicts.append((url, True, None))
+    for url in newInvalidDomains:
+        reportDB.setDomains(url, False)
+        newVerdicts.append((url, False, None))
+        invalidDomains.append(url)
+    if verdictCache:
+        verdictCache.putMany("dns", newVerdicts)
+    return invalidDomains
+
+
+def lookupWayback(reportDB, domains, waybackClient, verdictCache=None):
+    # snapshots never disappear from the archive, so found records use the positive TTL
+    cachedWayback = {}
+    if verdictCache:
+        cachedWayback = verdictCache.getMany("wayback", domains)
+    for url, (archived, wb) in cachedWayback.items():
+        reportDB.setWaybackResult(url, wb)
+
+    waybackResults = waybackClient.lookupAll([url for url in domains if not url in cachedWayback])
+
+    newVerdicts = []
+    for url, wb in waybackResults.items():
+        reportDB.setWaybackResult(url, wb)
+        newVerdicts.append((url, wb != "NoRecord", wb))
+    if verdictCache:
+        verdictCache.putMany("wayback", newVerdicts)
+
+
+
+# ***********************************************************************
+# * Report writer (CSV and/or Excel workbook)                           *
+# ***********************************************************************
+
+class EmailReportWriter(object):
+
+    CSV_HEADER = "artifact email;Alphanumeric check;TLD;TLD check;domain;domain checked?;domain check;internet archive check\n"
+
+    def __init__(self, fileNameCSV=None, fileNameExcel=None):
+        self.fileNameCSV = fileNameCSV
+        self.fileNameExcel = fileNameExcel
+
+        # Create Excel Workbook
+        if fileNameExcel:
+            self.book = xlwt.Workbook(encoding="utf-8")
+            self.sheetDomains = self.book.add_sheet("Interesting domains")
+            self.sheetFalsePositives = self.book.add_sheet("Detail")
+            self.sheetTruePositives = self.book.add_sheet("Valid Emails")
+            styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
+            self.sheetFalsePositives.write(0,0,"Email", styleRowHeaders)
+            self.sheetFalsePositives.write(0,1,"Alphanumeric check", styleRowHeaders)
+            self.sheetFalsePositives.write(0,2,"TLD", styleRowHeaders)
+            self.sheetFalsePositives.write(0,3,"TLD check", styleRowHeaders)
+            self.sheetFalsePositives.write(0,4,"Domain", styleRowHeaders)
+            self.sheetFalsePositives.write(0,5,"Domain Checked?", styleRowHeaders)
+            self.sheetFalsePositives.write(0,6,"Domain check", styleRowHeaders)
+            self.sheetFalsePositives.write(0,7,"Internet archive check", styleRowHeaders)
+            self.sheetDomains.write(0,0,"Domain name", styleRowHeaders)
+            self.sheetDomains.write(0,1,"Hits", styleRowHeaders)
+            self.sheetTruePositives.write(0,0,"Email", styleRowHeaders)
+            self.sheetTruePositives.write(0,1,"Source", styleRowHeaders)
+
+        # Open report file for writing
+        if fileNameCSV:
+            self.report = open(fileNameCSV, 'w')
+
+            # write csv header row
+            self.report.write(self.CSV_HEADER)
+
+    def write(self, reportDB):
+        baseCell = 1
+        
+        for row in reportDB.getUniqueReportRows():
+            if self.fileNameCSV:
+                self.report.write(row)
+                self.report.write("\n")
+            if self.fileNameExcel:
+                items = row.split(";")
+                # fill 8 columns in report
+                for n in range(8):
+                    self.sheetFalsePositives.write(baseCell,n,items[n])
+            baseCell += 1
+
+        if self.fileNameExcel:
+            baseCell = 1
+            for rec in reportDB.getListOfValidDomains():
+                self.sheetDomains.write(baseCell, 0, rec)
+                self.sheetDomains.write(baseCell, 1, reportDB.getHitsForDomain(rec))
+                baseCell += 1
+
+            baseCell = 1
+            for emailAddr, sourceFile in reportDB.getListOfValidEmailAddresses():
+                self.sheetTruePositives.write(baseCell,0,emailAddr)
+                self.sheetTruePositives.write(baseCell,1,sourceFile)
+                baseCell += 1
+
+    def close(self):
+        if self.fileNameExcel:
+            self.book.save(self.fileNameExcel)
+        if self.fileNameCSV:
+            self.report.close()
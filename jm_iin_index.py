@@ -0,0 +1,152 @@
+# *************************************************************************
+# * Class: issuer identification number (IIN/BIN) range index, maps card  *
+# * numbers to brand, valid lengths and (optionally) issuer               *
+# *************************************************************************
+import csv
+import heapq
+import io
+import os
+import sys
+
+from bisect import bisect_right
+
+
+# (brand, length check, issuer) reported for numbers outside every known range
+IIN_UNKNOWN = ("Unknown", "n.a.", "")
+
+
+if sys.version_info[0] < 3:
+    # the Python 2 (and Jython 2.7) csv module only handles byte strings, so
+    # fields are decoded after parsing
+    def readRows(fileName):
+        with open(fileName, "rb") as f:
+            for row in csv.reader(line for line in f if line.strip() and not line.startswith("#")):
+                yield [field.decode("utf-8") for field in row]
+else:
+    def readRows(fileName):
+        with io.open(fileName, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(line for line in f if line.strip() and not line.startswith("#")):
+                yield row
+
+
+class IINRange(object):
+    # no per-instance dict, one per row of the IIN table
+    __slots__ = ("brand", "lengths", "issuer", "valid", "invalid")
+
+    def __init__(self, brand, lengths, issuer):
+        self.brand = brand
+        self.lengths = lengths
+        self.issuer = issuer
+        # report tuples, shared by every number in the range
+        self.valid = (brand, "Valid", issuer)
+        self.invalid = (brand, "Not Valid", issuer)
+
+
+class IINIndex(object):
+
+    # brand level table shipped with the module, used when no other table is given
+    SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iin-ranges.csv")
+
+    # number of leading digits of the card number used as lookup key (8 digit BINs)
+    KEY_DIGITS = 8
+
+    def __init__(self, fileName=SNAPSHOT_FILE):
+        self.fileName = fileName
+        self.starts = []
+        self.ends = []
+        self.ranges = []
+        self.rowCount = 0
+
+    @staticmethod
+    def parseLengths(text):
+        # "16", "16-19" or "13|16|19" -> frozenset of lengths
+        lengths = set()
+        for part in text.split("|"):
+            low, sep, high = part.partition("-")
+            lengths.update(range(int(low), int(high or low) + 1))
+        return frozenset(lengths)
+
+    def load(self):
+        rows = []
+        for row in readRows(self.fileName):
+            low, high, brand, lengths = [field.strip() for field in row[:4]]
+            issuer = row[4].strip() if len(row) > 4 else ""
+            rows.append((low, high, IINRange(brand, self.parseLengths(lengths), issuer)))
+        if not rows:
+            raise ValueError("no IIN ranges found in " + self.fileName)
+        self.build(rows)
+        return self
+
+    def build(self, rows):
+        # turns (low prefix, high prefix, IINRange) rows, which may overlap, into
+        # sorted non-overlapping key ranges; where rows overlap the narrowest wins
+        width = self.KEY_DIGITS
+        events = []
+        for n, (low, high, iinRange) in enumerate(rows):
+            start = int(low[:width].ljust(width, "0"))
+            end = int(high[:width].ljust(width, "9"))
+            events.append((start, n, end, iinRange))
+        events.sort()
+
+        segments = []
+        active = []     # heap of (size, row, end, IINRange) of the rows covering the current key
+        position = 0
+        i = 0
+        while i < len(events) or active:
+            # drop rows that ended before the current position
+            while active and active[0][2] < position:
+                heapq.heappop(active)
+            if not active:
+                if i >= len(events):
+                    break
+                position = events[i][0]
+            while i < len(events) and events[i][0] <= position:
+                start, n, end, iinRange = events[i]
+                heapq.heappush(active, (end - start, n, end, iinRange))
+                i += 1
+            while active and active[0][2] < position:
+                heapq.heappop(active)
+            if not active:
+                continue
+            # the narrowest row applies up to its end or the start of the next row
+            size, n, end, iinRange = active[0]
+            if i < len(events):
+                end = min(end, events[i][0] - 1)
+            if segments and segments[-1][2] is iinRange and segments[-1][1] == position - 1:
+                segments[-1][1] = end
+            else:
+                segments.append([position, end, iinRange])
+            position = end + 1
+
+        self.starts = [segment[0] for segment in segments]
+        self.ends = [segment[1] for segment in segments]
+        self.ranges = [segment[2] for segment in segments]
+        self.rowCount = len(rows)
+
+    def lookup(self, cardNumber):
+        # returns the IINRange of a card number, or None; O(log n) in the number of ranges
+        prefix = cardNumber[:self.KEY_DIGITS]
+        if not prefix.isdigit():
+            return None
+        key = int(prefix.ljust(self.KEY_DIGITS, "0"))
+        i = bisect_right(self.starts, key) - 1
+        if i >= 0 and key <= self.ends[i]:
+            return self.ranges[i]
+        return None
+
+    def classify(self, cardNumber):
+        # returns the (brand, length check, issuer) report tuple of a card number
+        iinRange = self.lookup(cardNumber)
+        if iinRange is None:
+            return IIN_UNKNOWN
+        if len(cardNumber) in iinRange.lengths:
+            return iinRange.valid
+        return iinRange.invalid
+
+    def classifyMany(self, cardNumbers):
+        # bulk version of classify
+        classify = self.classify
+        return [classify(cardNumber) for cardNumber in cardNumbers]
+
+    def __len__(self):
+        return self.rowCount
@@ -0,0 +1,44 @@
+# *************************************************************************
+# * Class: token bucket rate limiter shared by the network lookup clients *
+# *************************************************************************
+import time
+
+from threading import Lock
+
+
+class TokenBucket(object):
+    def __init__(self, rate, capacity=None, clock=time.time, sleep=time.sleep):
+        # rate is the number of tokens (requests) added per second, capacity the
+        # largest burst allowed after an idle period
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = Lock()
+        self.waitTime = 0.0
+
+    def refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def tryAcquire(self, tokens=1):
+        # takes the tokens if available and returns 0, otherwise returns the
+        # number of seconds to wait before they will be
+        with self.lock:
+            self.refill(self.clock())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        # blocks until the tokens are available; only sleeps when actually needed
+        while True:
+            wait = self.tryAcquire(tokens)
+            if wait <= 0:
+                return
+            self.waitTime += wait
+            self.sleep(wait)
@@ -0,0 +1,134 @@
+# *************************************************************************
+# * Functions: secp256k1 public key derivation, in Jacobian coordinates   *
+# * with a precomputed fixed-base table of the generator                  *
+# *************************************************************************
+
+
+# curve y^2 = x^3 + 7 over the prime field of P, generator (GX, GY) of order N (SEC 2)
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+GX = 0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798
+GY = 0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8
+
+# bits of the secret handled by each row of the generator table: 32 rows of
+# 255 points, so a public key costs 32 point additions and no doublings
+WINDOW_BITS = 8
+WINDOW_MASK = (1 << WINDOW_BITS) - 1
+WINDOWS = (256 + WINDOW_BITS - 1) // WINDOW_BITS
+
+# points are (X, Y, Z) Jacobian triples, x = X/Z^2 and y = Y/Z^3; Z = 0 is the
+# point at infinity
+INFINITY = (1, 1, 0)
+
+
+try:
+    pow(2, -1, 3)
+
+    def inverse(a):
+        return pow(a, -1, P)
+except (TypeError, ValueError):
+    # no modular inverse in pow() before Python 3.8; P is prime, so a^(P-2) is the inverse of a
+    def inverse(a):
+        return pow(a, P - 2, P)
+
+
+def jacobianDouble(point):
+    X1, Y1, Z1 = point
+    if not Z1 or not Y1:
+        return INFINITY
+    YY = Y1 * Y1 % P
+    S = 4 * X1 * YY % P
+    M = 3 * X1 * X1 % P
+    X3 = (M * M - 2 * S) % P
+    return X3, (M * (S - X3) - 8 * YY * YY) % P, 2 * Y1 * Z1 % P
+
+
+def jacobianAddAffine(point, x2, y2):
+    # point + (x2, y2); the affine operand saves the multiplications by its Z
+    X1, Y1, Z1 = point
+    if not Z1:
+        return x2, y2, 1
+    Z1Z1 = Z1 * Z1 % P
+    H = (x2 * Z1Z1 - X1) % P
+    r = (y2 * Z1 * Z1Z1 - Y1) % P
+    if not H:
+        if not r:
+            return jacobianDouble(point)
+        return INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+    X3 = (r * r - HHH - 2 * V) % P
+    return X3, (r * (V - X3) - Y1 * HHH) % P, Z1 * H % P
+
+
+def toAffine(point):
+    X, Y, Z = point
+    if not Z:
+        raise ValueError("point at infinity")
+    zInv = inverse(Z)
+    zInv2 = zInv * zInv % P
+    return X * zInv2 % P, Y * zInv2 * zInv % P
+
+
+def toAffineMany(points):
+    # converts finite points with a single inversion (Montgomery's trick)
+    products = []
+    product = 1
+    for X, Y, Z in points:
+        product = product * Z % P
+        products.append(product)
+    productInv = inverse(product)
+    affine = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        zInv = productInv * products[i - 1] % P if i else productInv
+        productInv = productInv * Z % P
+        zInv2 = zInv * zInv % P
+        affine[i] = (X * zInv2 % P, Y * zInv2 * zInv % P)
+    return affine
+
+
+def buildGeneratorTable():
+    # row i holds the affine points j * 2^(WINDOW_BITS * i) * G, j = 1..2^WINDOW_BITS - 1
+    # (index 0, the point at infinity, is None)
+    table = []
+    baseX, baseY = GX, GY
+    for i in range(WINDOWS):
+        points = []
+        point = INFINITY
+        for j in range(WINDOW_MASK):
+            point = jacobianAddAffine(point, baseX, baseY)
+            points.append(point)
+        table.append([None] + toAffineMany(points))
+        # next base: 2^WINDOW_BITS times this one
+        point = jacobianDouble(points[WINDOW_MASK // 2])
+        baseX, baseY = toAffine(point)
+    return table
+
+
+# built on first use, shared by all derivations
+generatorTable = None
+
+def getGeneratorTable():
+    global generatorTable
+    if generatorTable is None:
+        generatorTable = buildGeneratorTable()
+    return generatorTable
+
+
+def publicKey(secret):
+    # secret * G as an affine (x, y) pair; raises ValueError for secrets outside 1..N-1
+    if not 0 < secret < N:
+        raise ValueError("secret exponent out of range")
+    table = getGeneratorTable()
+    point = INFINITY
+    for row in table:
+        digit = secret & WINDOW_MASK
+        if digit:
+            x, y = row[digit]
+            point = jacobianAddAffine(point, x, y)
+        secret >>= WINDOW_BITS
+        if not secret:
+            break
+    return toAffine(point)
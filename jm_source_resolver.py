@@ -0,0 +1,82 @@
+# *************************************************************************
+# * Class: resolve source file names of blackboard artifacts in batches   *
+# *************************************************************************
+from collections import OrderedDict
+
+
+def iterChunks(items, size):
+    # yields consecutive lists of (at most) size items taken from any iterable
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Object ids are those of the files the artifacts were found in, as returned by
+# BlackboardArtifact.getObjectID() (the id of the artifact's source content; the
+# artifact's own id is getArtifactID()), so that findAllFilesWhere finds them
+
+class SourceFileResolver(object):
+
+    # number of object ids resolved by each "obj_id IN (...)" query
+    CHUNK_SIZE = 500
+
+    # maximum number of resolved names kept in memory (least recently used are dropped)
+    CACHE_SIZE = 100000
+
+    def __init__(self, sleuthkitCase, chunkSize=CHUNK_SIZE, cacheSize=CACHE_SIZE):
+        self.sleuthkitCase = sleuthkitCase
+        self.chunkSize = max(1, chunkSize)
+        self.cacheSize = max(1, cacheSize)
+        self.cache = OrderedDict()
+        self.queryCount = 0
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, objIds):
+        # resolves every object id not yet cached, chunkSize ids per query
+        missing = []
+        pending = set()
+        for objId in objIds:
+            if not objId in self.cache and not objId in pending:
+                pending.add(objId)
+                missing.append(objId)
+        for chunk in iterChunks(missing, self.chunkSize):
+            self.resolveChunk(chunk)
+
+    def resolveChunk(self, objIds):
+        names = {}
+        sourceFiles = self.sleuthkitCase.findAllFilesWhere("obj_id IN (" + ",".join([str(objId) for objId in objIds]) + ")")
+        self.queryCount += 1
+        for file in sourceFiles:
+            objId = file.getId()
+            if objId in names:
+                names[objId] = names[objId] + " & " + file.getName()
+            else:
+                names[objId] = file.getName()
+        for objId in objIds:
+            self.store(objId, names.get(objId, ""))
+
+    def store(self, objId, name):
+        self.cache.pop(objId, None)
+        self.cache[objId] = name
+        while len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+
+    def getSourceFile(self, objId):
+        # returns the name(s) of the file(s) with the given object id, joined by " & "
+        if objId in self.cache:
+            self.hits += 1
+            name = self.cache.pop(objId)
+            self.cache[objId] = name
+            return name
+        self.misses += 1
+        self.resolveChunk([objId])
+        return self.cache[objId]
+
+    def getStats(self):
+        return "%d queries, %d cache hits, %d cache misses" % (self.queryCount, self.hits, self.misses)
@@ -0,0 +1,111 @@
+# *************************************************************************
+# * Class: registry of valid top level domains (IANA root zone database)  *
+# *************************************************************************
+import os
+import time
+
+from email.utils import formatdate
+
+try:
+    import urllib2
+except ImportError:
+    import urllib.request as urllib2
+
+
+class TLDRegistry(object):
+
+    IANA_ADDR = "https://data.iana.org/TLD/tlds-alpha-by-domain.txt"
+
+    # fallback list shipped with the module, used when there is no usable copy of the
+    # IANA list; derived from the Public Suffix List, its first line says so in place
+    # of the IANA version line
+    SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tlds-fallback.txt")
+
+    # seconds after which the local copy is revalidated against IANA
+    MAX_AGE = 24 * 3600
+
+    # socket timeout (in seconds) of the refresh request
+    TIMEOUT = 10
+
+    def __init__(self, cacheFile=None, maxAge=MAX_AGE, url=IANA_ADDR, snapshotFile=SNAPSHOT_FILE):
+        self.cacheFile = cacheFile
+        self.maxAge = maxAge
+        self.url = url
+        self.snapshotFile = snapshotFile
+        self.tlds = frozenset()
+        self.source = None
+        self.version = None
+
+    @staticmethod
+    def parse(text):
+        # returns (version, frozenset of upper case TLDs) from the IANA text format
+        version = None
+        tlds = set()
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("#"):
+                if version is None:
+                    version = line.lstrip("# ")
+            elif line:
+                tlds.add(line.upper())
+        return version, frozenset(tlds)
+
+    def loadFile(self, fileName, source):
+        with open(fileName, "r") as f:
+            version, tlds = self.parse(f.read())
+        if not tlds:
+            raise ValueError("no TLDs found in " + fileName)
+        self.version, self.tlds, self.source = version, tlds, source
+        return self
+
+    def refresh(self):
+        # conditional request: IANA answers 304 if the cached copy is still current
+        req = urllib2.Request(self.url)
+        if self.cacheFile and os.path.exists(self.cacheFile):
+            req.add_header("If-Modified-Since", formatdate(os.path.getmtime(self.cacheFile), usegmt=True))
+        try:
+            response = urllib2.urlopen(req, timeout=self.TIMEOUT)
+        except urllib2.HTTPError as e:
+            if e.code == 304:
+                os.utime(self.cacheFile, None)
+                return self.loadFile(self.cacheFile, "cache (revalidated)")
+            raise
+        text = response.read()
+        if not isinstance(text, str):
+            text = text.decode("ascii")
+        version, tlds = self.parse(text)
+        if not tlds:
+            raise ValueError("no TLDs found in " + self.url)
+        if self.cacheFile:
+            with open(self.cacheFile, "w") as f:
+                f.write(text)
+        self.version, self.tlds, self.source = version, tlds, "iana.org"
+        return self
+
+    def load(self):
+        # fresh cache -> refreshed/revalidated copy -> stale cache -> bundled snapshot
+        cached = self.cacheFile and os.path.exists(self.cacheFile)
+        if cached and time.time() - os.path.getmtime(self.cacheFile) < self.maxAge:
+            try:
+                return self.loadFile(self.cacheFile, "cache")
+            except (IOError, ValueError) as e:
+                pass
+        try:
+            return self.refresh()
+        except Exception as e:
+            pass
+        if cached:
+            try:
+                return self.loadFile(self.cacheFile, "cache (stale)")
+            except (IOError, ValueError) as e:
+                pass
+        return self.loadFile(self.snapshotFile, "bundled fallback list")
+
+    def isValid(self, tld):
+        return tld.upper() in self.tlds
+
+    def __contains__(self, tld):
+        return tld in self.tlds
+
+    def __len__(self):
+        return len(self.tlds)
@@ -0,0 +1,116 @@
+# *************************************************************************
+# * Class: persistent cache of network lookup verdicts (DNS, Wayback...)  *
+# *************************************************************************
+import time
+
+from jm_source_resolver import iterChunks
+
+try:
+    import sqlite3
+
+    def connectDatabase(path):
+        return sqlite3.connect(path)
+except ImportError:
+    # Jython has no sqlite3 module, use the SQLite JDBC driver bundled with Autopsy
+    from com.ziclix.python.sql import zxJDBC
+
+    def connectDatabase(path):
+        return zxJDBC.connect("jdbc:sqlite:" + path, None, None, "org.sqlite.JDBC")
+
+
+class VerdictCache(object):
+
+    # default time to live (in seconds) of positive and negative verdicts
+    POSITIVE_TTL = 30 * 24 * 3600
+    NEGATIVE_TTL = 24 * 3600
+
+    # maximum number of verdicts kept on disk (oldest are evicted first)
+    MAX_ENTRIES = 200000
+
+    # number of names looked up per "name IN (...)" query
+    CHUNK_SIZE = 500
+
+    def __init__(self, path, positiveTTL=POSITIVE_TTL, negativeTTL=NEGATIVE_TTL, maxEntries=MAX_ENTRIES, clock=time.time):
+        self.path = path
+        self.positiveTTL = positiveTTL
+        self.negativeTTL = negativeTTL
+        self.maxEntries = maxEntries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stored = 0
+        self.evicted = 0
+        self.connection = connectDatabase(path)
+        cursor = self.connection.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS verdicts (kind TEXT NOT NULL, name TEXT NOT NULL, positive INTEGER NOT NULL, "
+                       "value TEXT, stored REAL NOT NULL, expires REAL NOT NULL, PRIMARY KEY (kind, name))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS verdicts_stored ON verdicts (stored)")
+        cursor.close()
+        self.connection.commit()
+
+    def get(self, kind, name):
+        # returns a (positive, value) tuple, or None if there is no live verdict for name
+        return self.getMany(kind, [name]).get(name)
+
+    def getMany(self, kind, names):
+        # returns a dict of name -> (positive, value) with the live verdicts found
+        now = self.clock()
+        verdicts = {}
+        names = list(names)
+        cursor = self.connection.cursor()
+        for chunk in iterChunks(names, self.CHUNK_SIZE):
+            cursor.execute("SELECT name, positive, value, expires FROM verdicts WHERE kind = ? AND name IN (" + ",".join(["?"] * len(chunk)) + ")",
+                           [kind] + chunk)
+            for name, positive, value, expires in cursor.fetchall():
+                if expires > now:
+                    verdicts[name] = (positive != 0, value)
+                else:
+                    self.expired += 1
+        cursor.close()
+        self.hits += len(verdicts)
+        self.misses += len(names) - len(verdicts)
+        return verdicts
+
+    def put(self, kind, name, positive, value=None, ttl=None):
+        self.putMany(kind, [(name, positive, value)], ttl)
+
+    def putMany(self, kind, verdicts, ttl=None):
+        # verdicts is an iterable of (name, positive, value) tuples; ttl overrides
+        # the positive/negative time to live for kinds that go stale sooner
+        now = self.clock()
+        rows = []
+        for name, positive, value in verdicts:
+            if ttl is not None:
+                expires = now + ttl
+            elif positive:
+                expires = now + self.positiveTTL
+            else:
+                expires = now + self.negativeTTL
+            rows.append((kind, name, 1 if positive else 0, value, now, expires))
+        if not rows:
+            return
+        cursor = self.connection.cursor()
+        cursor.executemany("INSERT OR REPLACE INTO verdicts (kind, name, positive, value, stored, expires) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        cursor.close()
+        self.connection.commit()
+        self.stored += len(rows)
+
+    def evict(self):
+        # drops expired verdicts, then the oldest ones until at most maxEntries remain
+        cursor = self.connection.cursor()
+        cursor.execute("DELETE FROM verdicts WHERE expires <= ?", [self.clock()])
+        cursor.execute("SELECT COUNT(*) FROM verdicts")
+        excess = cursor.fetchone()[0] - self.maxEntries
+        if excess > 0:
+            cursor.execute("DELETE FROM verdicts WHERE rowid IN (SELECT rowid FROM verdicts ORDER BY stored LIMIT ?)", [excess])
+            self.evicted += excess
+        cursor.close()
+        self.connection.commit()
+
+    def close(self):
+        self.evict()
+        self.connection.close()
+
+    def getStats(self):
+        return "%d hits, %d misses (%d expired), %d stored, %d evicted" % (self.hits, self.misses, self.expired, self.stored, self.evicted)
@@ -0,0 +1,178 @@
+# *************************************************************************
+# * Class: bulk Wayback Machine (Internet Archive) availability lookups   *
+# *************************************************************************
+import json
+import socket
+import time
+
+try:
+    import httplib
+    from urllib import quote
+    from urlparse import urlsplit
+except ImportError:
+    import http.client as httplib
+    from urllib.parse import quote
+    from urllib.parse import urlsplit
+try:
+    from Queue import Queue
+    from Queue import Empty
+except ImportError:
+    from queue import Queue
+    from queue import Empty
+from threading import Thread
+from threading import Lock
+
+from jm_rate_limiter import TokenBucket
+
+
+def formatWaybackResult(wayback_json):
+    # same "timestamp;url" / "NoRecord" strings the email report has always used
+    if wayback_json.get('archived_snapshots'):
+        closest = wayback_json['archived_snapshots'].get('closest', {})
+        archive_timestamp = closest.get('timestamp', 'n.a.')
+        archive_url = closest.get('url', 'n.a.')
+        return archive_timestamp + ";" + archive_url
+    return "NoRecord"
+
+
+class WaybackClient(object):
+
+    HOST = "archive.org"
+    PATH = "/wayback/available"
+
+    # number of concurrent (keep-alive) connections to the archive
+    MAX_CONNECTIONS = 4
+
+    # maximum number of requests sent per second, across all connections
+    RATE_LIMIT = 5
+
+    # retries of requests answered with 429/5xx or failed connections, and base backoff in seconds
+    RETRIES = 3
+    BACKOFF = 1.0
+
+    # socket timeout in seconds
+    TIMEOUT = 30
+
+    # redirects followed for a single lookup (archive.org sends plain HTTP to HTTPS)
+    MAX_REDIRECTS = 5
+    REDIRECT_STATUS = (301, 302, 303, 307, 308)
+
+    def __init__(self, host=HOST, port=None, https=True, maxConnections=MAX_CONNECTIONS, rateLimit=RATE_LIMIT,
+                 retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+        self.host = host
+        self.port = port
+        self.https = https
+        self.maxConnections = max(1, maxConnections)
+        self.rateLimiter = TokenBucket(rateLimit) if rateLimit else None
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.lock = Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+
+    def connect(self, https=None, host=None, port=None):
+        if https is None:
+            https, host, port = self.https, self.host, self.port
+        if https:
+            return httplib.HTTPSConnection(host, port, timeout=self.timeout)
+        return httplib.HTTPConnection(host, port, timeout=self.timeout)
+
+    def fetch(self, connection, domain):
+        # returns (connection, result); the connection is replaced if it had to be
+        # reset, or by one to the new location if the request was redirected to
+        # another host or scheme (later requests of the worker then go there directly)
+        path = self.PATH + "?url=" + quote(domain)
+        wait = self.backoff
+        attempt = 0
+        retry = False
+        redirects = 0
+        while True:
+            if retry:
+                if attempt == self.retries:
+                    break
+                attempt += 1
+                with self.lock:
+                    self.retried += 1
+                time.sleep(wait)
+                wait = wait * 2
+                retry = False
+            if self.rateLimiter:
+                self.rateLimiter.acquire()
+            with self.lock:
+                self.requests += 1
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                data = response.read()
+            except (httplib.HTTPException, socket.error) as e:
+                https = isinstance(connection, httplib.HTTPSConnection)
+                connection.close()
+                connection = self.connect(https, connection.host, connection.port)
+                retry = True
+                continue
+            if response.status in self.REDIRECT_STATUS:
+                location = response.getheader("Location")
+                if not location or redirects == self.MAX_REDIRECTS:
+                    break
+                redirects += 1
+                target = urlsplit(location)
+                if target.netloc:
+                    connection.close()
+                    connection = self.connect(target.scheme == "https", target.hostname, target.port)
+                path = (target.path or "/") + ("?" + target.query if target.query else "")
+                continue
+            if response.status == 429 or response.status >= 500:
+                retryAfter = response.getheader("Retry-After")
+                if retryAfter and retryAfter.isdigit():
+                    wait = max(wait, int(retryAfter))
+                retry = True
+                continue
+            if response.status != 200:
+                break
+            try:
+                return connection, formatWaybackResult(json.loads(data.decode("utf-8")))
+            except ValueError as e:
+                break
+        with self.lock:
+            self.failures += 1
+        return connection, None
+
+    def lookupAll(self, domains, onResult=None):
+        # returns a dict of domain -> result for every domain that could be looked
+        # up; onResult(domain, result) is called as results arrive
+        q_in = Queue()
+        for domain in set(domains):
+            q_in.put(domain)
+        results = {}
+
+        def worker():
+            # each worker keeps its own connection alive for all of its requests
+            connection = self.connect()
+            try:
+                while True:
+                    try:
+                        domain = q_in.get(block = False)
+                    except Empty:
+                        return
+                    connection, result = self.fetch(connection, domain)
+                    if result is not None:
+                        with self.lock:
+                            results[domain] = result
+                    if onResult:
+                        onResult(domain, result)
+            finally:
+                connection.close()
+
+        thread_pool = list()
+        for i in range(min(self.maxConnections, q_in.qsize())):
+            t = Thread(target=worker)
+            t.start()
+            thread_pool.append(t)
+        for t in thread_pool:
+            t.join()
+        return results
+
+    def getStats(self):
+        return "%d requests, %d retries, %d failed lookups" % (self.requests, self.retried, self.failures)
@@ -29,17 +29,21 @@
 
 import os
 import inspect
-import urllib2
 import java.net.InetAddress
 import java.net.UnknownHostException
 import time
-import re
-import xlwt
-import json
 
-from threading import Thread
-from Queue import Queue
-from jm_domain_lookup import DomainLookupTask
+from jm_domain_lookup import DomainResolver
+from jm_source_resolver import SourceFileResolver
+from jm_artifact_source import ArtifactSource
+from jm_artifact_source import BlackboardFetcher
+from jm_verdict_cache import VerdictCache
+from jm_wayback import WaybackClient
+from jm_tld_registry import TLDRegistry
+from jm_email_report import EmailReport
+from jm_email_report import EmailReportWriter
+from jm_email_report import lookupDomains
+from jm_email_report import lookupWayback
 
 from java.lang import Class
 from java.lang import System
@@ -57,6 +61,7 @@ from org.sleuthkit.autopsy.casemodule import Case
 from org.sleuthkit.autopsy.casemodule.services import TagsManager
 from org.sleuthkit.autopsy.coreutils import Logger
 from org.sleuthkit.autopsy.coreutils import ModuleSettings
+from org.sleuthkit.autopsy.coreutils import PlatformUtil
 from org.sleuthkit.autopsy.report import GeneralReportModuleAdapter
 from org.sleuthkit.autopsy.report import DefaultReportConfigurationPanel
 from org.sleuthkit.autopsy.report.ReportProgressPanel import ReportStatus
@@ -70,8 +75,17 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
 
     moduleName = "FEA - Email Validation - 1.0"
     
-    # maximum number of concurrent threads to launch (used in domain lookup process)
-    MAX_THREADS = 8
+    # default maximum number of concurrent DNS queries (overridden by the config panel)
+    MAX_THREADS = 64
+
+    # maximum number of DNS queries started per second
+    DNS_RATE_LIMIT = 200
+
+    # DNS/Wayback verdicts cache, kept in the user config directory and shared by all cases
+    VERDICT_CACHE_FILE = "FEA_verdicts.db"
+
+    # local copy of the IANA TLD list, refreshed when older than a day
+    TLD_CACHE_FILE = "FEA_tlds-alpha-by-domain.txt"
 
     _logger = None
 
@@ -124,43 +138,22 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
 
         # miscellaneous initializations
         progressBar.updateStatusLabel("Retrieving udpated list of valid TLDs from iana.org")
-        reportDB = self.EmailReport()
+        tldRegistry = TLDRegistry(os.path.join(PlatformUtil.getUserConfigDirectory(), self.TLD_CACHE_FILE)).load()
+        self.log(Level.INFO, "FEA: %d TLDs loaded from %s (%s)" % (len(tldRegistry), tldRegistry.source, tldRegistry.version))
+        reportDB = EmailReport(tldRegistry.tlds)
         sleuthkitCase = Case.getCurrentCase().getSleuthkitCase()
-        emailArtifacts = sleuthkitCase.getBlackboardArtifacts(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_SET_NAME, "Email Addresses")
-        progressTotal = len(emailArtifacts)     # TODO: this might be too large of a number and cause the process to freeze
+        # artifacts are streamed page by page rather than loaded all at once
+        emailArtifacts = ArtifactSource(BlackboardFetcher.forSetName(sleuthkitCase, BlackboardAttribute.ATTRIBUTE_TYPE.TSK_SET_NAME, "Email Addresses"))
+        progressTotal = emailArtifacts.countArtifacts()
 
         progressBar.setMaximumProgress(progressTotal * 2 + 2)
 
         progressBar.increment()
 
-        # Create Excel Workbook
-        if generateXLS:
-            fileNameExcel = os.path.join(baseReportDir, Case.getCurrentCase().getName() + "_FEA.xls")
-            book = xlwt.Workbook(encoding="utf-8")
-            sheetDomains = book.add_sheet("Interesting domains")
-            sheetFalsePositives = book.add_sheet("Detail")
-            sheetTruePositives = book.add_sheet("Valid Emails")
-            styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
-            sheetFalsePositives.write(0,0,"Email", styleRowHeaders)
-            sheetFalsePositives.write(0,1,"Alphanumeric check", styleRowHeaders)
-            sheetFalsePositives.write(0,2,"TLD", styleRowHeaders)
-            sheetFalsePositives.write(0,3,"TLD check", styleRowHeaders)
-            sheetFalsePositives.write(0,4,"Domain", styleRowHeaders)
-            sheetFalsePositives.write(0,5,"Domain Checked?", styleRowHeaders)
-            sheetFalsePositives.write(0,6,"Domain check", styleRowHeaders)
-            sheetFalsePositives.write(0,7,"Internet archive check", styleRowHeaders)
-            sheetDomains.write(0,0,"Domain name", styleRowHeaders)
-            sheetDomains.write(0,1,"Hits", styleRowHeaders)
-            sheetTruePositives.write(0,0,"Email", styleRowHeaders)
-            sheetTruePositives.write(0,1,"Source", styleRowHeaders)
-
-        # Open report file for writing
-        if generateCSV:
-            fileName = os.path.join(baseReportDir, self.getRelativeFilePath())
-            report = open(fileName, 'w')
-
-            # write csv header row
-            report.write("artifact email;Alphanumeric check;TLD;TLD check;domain;domain checked?;domain check;internet archive check\n")
+        # Create Excel Workbook and/or open report file for writing
+        fileNameExcel = os.path.join(baseReportDir, Case.getCurrentCase().getName() + "_FEA.xls")
+        fileName = os.path.join(baseReportDir, self.getRelativeFilePath())
+        reportWriter = EmailReportWriter(fileName if generateCSV else None, fileNameExcel if generateXLS else None)
 
 
         #    /$$$$$$              /$$            /$$$$$$              /$$     /$$  /$$$$$$                      /$$             
@@ -178,19 +171,27 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
         
         progressBar.updateStatusLabel("Retrieving emails from the Autopsy blackboard")
 
-        for artifactItem in emailArtifacts:
+        sourceResolver = SourceFileResolver(sleuthkitCase)
 
-            for attributeItem in artifactItem.getAttributes(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_KEYWORD):
-                sourceFiles = sleuthkitCase.findAllFilesWhere("obj_id = " + str(attributeItem.getParentArtifact().getObjectID()))
-                sourceFile = ""
-                for file in sourceFiles:
-                    if sourceFile == "":
-                        sourceFile = file.getName()
-                    else:
-                        sourceFile = sourceFile + " & " + file.getName()
-                reportDB.addNewEmailRecord(attributeItem.getDisplayString(), sourceFile)
+        for artifactPage in emailArtifacts.iterPages():
 
-            progressBar.increment()
+            # resolve the source files of the whole page in as few queries as possible
+            # (getObjectID() is the object id of an artifact's source file)
+            sourceResolver.prefetch([artifactItem.getObjectID() for artifactItem in artifactPage])
+
+            pageEmails = []
+            pageSourceFiles = []
+            for artifactItem in artifactPage:
+                sourceFile = sourceResolver.getSourceFile(artifactItem.getObjectID())
+                for attributeItem in artifactItem.getAttributes(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_KEYWORD):
+                    pageEmails.append(attributeItem.getDisplayString())
+                    pageSourceFiles.append(sourceFile)
+
+                progressBar.increment()
+
+            reportDB.addNewEmailRecords(pageEmails, pageSourceFiles)
+
+        self.log(Level.INFO, "FEA: source file resolution - " + sourceResolver.getStats())
 
 
 
@@ -213,36 +214,26 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
         progressBar.updateStatusLabel("Verifying valid domains in email addresses")
         
         if doNSLookup:
-            q_in = Queue()
-            q_out_valid = Queue()
-            q_out_invalid = Queue()
-            for url in reportDB.getListOfUniqueDomains():
-                q_in.put(url, block = True, timeout = 5)
-                
-            self.log(Level.INFO, "FEA: Launching domain lookup threads")
-            
-            thread_pool = list()
-            for i in range(self.MAX_THREADS):
-                t = DomainLookupTask(q_in, q_out_valid, q_out_invalid)
-                t.start()
-                thread_pool.append(t)
-            
-            for t in thread_pool:
-                progressBar.increment()
-                t.join()
-            
-            while not q_out_valid.empty():
-                url = q_out_valid.get()
-                reportDB.setDomains(url, True)
-            
-            while not q_out_invalid.empty():
-                url = q_out_invalid.get()
-                reportDB.setDomains(url, False)
-                if doWBLookup:
-                    progressBar.updateStatusLabel("Cross-checking invalid domain in the Wayback Machine (" + url + ")")
-                    reportDB.setWayback(url)
+            # verdicts from previous runs (of this or any other case) are reused
+            verdictCache = VerdictCache(os.path.join(PlatformUtil.getUserConfigDirectory(), self.VERDICT_CACHE_FILE))
+
+            self.log(Level.INFO, "FEA: Launching domain lookups (up to " + str(MAX_THREADS) + " in flight)")
+
+            resolver = DomainResolver(maxInFlight = MAX_THREADS, rateLimit = self.DNS_RATE_LIMIT)
+            invalidDomains = lookupDomains(reportDB, resolver, verdictCache)
+            self.log(Level.INFO, "FEA: domain lookup - " + resolver.getStats())
+            progressBar.increment()
+
+            if doWBLookup:
+                progressBar.updateStatusLabel("Cross-checking invalid domains in the Wayback Machine")
+                waybackClient = WaybackClient()
+                lookupWayback(reportDB, invalidDomains, waybackClient, verdictCache)
+                self.log(Level.INFO, "FEA: Wayback Machine lookup - " + waybackClient.getStats())
                 progressBar.increment()
 
+            self.log(Level.INFO, "FEA: verdict cache - " + verdictCache.getStats())
+            verdictCache.close()
+
 
         #   /$$      /$$           /$$   /$$                     /$$$$$$$                                            /$$    
         #  | $$  /$ | $$          |__/  | $$                    | $$__  $$                                          | $$    
@@ -262,38 +253,14 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
 
         progressBar.updateStatusLabel("Writing report to file (if any reports selected)")
 
-        baseCell = 1
-        
-        for row in reportDB.getUniqueReportRows():
-            if generateCSV:
-                report.write(row)
-                report.write("\n")
-            if generateXLS:
-                items = row.split(";")
-                # fill 8 columns in report
-                for n in range(8):
-                    sheetFalsePositives.write(baseCell,n,items[n])
-            baseCell += 1
+        reportWriter.write(reportDB)
+        reportWriter.close()
 
         if generateXLS:
-            baseCell = 1
-            for rec in reportDB.getListOfValidDomains():
-                sheetDomains.write(baseCell, 0, rec)
-                sheetDomains.write(baseCell, 1, reportDB.getHitsForDomain(rec))
-                baseCell += 1
-
-            baseCell = 1
-            for emailAddr, sourceFile in reportDB.getListOfValidEmailAddresses():
-                sheetTruePositives.write(baseCell,0,emailAddr)
-                sheetTruePositives.write(baseCell,1,sourceFile)
-                baseCell += 1
-
-            book.save(fileNameExcel)
             Case.getCurrentCase().addReport(fileNameExcel, self.moduleName, "FEA - Email Validation Report (eXcel)")
 
         # Add the report to the Case, so it is shown in the tree
         if generateCSV:
-            report.close()
             Case.getCurrentCase().addReport(fileName, self.moduleName, "FEA - Email Validation Report (CSV)");
 
         # last step (file write) complete
@@ -315,191 +282,6 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
 
 
 
-    #   /$$$$$$$                                            /$$            /$$$$$$  /$$                             
-    #  | $$__  $$                                          | $$           /$$__  $$| $$                             
-    #  | $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$   /$$$$$$  /$$$$$$        | $$  \__/| $$  /$$$$$$   /$$$$$$$ /$$$$$$$
-    #  | $$$$$$$/ /$$__  $$ /$$__  $$ /$$__  $$ /$$__  $$|_  $$_/        | $$      | $$ |____  $$ /$$_____//$$_____/
-    #  | $$__  $$| $$$$$$$$| $$  \ $$| $$  \ $$| $$  \__/  | $$          | $$      | $$  /$$$$$$$|  $$$$$$|  $$$$$$ 
-    #  | $$  \ $$| $$_____/| $$  | $$| $$  | $$| $$        | $$ /$$      | $$    $$| $$ /$$__  $$ \____  $$\____  $$
-    #  | $$  | $$|  $$$$$$$| $$$$$$$/|  $$$$$$/| $$        |  $$$$/      |  $$$$$$/| $$|  $$$$$$$ /$$$$$$$//$$$$$$$/
-    #  |__/  |__/ \_______/| $$____/  \______/ |__/         \___/         \______/ |__/ \_______/|_______/|_______/ 
-    #                      | $$                                                                                     
-    #                      | $$                                                                                     
-    #                      |__/                                                                                         
-    # ***********************************************************************
-    # * EMAIL REPORT inner class                                            *
-    # *                                                                     *
-    # * Maintains full list of email in a dict structure comprised of       *
-    # * EmailRecord class objects                                           *
-    # *                                                                     *
-    # ***********************************************************************
-
-    class EmailReport(object):
-
-        IANA_ADDR = "https://data.iana.org/TLD/tlds-alpha-by-domain.txt"
-
-        def __init__(self):
-            self.recordList = {}
-            self.recordCount = 0
-            # read valid TLD list from IANA
-            try:
-                req = urllib2.Request(self.IANA_ADDR)
-                response = urllib2.urlopen(req)
-                tldListHTML = response.read()
-            except urllib2.HTTPError as e:
-                raise ValueError("error accessing TLD list from " + self.IANA_ADDR)
-            self.tldList = tldListHTML.splitlines()
-
-        def addEmailRecord(self, newEmailRecord):
-            self.recordCount += 1
-            self.recordList[recordCount] = newEmailRecord
-        def addNewEmailRecord(self, email, sourceFile):
-            newRecord = self.EmailRecord(email.lower(), sourceFile, False, False, False)
-            newRecord.checkTLD(self.tldList)
-            newRecord.checkAlpha()
-            self.recordList[self.recordCount] = newRecord
-            self.recordCount += 1
-
-        def getRecordById(self, id):
-            return self.recordList.get(id, default=None)
-
-        def getAllRecords(self):
-            return self.recordList.values()
-
-        def getTotalRecords(self):
-            return self.recordCount
-
-        def getListOfUniqueDomains(self):
-            # returns list of de-duped list of domains with valid TLDs
-            domainNamesList = []
-            for rec in self.recordList.values():
-                if not(rec.getDomain() in domainNamesList) and rec.getTLDCheck():
-                    domainNamesList.append(rec.getDomain())
-            return domainNamesList
-
-        def getListOfValidDomains(self):
-            domainNamesList = []
-            for rec in self.recordList.values():
-                if not(rec.getDomain() in domainNamesList):
-                    if rec.getTLDCheck() and rec.domainCheck:
-                        domainNamesList.append(rec.getDomain())
-            return domainNamesList
-
-        def getListOfValidEmailAddresses(self):
-            validEmailsList = []
-            for rec in self.recordList.values():
-                if not((rec.getEmail(),rec.getSourceFile()) in validEmailsList):
-                    if rec.getTLDCheck() and rec.getAlphaCheck():
-                        validEmailsList.append((rec.getEmail(), rec.getSourceFile()))
-            return validEmailsList
-
-        def getHitsForDomain(self, domain):
-            count = 0
-            for rec in self.recordList.values():
-                if rec.getDomain() == domain:
-                    count += 1
-            return count
-
-        def setDomains(self, domain, lookup):
-            for rec in self.recordList.values():
-                if rec.getDomain() == domain:
-                    rec.setDomainCheck(lookup)
-
-        def setWayback(self, domain):
-            for rec in self.recordList.values():
-                if rec.getDomain() == domain:
-                    rec.checkWayback()
-
-        def updateDomainCheck(self, id, domainCheck):
-            self.recordList[id].setDomainCheck(domainCheck)
-
-        def getReportRows(self):
-            for r in self.recordList.values():
-                yield r.getEmailReportRow()
-
-        def getUniqueReportRows(self):
-            uniqueList = []
-            for r in self.getReportRows():
-                if not r in uniqueList:
-                    uniqueList.append(r)
-            return uniqueList
-
-
-        class EmailRecord(object):
-            def __init__(self, email, sourceFile, tldCheck, domainCheck, domainChecked):
-                self.email = email
-                self.sourceFile = sourceFile
-                self.tldCheck = tldCheck
-                self.domainCheck = domainCheck
-                self.wb = "n.a.;"
-                self.domainChecked = domainChecked
-
-            def setDomainCheck(self, domainCheck):
-                self.domainCheck = domainCheck
-                self.domainChecked = True
-
-            def getDomain(self):
-                domain = self.email.split("@")
-                return domain[-1].lower()
-
-            def getEmail(self):
-                return self.email
-
-            def getSourceFile(self):
-                return self.sourceFile
-
-            def getTLD(self):
-                return self.email.split(".")[-1]
-
-            def getTLDCheck(self):
-                return self.tldCheck
-
-            def getAlphaCheck(self):
-                return not re.match('^[_a-z0-9-]+(\.[_a-z0-9-]+)*@[a-z0-9-]+(\.[a-z0-9-]+)*(\.[a-z]{2,4})$', self.email.lower()) == None
-
-            def checkAlpha(self):
-                self.alphaCheck = self.getAlphaCheck()
-
-            def checkTLD(self, tldList):
-                self.tldCheck = False
-                tld = self.email.split(".")
-                if tld[-1].upper() in tldList:
-                    self.tldCheck = True
-
-            def checkWayback(self):
-                
-                # url for Internet Archive / Wayback machine
-                urlWayback = 'http://archive.org/wayback/available'
-
-                if self.domainCheck == False:
-
-                    response = urllib2.urlopen(urlWayback + "?url=" + self.getDomain())
-
-                    wayback_json = json.load(response)
-                    if wayback_json['archived_snapshots']:
-                        closest = wayback_json['archived_snapshots']['closest']
-                        archive_timestamp = closest.get('timestamp', None)
-                        archive_url = closest.get('url', 'n.a.')
-                        self.wb = archive_timestamp + ";" + archive_url
-                    else:
-                        self.wb = "NoRecord"
-
-            def getEmailReportRow(self):
-                alphaCheckRes = "0"
-                tldRes = "0"
-                domainRes = "0"
-                domainCheckedStatus = "0"
-                if self.alphaCheck:
-                    alphaCheckRes = "1"
-                if self.tldCheck:
-                    tldRes = "1"
-                if self.domainCheck:
-                    domainRes = "1"
-                if self.domainChecked:
-                    domainCheckedStatus = "1"
-                return self.email + ";" + alphaCheckRes + ";" + self.getTLD() + ";"  + tldRes + ";" + self.getDomain() + ";" + domainCheckedStatus + ";" + domainRes + ";" + self.wb
-
-
     #    /$$$$$$                       /$$$$$$  /$$                  /$$$$$$  /$$   /$$ /$$$$$$
     #   /$$__  $$                     /$$__  $$|__/                 /$$__  $$| $$  | $$|_  $$_/
     #  | $$  \__/  /$$$$$$  /$$$$$$$ | $$  \__/ /$$  /$$$$$$       | $$  \__/| $$  | $$  | $$  
@@ -513,7 +295,7 @@ class EmailCCHitsReportModule(GeneralReportModuleAdapter):
     #                                               \______/                                   
 
 class FEA_ConfigPanel(JPanel):
-    numThreads = 8
+    numThreads = 64
     generateXLS = True
     generateCSV = True
     doNSLookup = True
@@ -551,7 +333,7 @@ class FEA_ConfigPanel(JPanel):
                 self.cbGenerateExcel.setSelected(False)
                 self.generateXLS = False
         if (ModuleSettings.getConfigSetting("FEA", "numThreads") != None) and (ModuleSettings.getConfigSetting("FEA","numThreads") != ""):
-            self.numThreads = ModuleSettings.getConfigSetting("FEA", "numThreads")
+            self.numThreads = int(ModuleSettings.getConfigSetting("FEA", "numThreads"))
             self.numberThreadsSlider.setValue(self.numThreads)
         else:
             self.numThreads = self.numberThreadsSlider.getValue()
@@ -597,16 +379,17 @@ class FEA_ConfigPanel(JPanel):
 
         # TODO: include option to browse for text file with list of emails to exclude from analysis
 
-        numberThreadsLabel = JLabel("Maximum number of threads for DNS Lookup task: ")
+        numberThreadsLabel = JLabel("Maximum number of concurrent queries for DNS Lookup task: ")
         gbc.gridy = 2
         self.add(numberThreadsLabel, gbc)
 
-        self.numberThreadsSlider = JSlider(JSlider.HORIZONTAL, 1, 16, 8, stateChanged=self.sliderActionPerformed);
-        self.numberThreadsSlider.setMajorTickSpacing(1)
+        self.numberThreadsSlider = JSlider(JSlider.HORIZONTAL, 1, 256, 64, stateChanged=self.sliderActionPerformed);
+        self.numberThreadsSlider.setMajorTickSpacing(32)
+        self.numberThreadsSlider.setMinorTickSpacing(8)
+        self.numberThreadsSlider.setLabelTable(self.numberThreadsSlider.createStandardLabels(64, 64))
         self.numberThreadsSlider.setPaintLabels(True)
         self.numberThreadsSlider.setPaintTicks(True)
-        self.numberThreadsSlider.setSnapToTicks(True)
-        self.numberThreadsSlider.setToolTipText("set maximum number of concurrent threads when performing DNS lookup on email domains")
+        self.numberThreadsSlider.setToolTipText("set maximum number of concurrent queries when performing DNS lookup on email domains")
 
         gbc.gridy = 5
         gbc.gridwidth = 15
@@ -29,18 +29,16 @@
 
 import os
 import inspect
-import urllib2
-import json
-import datetime
-import xlwt
-import ecdsa
-import ecdsa.der
-import ecdsa.util
-import hashlib
-import binascii
-import re
-import struct
-import time
+
+from jm_artifact_source import ArtifactSource
+from jm_artifact_source import BlackboardFetcher
+from jm_bitcoin_report import BlockchainReport
+from jm_bitcoin_report import BlockchainReportWriter
+from jm_bitcoin_report import analyzeHits
+from jm_base58 import Base58CheckValidator
+from jm_blockchain_client import BlockchainClient
+from jm_source_resolver import SourceFileResolver
+from jm_verdict_cache import VerdictCache
 
 from javax.swing import JPanel
 from javax.swing import JCheckBox
@@ -57,6 +55,7 @@ from java.util.logging import Level
 from org.sleuthkit.autopsy.casemodule import Case
 from org.sleuthkit.autopsy.casemodule.services import TagsManager
 from org.sleuthkit.autopsy.coreutils import Logger
+from org.sleuthkit.autopsy.coreutils import PlatformUtil
 from org.sleuthkit.autopsy.report import GeneralReportModuleAdapter
 from org.sleuthkit.autopsy.report.ReportProgressPanel import ReportStatus
 from org.sleuthkit.autopsy.casemodule.services import FileManager
@@ -64,13 +63,15 @@ from org.sleuthkit.datamodel import BlackboardArtifact
 from org.sleuthkit.datamodel import BlackboardAttribute
 from org.sleuthkit.autopsy.coreutils import ModuleSettings
 
-from hashlib import sha256
-
 
 class BCHitsReportModule(GeneralReportModuleAdapter):
 
     moduleName = "FEA - BC Wallet Validation"
 
+    # blockchain.info results cache, kept in the user config directory and shared
+    # by all cases (and with the email module's DNS/Wayback verdicts)
+    VERDICT_CACHE_FILE = "FEA_verdicts.db"
+
     _logger = None
 
     def log(self, level, msg):
@@ -93,23 +94,7 @@ class BCHitsReportModule(GeneralReportModuleAdapter):
         blockchainCheck = self.configPanel.getBlockchainCheck()
         configList = self.configPanel.getHitlist()
         timeoutBlockchain = self.configPanel.getMaxTimeout()
-
-        # configure excel report
-        fileNameExcel = os.path.join(baseReportDir, Case.getCurrentCase().getName() + "_BitCoin_FEA.xls")
-        book = xlwt.Workbook(encoding="utf-8")
-        sheetPublicAddresses = book.add_sheet("FEA_BC_Public_wallets")
-        sheetPrivateAddresses = book.add_sheet("FEA_BC_Private_wallets")
-        styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
-        sheetPublicAddresses.write(0,0,"Address", styleRowHeaders)
-        sheetPublicAddresses.write(0,1,"Time 1st seen", styleRowHeaders)
-        sheetPublicAddresses.write(0,2,"Balance", styleRowHeaders)
-        sheetPublicAddresses.write(0,3,"Total Received", styleRowHeaders)
-        sheetPublicAddresses.write(0,4,"Blockchain.info", styleRowHeaders)
-        sheetPrivateAddresses.write(0,0,"Private Key", styleRowHeaders)
-        sheetPrivateAddresses.write(0,1,"Wallet Address", styleRowHeaders)
-        sheetPrivateAddresses.write(0,2,"Balance", styleRowHeaders)
-        sheetPrivateAddresses.write(0,3,"Time 1st seen", styleRowHeaders)
-        sheetPrivateAddresses.write(0,4,"Total received", styleRowHeaders)
+        firstSeen = self.configPanel.getFirstSeen()
 
         # configure progress bar
         progressBar.setIndeterminate(False)
@@ -118,86 +103,61 @@ class BCHitsReportModule(GeneralReportModuleAdapter):
 
         sleuthkitCase = Case.getCurrentCase().getSleuthkitCase()
 
-        bcArtifacts = sleuthkitCase.getBlackboardArtifacts(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_SET_NAME, configList)
-        progressTotal = len(bcArtifacts)
+        # artifacts are streamed page by page rather than loaded all at once
+        bcArtifacts = ArtifactSource(BlackboardFetcher.forSetName(sleuthkitCase, BlackboardAttribute.ATTRIBUTE_TYPE.TSK_SET_NAME, configList))
+        progressTotal = bcArtifacts.countArtifacts()
 
         progressBar.setMaximumProgress(progressTotal + 1)
 
         #misc inits
         artifactCount = 0
-        recordDB = self.BlockchainReport()
-        skipFirstTimeout = True
+        recordDB = BlockchainReport()
+        # addresses repeated across hits are checksum-tested once
+        validator = Base58CheckValidator()
+
+        # addresses are sent to blockchain.info in batches, waiting only when a request is about to be sent
+        # (first seen dates cost one more request per address, so they are optional)
+        blockchainClient = BlockchainClient(secondsPerAddress = timeoutBlockchain, firstSeen = firstSeen)
+
+        sourceResolver = SourceFileResolver(sleuthkitCase)
 
         # Write the results to the report file.
         fileName = os.path.join(baseReportDir, self.getRelativeFilePath())
-        report = open(fileName, 'w')
-        report.write("Attributes from artifacts\n")
-
-        for artifactItem in bcArtifacts:
-            for attributeItem in artifactItem.getAttributes(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_KEYWORD):
-                bcAddress = attributeItem.getDisplayString()
-                
-                # Delay for accessing Blockchain.info not used on first iteration
-                if skipFirstTimeout:
-                    skipFirstTimeout = False
-                else:
-                    progressBar.updateStatusLabel("Waiting for %s secs before checking address %s with the Blockchain API" % (timeoutBlockchain, bcAddress))
-                    time.sleep(timeoutBlockchain)
-                
-                progressBar.updateStatusLabel("Analyzing hash: " + bcAddress)
-
-                if self.check_bc(bcAddress):
-                    if len(bcAddress) < 51:
-                        if blockchainCheck:
-                            balance, received, timeFirstSeen = self.checkBlockchain(bcAddress)
-                            recordDB.addBlockchainRecord(bcAddress, 0, timeFirstSeen, balance, received)
-                            report.write("Wallet address: %s - first seen on: %s - account balance:  %s BTC - total received: %s BTC;\n" % (bcAddress, timeFirstSeen, balance, received))
-                        else:
-                            recordDB.addBlockchainRecord(bcAddress, 0, 0, 0, 0)
-                            report.write("Wallet address: %s (user opted out of Blockchain check)\n" % bcAddress)
-                    else:
-                        # candidate private key found
-                        candidatePublicAddress = self.getAddressFromPrivateKey(bcAddress)
-                        # candidate wallet address found
-                        if self.check_bc(candidatePublicAddress):
-                            balance, received, timeFirstSeen = self.checkBlockchain(candidatePublicAddress)
-                            recordDB.addPrivateWallet(candidatePublicAddress, timeFirstSeen, balance, received, bcAddress)
-                            report.write("*** PRIVATE KEY FOUND: %s with wallet address: %s - first seen on: %s - account balance:  %s BTC - total received: %s BTC;\n" % (bcAddress, candidatePublicAddress, timeFirstSeen, balance, received))
-
-            artifactCount += 1
-            progressBar.increment()
-
-        report.write("Artifacts processed = %d" % artifactCount)
-        report.close()
+        fileNameExcel = os.path.join(baseReportDir, Case.getCurrentCase().getName() + "_BitCoin_FEA.xls")
+        reportWriter = BlockchainReportWriter(fileName, fileNameExcel)
+
+        # collect the distinct hits first, so that every address is validated and looked up once
+        for artifactPage in bcArtifacts.iterPages():
+
+            # resolve the source files of the whole page in as few queries as possible
+            # (getObjectID() is the object id of an artifact's source file)
+            sourceResolver.prefetch([artifactItem.getObjectID() for artifactItem in artifactPage])
+
+            for artifactItem in artifactPage:
+                sourceFile = sourceResolver.getSourceFile(artifactItem.getObjectID())
+                for attributeItem in artifactItem.getAttributes(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_KEYWORD):
+                    recordDB.addHit(attributeItem.getDisplayString(), sourceFile)
+                artifactCount += 1
+                progressBar.increment()
+
+        progressBar.updateStatusLabel("Analyzing %d distinct hashes" % len(recordDB.hitList))
+
+        # results from previous runs (of this or any other case) are reused
+        resultCache = VerdictCache(os.path.join(PlatformUtil.getUserConfigDirectory(), self.VERDICT_CACHE_FILE))
+        for line in analyzeHits(recordDB, blockchainCheck, blockchainClient, validator, resultCache):
+            reportWriter.writeLine(line)
+
+        reportWriter.close(artifactCount)
+        blockchainClient.close()
+        self.log(Level.INFO, "FEA: source file resolution - " + sourceResolver.getStats())
+        self.log(Level.INFO, "FEA: bitcoin hits - " + recordDB.getStats())
+        self.log(Level.INFO, "FEA: Base58Check validation - " + validator.getStats())
+        self.log(Level.INFO, "FEA: blockchain.info lookups - " + blockchainClient.getStats())
+        self.log(Level.INFO, "FEA: verdict cache - " + resultCache.getStats())
+        resultCache.close()
 
         # write excel report
-        baseCellPublic = 1
-        baseCellPrivate = 1
-        for row in recordDB.getAllRecords():
-            # write public wallet addresses in subsheet
-            if row.getAddressType() == 0:
-                sheetPublicAddresses.write(baseCellPublic, 0, row.getAddress())
-                if blockchainCheck:
-                    sheetPublicAddresses.write(baseCellPublic, 1, row.getTimeFirstSeen())
-                    sheetPublicAddresses.write(baseCellPublic, 2, row.getAccountBalance())
-                    sheetPublicAddresses.write(baseCellPublic, 3, row.getTotalReceived())
-                    sheetPublicAddresses.write(baseCellPublic, 4, "https://blockchain.info/address/" + row.getAddress())
-                else:
-                    for n in range(1, 4):
-                        sheetPublicAddresses.write(baseCellPublic, n, "n.a")
-                    sheetPublicAddresses.write(baseCellPublic, 4, "user opted out of blockchain.info check")
-                baseCellPublic += 1
-
-        for row in recordDB.getAllPrivateKeyRecords():
-            # write private key addresses in subsheet
-            sheetPrivateAddresses.write(baseCellPrivate, 0, row.getPrivateKey())
-            sheetPrivateAddresses.write(baseCellPrivate, 1, row.getAddress())
-            sheetPrivateAddresses.write(baseCellPrivate, 2, row.getAccountBalance())
-            sheetPrivateAddresses.write(baseCellPrivate, 3, row.getTimeFirstSeen())
-            sheetPrivateAddresses.write(baseCellPrivate, 4, row.getTotalReceived())
-            baseCellPrivate += 1
-
-        book.save(fileNameExcel)
+        reportWriter.write(recordDB, blockchainCheck)
         Case.getCurrentCase().addReport(fileNameExcel, self.moduleName, "FEA Blockchain address analysis report (eXcel)")
 
         # Add the report to the Case, so it is shown in the tree
@@ -221,148 +181,6 @@ class BCHitsReportModule(GeneralReportModuleAdapter):
 
 
 
-#   /$$$$$$$  /$$   /$$                         /$$                                 /$$       /$$                                       
-#  | $$__  $$|__/  | $$                        |__/                                | $$      | $$                                       
-#  | $$  \ $$ /$$ /$$$$$$    /$$$$$$$  /$$$$$$  /$$ /$$$$$$$         /$$$$$$   /$$$$$$$  /$$$$$$$  /$$$$$$   /$$$$$$   /$$$$$$$ /$$$$$$$
-#  | $$$$$$$ | $$|_  $$_/   /$$_____/ /$$__  $$| $$| $$__  $$       |____  $$ /$$__  $$ /$$__  $$ /$$__  $$ /$$__  $$ /$$_____//$$_____/
-#  | $$__  $$| $$  | $$    | $$      | $$  \ $$| $$| $$  \ $$        /$$$$$$$| $$  | $$| $$  | $$| $$  \__/| $$$$$$$$|  $$$$$$|  $$$$$$ 
-#  | $$  \ $$| $$  | $$ /$$| $$      | $$  | $$| $$| $$  | $$       /$$__  $$| $$  | $$| $$  | $$| $$      | $$_____/ \____  $$\____  $$
-#  | $$$$$$$/| $$  |  $$$$/|  $$$$$$$|  $$$$$$/| $$| $$  | $$      |  $$$$$$$|  $$$$$$$|  $$$$$$$| $$      |  $$$$$$$ /$$$$$$$//$$$$$$$/
-#  |_______/ |__/   \___/   \_______/ \______/ |__/|__/  |__/       \_______/ \_______/ \_______/|__/       \_______/|_______/|_______/ 
-#                                                                                                                                       
-#                                                                                                                                       
-#             
-
-    # TODO: consider "deep" validation: https://bitcointalk.org/index.php?topic=1026.0
-
-    def to_bytes(self, n, length, endianess='big'):
-        h = '%x' % n
-        s = ('0'*(len(h) % 2) + h).zfill(length*2).decode('hex')
-        return s if endianess == 'big' else s[::-1]
-
-    def check_bc(self, bc):
-        digits58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-
-        n = 0
-        for char in bc:
-            n = n * 58 + digits58.index(char)
-        bcbytes = self.to_bytes(n, 25, 'big')
-
-        return bcbytes[-4:] == sha256(sha256(bcbytes[:-4]).digest()).digest()[:4]
-
-    def checkBlockchain(self, walletAddress):
-        
-        # url for Blockchain API - simple queries
-        urlBlockchain = 'https://blockchain.info'
-        # minimum number of confirmations to consider information retrieved as valid
-        numConfirmations = 6
-
-        response = urllib2.urlopen(urlBlockchain + "/q/addressbalance/" + walletAddress + "?confirmations=" + str(numConfirmations))
-        balance = json.load(response) / 100000000
-
-        response = urllib2.urlopen(urlBlockchain + "/q/getreceivedbyaddress/" + walletAddress + "?confirmations=" + str(numConfirmations))
-        received = json.load(response) / 100000000
-
-        response = urllib2.urlopen(urlBlockchain + "/q/addressfirstseen/" + walletAddress)
-        timeFirstSeen = json.load(response)
-        if (timeFirstSeen != 0):
-            reg = datetime.datetime.fromtimestamp(int(timeFirstSeen)).strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            reg = "n.a."
-
-        return str(balance), str(received), reg
-
-    def getAddressFromPrivateKey(self, wifpriv):
-        # generate public wallet address for private key from via elliptic curve algorithn
-        t='123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-        pk = sum([t.index(wifpriv[::-1][l])*(58**l) for l in range(len(wifpriv))])/(2**32)%(2**256)
-
-        secp256k1curve=ecdsa.ellipticcurve.CurveFp(115792089237316195423570985008687907853269984665640564039457584007908834671663,0,7)
-        secp256k1point=ecdsa.ellipticcurve.Point(secp256k1curve,0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141)
-        secp256k1=ecdsa.curves.Curve('secp256k1',secp256k1curve,secp256k1point,(1,3,132,0,10))
-
-        pko=ecdsa.SigningKey.from_secret_exponent(pk,secp256k1)
-        pubkey=binascii.hexlify(pko.get_verifying_key().to_string())
-        pubkey2=hashlib.sha256(binascii.unhexlify('04'+pubkey)).hexdigest()
-        pubkey3=hashlib.new('ripemd160',binascii.unhexlify(pubkey2)).hexdigest()
-        pubkey4=hashlib.sha256(binascii.unhexlify('00'+pubkey3)).hexdigest()
-        pubkey5=hashlib.sha256(binascii.unhexlify(pubkey4)).hexdigest()
-        pubkey6=pubkey3+pubkey5[:8]
-        pubnum=int(pubkey6,16)
-        pubnumlist=[]
-        while pubnum!=0: pubnumlist.append(pubnum%58); pubnum/=58
-        address=''
-        for l in ['123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'[x] for x in pubnumlist]:
-            address=l+address
-        return '1'+address
-
-
-#   /$$$$$$$                                            /$$                     /$$                                                 
-#  | $$__  $$                                          | $$                    | $$                                                 
-#  | $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$   /$$$$$$  /$$$$$$          /$$$$$$$| $$  /$$$$$$   /$$$$$$$ /$$$$$$$  /$$$$$$   /$$$$$$$
-#  | $$$$$$$/ /$$__  $$ /$$__  $$ /$$__  $$ /$$__  $$|_  $$_/         /$$_____/| $$ |____  $$ /$$_____//$$_____/ /$$__  $$ /$$_____/
-#  | $$__  $$| $$$$$$$$| $$  \ $$| $$  \ $$| $$  \__/  | $$          | $$      | $$  /$$$$$$$|  $$$$$$|  $$$$$$ | $$$$$$$$|  $$$$$$ 
-#  | $$  \ $$| $$_____/| $$  | $$| $$  | $$| $$        | $$ /$$      | $$      | $$ /$$__  $$ \____  $$\____  $$| $$_____/ \____  $$
-#  | $$  | $$|  $$$$$$$| $$$$$$$/|  $$$$$$/| $$        |  $$$$/      |  $$$$$$$| $$|  $$$$$$$ /$$$$$$$//$$$$$$$/|  $$$$$$$ /$$$$$$$/
-#  |__/  |__/ \_______/| $$____/  \______/ |__/         \___/         \_______/|__/ \_______/|_______/|_______/  \_______/|_______/ 
-#                      | $$                                                                                                         
-#                      | $$                                                                                                         
-#                      |__/                                                                                                         
-
-
-    class BlockchainReport(object):
-        def __init__(self):
-            self.recordList = {}
-            self.recordCount = 0
-            self.privateKeysList = {}
-            self.privateKeysCount = 0
-
-        def addBlockchainRecord(self, walletAddress, walletType, timeFirstSeen, totalBalance, totalReceived):
-            self.recordCount += 1
-            newRecord = self.BlockchainRecord(walletAddress, walletType, timeFirstSeen, totalBalance, totalReceived)
-            self.recordList[walletAddress] = newRecord
-
-        def addPrivateWallet(self, walletAddress, timeFirstSeen, totalBalance, totalReceived, privateKey):
-            self.privateKeysCount += 1
-            newRecord = self.BlockchainRecord(walletAddress, 1, timeFirstSeen, totalBalance, totalReceived, privateKey)
-            self.privateKeysList[privateKey] = newRecord
-        
-        def getAllRecords(self):
-            return self.recordList.values()
-
-        def getAllPrivateKeyRecords(self):
-            return self.privateKeysList.values()
-
-        class BlockchainRecord(object):
-            def __init__(self, walletAddress, walletType, timeFirstSeen, totalBalance, totalReceived, privateKey=None):
-                self.walletAddress = walletAddress
-                self.walletType = walletType
-                self.timeFirstSeen = timeFirstSeen
-                self.totalBalance = totalBalance
-                self.totalReceived = totalReceived
-                self.privateKey = privateKey
-
-            def getPrivateKey(self):
-                return self.privateKey
-
-            def getAddressType(self):
-                return self.walletType
-
-            def getAddress(self):
-                return self.walletAddress
-
-            def getTimeFirstSeen(self):
-                return self.timeFirstSeen
-
-            def getAccountBalance(self):
-                return self.totalBalance
-
-            def getTotalReceived(self):
-                return self.totalReceived
-
-
-
-
 #    /$$$$$$                       /$$$$$$  /$$                  /$$$$$$  /$$   /$$ /$$
 #   /$$__  $$                     /$$__  $$|__/                 /$$__  $$| $$  | $$|__/
 #  | $$  \__/  /$$$$$$  /$$$$$$$ | $$  \__/ /$$  /$$$$$$       | $$  \__/| $$  | $$ /$$
@@ -378,8 +196,10 @@ class BCHitsReportModule(GeneralReportModuleAdapter):
 class FEA_BC_ConfigPanel(JPanel):
     
     cbBlockchainCheck = None
+    cbFirstSeen = None
     tbHitlist = None
     blockchainCheck = True
+    firstSeen = False
     hitlist = "testlist"
     maxTimeout = 5
     tbMaxBCHits = None
@@ -410,6 +230,10 @@ class FEA_BC_ConfigPanel(JPanel):
                 self.cbBlockchainCheck.setSelected(False)
                 self.blockchainCheck = False
 
+        if ModuleSettings.getConfigSetting("FEA", "firstSeen") == "true":
+            self.cbFirstSeen.setSelected(True)
+            self.firstSeen = True
+
     def addStatusLabel(self, msg):
             gbc = GridBagConstraints()
             gbc.anchor = GridBagConstraints.NORTHWEST
@@ -427,6 +251,9 @@ class FEA_BC_ConfigPanel(JPanel):
     def getMaxTimeout(self):
         return self.maxTimeout
 
+    def getFirstSeen(self):
+        return self.firstSeen
+
     def initComponents(self):
 
         self.setLayout(GridBagLayout())
@@ -462,6 +289,12 @@ class FEA_BC_ConfigPanel(JPanel):
         self.tbMaxBCHits.addActionListener(self.tbMaxBCHitsActionPerformed)
         gbc.gridx = 1
         self.add(self.tbMaxBCHits, gbc)
+
+        gbc.gridx = 0
+        self.cbFirstSeen = JCheckBox("Query first seen dates (one call per address)", actionPerformed=self.cbFirstSeenActionPerformed)
+        self.cbFirstSeen.setSelected(False)
+        gbc.gridy = 4
+        self.add(self.cbFirstSeen, gbc)
         
     def tbMaxBCHitsActionPerformed(self, event):
         source = event.getSource()
@@ -482,4 +315,11 @@ class FEA_BC_ConfigPanel(JPanel):
             ModuleSettings.setConfigSetting("FEA","blockchainCheck","false")
             self.blockchainCheck = False
 
-
+    def cbFirstSeenActionPerformed(self, event):
+        source = event.getSource()
+        if(source.isSelected()):
+            ModuleSettings.setConfigSetting("FEA","firstSeen","true")
+            self.firstSeen = True
+        else:
+            ModuleSettings.setConfigSetting("FEA","firstSeen","false")
+            self.firstSeen = False
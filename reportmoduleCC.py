@@ -30,7 +30,15 @@
 import os
 import inspect
 import urllib2
-import xlwt
+
+from jm_source_resolver import SourceFileResolver
+from jm_artifact_source import ArtifactSource
+from jm_artifact_source import BlackboardFetcher
+from jm_card_report import CardPrefilter
+from jm_card_report import CardReport
+from jm_card_report import CardReportWriter
+from jm_card_parallel import ParallelCardValidator
+from jm_iin_index import IINIndex
 
 from java.lang import Class
 from java.lang import System
@@ -38,6 +46,7 @@ from java.util.logging import Level
 from org.sleuthkit.autopsy.casemodule import Case
 from org.sleuthkit.autopsy.casemodule.services import TagsManager
 from org.sleuthkit.autopsy.coreutils import Logger
+from org.sleuthkit.autopsy.coreutils import PlatformUtil
 from org.sleuthkit.autopsy.report import GeneralReportModuleAdapter
 from org.sleuthkit.autopsy.report.ReportProgressPanel import ReportStatus
 from org.sleuthkit.autopsy.casemodule.services import FileManager
@@ -58,6 +67,14 @@ class CCHitsReportModule(GeneralReportModuleAdapter):
 
     moduleName = "FEA - Credit Card Validation"
 
+    # IIN table (e.g. with issuers) used instead of the bundled brand table when
+    # present in the user config directory
+    IIN_TABLE_FILE = "FEA_iin-ranges.csv"
+
+    # number of hits collected (over several blackboard pages) before they are
+    # validated, large enough to be shared across the validation workers
+    VALIDATION_BATCH = 50000
+
     _logger = None
 
     def log(self, level, msg):
@@ -84,71 +101,90 @@ class CCHitsReportModule(GeneralReportModuleAdapter):
         generateXLS = self.configPanel.getGenerateXLS()
         generateCSV = self.configPanel.getGenerateCSV()
         removeFalsePositives = self.configPanel.getRemoveFalsePositives()
+        perHitRows = self.configPanel.getPerHitRows()
+        rejectsSummary = self.configPanel.getRejectsSummary()
 
-        # Create Excel Workbook
-        if generateXLS:
-            baseCell = 0
-            fileNameExcel = os.path.join(baseReportDir, Case.getCurrentCase().getName() + "_CC_FEA.xls")
-            book = xlwt.Workbook(encoding="utf-8")
-            sheetFalsePositives = book.add_sheet("Autopsy Credit Cards")
-            styleRowHeaders = xlwt.easyxf('font: name Arial, color-index blue, bold on', num_format_str='#,##0.00')
-            sheetFalsePositives.write(0,0,"Card Number", styleRowHeaders)
-            sheetFalsePositives.write(0,1,"Valid", styleRowHeaders)
-            sheetFalsePositives.write(0,2,"Source", styleRowHeaders)
-
-        # Open report CSV file for writing
-        if generateCSV:
-            fileName = os.path.join(baseReportDir, self.getRelativeFilePath())
-            report = open(fileName, 'w')
+        # Create Excel Workbook and/or open report CSV file for writing
+        fileNameExcel = os.path.join(baseReportDir, Case.getCurrentCase().getName() + "_CC_FEA.xls")
+        fileName = os.path.join(baseReportDir, self.getRelativeFilePath())
+        reportWriter = CardReportWriter(fileName if generateCSV else None, fileNameExcel if generateXLS else None, aggregated = not perHitRows, dropInvalid = removeFalsePositives)
 
-            # write csv header row
-            report.write("card number;valid;source\n")
+        # issuer identification (card brand and valid lengths)
+        iinTableFile = os.path.join(PlatformUtil.getUserConfigDirectory(), self.IIN_TABLE_FILE)
+        iinIndex = IINIndex(iinTableFile if os.path.exists(iinTableFile) else IINIndex.SNAPSHOT_FILE).load()
+        self.log(Level.INFO, "FEA: %d IIN ranges loaded from %s" % (len(iinIndex), iinIndex.fileName))
 
         sleuthkitCase = Case.getCurrentCase().getSleuthkitCase()
 
-        ccArtifacts = sleuthkitCase.getBlackboardArtifacts(BlackboardArtifact.ARTIFACT_TYPE.TSK_ACCOUNT)
-        progressTotal = len(ccArtifacts)
+        # artifacts are streamed page by page rather than loaded all at once
+        ccArtifacts = ArtifactSource(BlackboardFetcher.forArtifactType(sleuthkitCase, BlackboardArtifact.ARTIFACT_TYPE.TSK_ACCOUNT))
+        progressTotal = ccArtifacts.countArtifacts()
 
         progressBar.setMaximumProgress(progressTotal + 1)
 
         artifactCount = 0
 
-        for artifactItem in ccArtifacts:
-            for attributeItem in artifactItem.getAttributes(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_CARD_NUMBER):
-                ccNumber = attributeItem.getDisplayString()
-                sourceFiles = sleuthkitCase.findAllFilesWhere("obj_id = " + str(attributeItem.getParentArtifact().getObjectID()))
-                sourceFile = ""
-                for file in sourceFiles:
-                    if sourceFile == "":
-                        sourceFile = file.getName()
-                    else:
-                        sourceFile = sourceFile + " & " + file.getName()
-
-                valid = True
-                if not self.is_luhn_valid(ccNumber):
-                    valid = False
-                
-                if generateXLS:
-                    baseCell += 1
-                    sheetFalsePositives.write(baseCell,0, ccNumber)
-                    if valid:
-                        sheetFalsePositives.write(baseCell,1, "Valid")
-                    else:
-                        sheetFalsePositives.write(baseCell,1, "Not Valid")
-                    sheetFalsePositives.write(baseCell,2,sourceFile)
-
-                if generateCSV:
-                    if valid:
-                        report.write("%s;Valid;%s\n" % (ccNumber,sourceFile))
-                    else:
-                        report.write("%s;Not Valid;%s\n" % (ccNumber,sourceFile))
-            artifactCount += 1
-            progressBar.increment()
+        sourceResolver = SourceFileResolver(sleuthkitCase)
+
+        # each distinct card number is validated once and reported in a single row;
+        # validation of large batches is spread across all processors
+        validator = ParallelCardValidator(iinIndex)
+        cardReport = CardReport(iinIndex, validator = validator)
+
+        # obvious false positives are counted and, if so configured, dropped before validation
+        prefilter = CardPrefilter()
+
+        def addBatch(ccNumbers, sourceFiles):
+            if removeFalsePositives:
+                ccNumbers, sourceFiles = prefilter.filterHits(ccNumbers, sourceFiles)
+            else:
+                prefilter.countHits(ccNumbers)
+
+            # card numbers new to the report are Luhn checked and classified batch by batch
+            hitRecords = cardReport.addHits(ccNumbers, sourceFiles)
+            if perHitRows:
+                for record, sourceFile in zip(hitRecords, sourceFiles):
+                    reportWriter.writeHit(record.ccNumber, record.valid, sourceFile, record.iin)
+
+        batchNumbers = []
+        batchSourceFiles = []
+        for artifactPage in ccArtifacts.iterPages():
+
+            # resolve the source files of the whole page in as few queries as possible
+            # (getObjectID() is the object id of an artifact's source file)
+            sourceResolver.prefetch([artifactItem.getObjectID() for artifactItem in artifactPage])
+
+            for artifactItem in artifactPage:
+                sourceFile = sourceResolver.getSourceFile(artifactItem.getObjectID())
+                for attributeItem in artifactItem.getAttributes(BlackboardAttribute.ATTRIBUTE_TYPE.TSK_CARD_NUMBER):
+                    batchNumbers.append(attributeItem.getDisplayString())
+                    batchSourceFiles.append(sourceFile)
+                artifactCount += 1
+                progressBar.increment()
+
+            if len(batchNumbers) >= self.VALIDATION_BATCH:
+                addBatch(batchNumbers, batchSourceFiles)
+                batchNumbers = []
+                batchSourceFiles = []
+
+        addBatch(batchNumbers, batchSourceFiles)
+        validator.close()
+
+        self.log(Level.INFO, "FEA: source file resolution - " + sourceResolver.getStats())
+        self.log(Level.INFO, "FEA: prefilter - " + prefilter.getStats())
+        self.log(Level.INFO, "FEA: card numbers - " + cardReport.getStats())
+        self.log(Level.INFO, "FEA: card validation - " + validator.getStats())
+
+        if not perHitRows:
+            reportWriter.write(cardReport)
+        if rejectsSummary:
+            reportWriter.writeRejects(prefilter)
+        self.log(Level.INFO, "FEA: report - " + reportWriter.getStats())
+
+        reportWriter.close()
         if generateCSV:
-            report.close()
             Case.getCurrentCase().addReport(fileName, self.moduleName, "Artifact Keyword Count Report")
         if generateXLS:
-            book.save(fileNameExcel)
             Case.getCurrentCase().addReport(fileNameExcel, self.moduleName, "FEA - Email Validation Report (eXcel)")
 
         # last step (file write) complete
@@ -159,32 +195,6 @@ class CCHitsReportModule(GeneralReportModuleAdapter):
 
 
 
-#   /$$                 /$$                
-#  | $$                | $$                
-#  | $$       /$$   /$$| $$$$$$$  /$$$$$$$ 
-#  | $$      | $$  | $$| $$__  $$| $$__  $$
-#  | $$      | $$  | $$| $$  \ $$| $$  \ $$
-#  | $$      | $$  | $$| $$  | $$| $$  | $$
-#  | $$$$$$$$|  $$$$$$/| $$  | $$| $$  | $$
-#  |________/ \______/ |__/  |__/|__/  |__/
-#                                          
-
-    def digits_of(self, number):
-        return [int(i) for i in str(number)]
-
-    def luhn_checksum(self, card_number):
-        digits = self.digits_of(card_number)
-        odd_digits = digits[-1::-2]
-        even_digits = digits[-2::-2]
-        total = sum(odd_digits)
-        for digit in even_digits:
-            total += sum(self.digits_of(2 * digit))
-        return total % 10
-
-    def is_luhn_valid(self, card_number):
-        return self.luhn_checksum(card_number) == 0
-
-
 #    /$$$$$$                       /$$$$$$  /$$                  /$$$$$$  /$$   /$$ /$$
 #   /$$__  $$                     /$$__  $$|__/                 /$$__  $$| $$  | $$|__/
 #  | $$  \__/  /$$$$$$  /$$$$$$$ | $$  \__/ /$$  /$$$$$$       | $$  \__/| $$  | $$ /$$
@@ -210,8 +220,12 @@ class FEA_CC_ConfigPanel(JPanel):
 
     generateXLS = True
     generateCSV = True
-    removeFalsePositives = True
+    removeFalsePositives = False
+    perHitRows = False
+    rejectsSummary = False
     cbRemoveFalsePositives = None
+    cbPerHitRows = None
+    cbRejectsSummary = None
     cbGenerateExcel = None
     cbGenerateCSV = None
     
@@ -222,12 +236,26 @@ class FEA_CC_ConfigPanel(JPanel):
         # get previous settings selected by the user
 
         if (ModuleSettings.getConfigSetting("FEA", "removeFalsePositives") != None) and (ModuleSettings.getConfigSetting("FEA","removeFalsePositives") != ""):
-            if ModuleSettings.getConfigSetting("FEA","removeFalsePositives"):
+            if ModuleSettings.getConfigSetting("FEA","removeFalsePositives") == "true":
                 self.cbRemoveFalsePositives.setSelected(True)
                 self.removeFalsePositives = True
             else:
                 self.cbRemoveFalsePositives.setSelected(False)
                 self.removeFalsePositives = False
+        if (ModuleSettings.getConfigSetting("FEA", "perHitRows") != None) and (ModuleSettings.getConfigSetting("FEA","perHitRows") != ""):
+            if ModuleSettings.getConfigSetting("FEA","perHitRows") == "true":
+                self.cbPerHitRows.setSelected(True)
+                self.perHitRows = True
+            else:
+                self.cbPerHitRows.setSelected(False)
+                self.perHitRows = False
+        if (ModuleSettings.getConfigSetting("FEA", "rejectsSummary") != None) and (ModuleSettings.getConfigSetting("FEA","rejectsSummary") != ""):
+            if ModuleSettings.getConfigSetting("FEA","rejectsSummary") == "true":
+                self.cbRejectsSummary.setSelected(True)
+                self.rejectsSummary = True
+            else:
+                self.cbRejectsSummary.setSelected(False)
+                self.rejectsSummary = False
         if (ModuleSettings.getConfigSetting("FEA", "generateCSV") != None) and (ModuleSettings.getConfigSetting("FEA","generateCSV") != ""):
             if ModuleSettings.getConfigSetting("FEA","generateCSV"):
                 self.cbGenerateCSV.setSelected(True)
@@ -260,6 +288,12 @@ class FEA_CC_ConfigPanel(JPanel):
     def getRemoveFalsePositives(self):
         return self.removeFalsePositives
 
+    def getPerHitRows(self):
+        return self.perHitRows
+
+    def getRejectsSummary(self):
+        return self.rejectsSummary
+
     def initComponents(self):
         self.setLayout(GridBagLayout())
 
@@ -281,12 +315,21 @@ class FEA_CC_ConfigPanel(JPanel):
         gbc.gridy = 3
         self.add(self.cbGenerateCSV, gbc)
 
-        self.cbRemoveFalsePositives = JCheckBox("Remove False Positives from Autopsy", actionPerformed=self.cbRemoveFalsePositivesActionPerformed)
-        self.cbRemoveFalsePositives.setSelected(True)
+        self.cbRemoveFalsePositives = JCheckBox("Remove false positives (invalid card numbers) from the report", actionPerformed=self.cbRemoveFalsePositivesActionPerformed)
+        self.cbRemoveFalsePositives.setSelected(False)
         gbc.gridy = 4
-        self.cbRemoveFalsePositives.setEnabled(False)
         self.add(self.cbRemoveFalsePositives, gbc)
 
+        self.cbPerHitRows = JCheckBox("One row per hit (do not aggregate repeated card numbers)", actionPerformed=self.cbPerHitRowsActionPerformed)
+        self.cbPerHitRows.setSelected(False)
+        gbc.gridy = 5
+        self.add(self.cbPerHitRows, gbc)
+
+        self.cbRejectsSummary = JCheckBox("Add a summary sheet of rejected hits (Excel report)", actionPerformed=self.cbRejectsSummaryActionPerformed)
+        self.cbRejectsSummary.setSelected(False)
+        gbc.gridy = 6
+        self.add(self.cbRejectsSummary, gbc)
+
 
     def cbGenerateExcelActionPerformed(self, event):
         source = event.getSource()
@@ -315,3 +358,20 @@ class FEA_CC_ConfigPanel(JPanel):
             ModuleSettings.setConfigSetting("FEA","removeFalsePositives","false")
             self.removeFalsePositives = False
 
+    def cbPerHitRowsActionPerformed(self, event):
+        source = event.getSource()
+        if(source.isSelected()):
+            ModuleSettings.setConfigSetting("FEA","perHitRows","true")
+            self.perHitRows = True
+        else:
+            ModuleSettings.setConfigSetting("FEA","perHitRows","false")
+            self.perHitRows = False
+
+    def cbRejectsSummaryActionPerformed(self, event):
+        source = event.getSource()
+        if(source.isSelected()):
+            ModuleSettings.setConfigSetting("FEA","rejectsSummary","true")
+            self.rejectsSummary = True
+        else:
+            ModuleSettings.setConfigSetting("FEA","rejectsSummary","false")
+            self.rejectsSummary = False
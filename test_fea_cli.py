@@ -0,0 +1,111 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import fea_cli
+from fea_cli import StageTimer
+
+
+class RecordingTimer(StageTimer):
+    # keeps the timer of the last run, so tests can see which stage was running
+    last = None
+
+    def __init__(self):
+        StageTimer.__init__(self, sys.stderr)
+        RecordingTimer.last = self
+
+
+class Runner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stderr = sys.stderr
+        sys.stderr = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+        fea_cli.StageTimer = RecordingTimer
+
+    def tearDown(self):
+        fea_cli.StageTimer = StageTimer
+        sys.stderr = self.stderr
+        shutil.rmtree(self.tmpdir)
+
+    def run_cli(self, command, lines, *options):
+        fileName = os.path.join(self.tmpdir, "hits.csv")
+        with io.open(fileName, "w", encoding="utf-8") as f:
+            f.write(u"".join(line + u"\n" for line in lines))
+        self.assertEqual(fea_cli.main([command, fileName, "--output-dir", self.tmpdir] + list(options)), 0)
+        return [stage for stage, elapsed in RecordingTimer.last.timings]
+
+    def read(self, name):
+        with io.open(os.path.join(self.tmpdir, name), encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_email(self):
+        # a fresh local TLD list, so that the run does not go to IANA
+        tldCache = os.path.join(self.tmpdir, "tlds.txt")
+        with open(tldCache, "w") as f:
+            f.write("# test list\nCOM\nORG\n")
+        stages = self.run_cli("email", [u"john@example.com,a.txt", u"john@example.com,a.txt", u"bad@example.zzz,b.txt"],
+                              "--tld-cache", tldCache)
+        self.assertEqual(stages, ["read", "validate", "write"])
+        rows = self.read("cli_FEA.csv")
+        self.assertEqual(rows[1:], ["john@example.com;1;com;1;example.com;0;0;n.a.;",
+                                    "bad@example.zzz;1;zzz;0;example.zzz;0;0;n.a.;"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, "cli_FEA.xls")))
+
+    def test_card(self):
+        stages = self.run_cli("card", [u"4111111111111111,a.txt", u"4111111111111112,b.txt", u"4111111111111111,c.txt"],
+                              "--workers", "1", "--remove-false-positives")
+        self.assertEqual(stages, ["read", "validate", "write"])
+        self.assertEqual(self.read("FEA-CC-JM.csv")[1:], ["4111111111111111;Valid;a.txt, c.txt;Visa;Valid;;2"])
+
+    def test_bitcoin(self):
+        validated = []
+        validateHits = fea_cli.validateHits
+        def recordingValidateHits(*args):
+            validated.append(RecordingTimer.last.started[0])
+            return validateHits(*args)
+        fea_cli.validateHits = recordingValidateHits
+        try:
+            stages = self.run_cli("bitcoin", [u"1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa,a.txt", u"1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb,b.txt",
+                                              u"5HueCGU8rMjxEXxiPuD5BDku4MkFqeZyd4dZ1jvhTVqvbTLvyTJ,c.txt"])
+        finally:
+            fea_cli.validateHits = validateHits
+        self.assertEqual(stages, ["read", "validate", "lookup", "write"])
+        # Base58Check validation is timed as part of the validate stage
+        self.assertEqual(validated, ["validate"])
+        report = "\n".join(self.read("FEA-BitCoin.txt"))
+        self.assertTrue("Wallet address: 1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa (user opted out" in report)
+        self.assertFalse("DivfNb" in report)
+        self.assertTrue("PRIVATE KEY FOUND: 5HueCGU8rMjxEXxiPuD5BDku4MkFqeZyd4dZ1jvhTVqvbTLvyTJ with wallet address: 1GAehh7TsJAHuUAeKZcXf5CnwuGuGgyX2S" in report)
+
+
+class ReadHits(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, text):
+        fileName = os.path.join(self.tmpdir, name)
+        with io.open(fileName, "w", encoding="utf-8") as f:
+            f.write(text)
+        return fileName
+
+    def test_csv_non_ascii(self):
+        fileName = self.write("hits.csv", u"jo\u00e3o@example.com,\"Documentos/Or\u00e7amento, 2016.txt\"\n\n"
+                                          u"4111111111111111\n")
+        self.assertEqual(fea_cli.readHits(fileName), [(u"jo\u00e3o@example.com", u"Documentos/Or\u00e7amento, 2016.txt"),
+                                                      (u"4111111111111111", u"")])
+
+    def test_jsonl_non_ascii(self):
+        fileName = self.write("hits.jsonl", u'{"email": "jo\u00e3o@example.com", "source": "Or\u00e7amento.txt"}\n\n'
+                                            u'{"card": "4111111111111111"}\n')
+        self.assertEqual(fea_cli.readHits(fileName), [(u"jo\u00e3o@example.com", u"Or\u00e7amento.txt"),
+                                                      (u"4111111111111111", u"")])
+
+
+if __name__ == "__main__":
+    unittest.main()
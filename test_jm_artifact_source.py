@@ -0,0 +1,142 @@
+from __future__ import print_function
+
+import time
+import unittest
+
+from jm_artifact_source import ArtifactSource, BlackboardFetcher, SyntheticBlackboard
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+class StubType(object):
+
+    def __init__(self, typeId):
+        self.typeId = typeId
+
+    def getTypeID(self):
+        return self.typeId
+
+
+class StubResultSet(object):
+
+    def next(self):
+        return True
+
+    def getLong(self, column):
+        return 42
+
+
+class StubQuery(object):
+
+    def __init__(self):
+        self.closed = False
+
+    def getResultSet(self):
+        return StubResultSet()
+
+    def close(self):
+        self.closed = True
+
+
+class StubCase(object):
+    # records the SQL handed to the SleuthkitCase methods BlackboardFetcher uses
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.clauses = []
+        self.query = StubQuery()
+
+    def getMatchingArtifacts(self, clause):
+        self.clauses.append(clause)
+        return self.pages.pop(0) if self.pages else []
+
+    def executeQuery(self, sql):
+        self.clauses.append(sql)
+        return self.query
+
+
+class StubArtifact(object):
+
+    def __init__(self, artifactId):
+        self.artifactId = artifactId
+
+    def getArtifactID(self):
+        return self.artifactId
+
+
+class Paging(unittest.TestCase):
+    def blackboard(self, count):
+        return SyntheticBlackboard(count, lambda n: "hit%d" % n, attributesPerArtifact=2, numFiles=10)
+
+    def test_pages(self):
+        blackboard = self.blackboard(1234)
+        source = ArtifactSource(blackboard, pageSize=500)
+        self.assertEqual(source.countArtifacts(), 1234)
+        self.assertEqual([len(page) for page in source.iterPages()], [500, 500, 234])
+        self.assertEqual(blackboard.queryCount, 3)
+
+    def test_full_last_page(self):
+        blackboard = self.blackboard(1000)
+        self.assertEqual([len(page) for page in ArtifactSource(blackboard, pageSize=500).iterPages()], [500, 500])
+        # one more query to find out that there is nothing left
+        self.assertEqual(blackboard.queryCount, 3)
+
+    def test_attributes_in_order(self):
+        source = ArtifactSource(self.blackboard(7), pageSize=3)
+        values = [attribute.getDisplayString() for artifact, attribute in source.iterAttributes(None)]
+        self.assertEqual(values, ["hit%d" % n for n in range(14)])
+
+    def test_empty(self):
+        self.assertEqual(list(ArtifactSource(self.blackboard(0)).iterArtifacts()), [])
+
+
+class Fetcher(unittest.TestCase):
+    def test_keyset_paging(self):
+        case = StubCase([[StubArtifact(3), StubArtifact(8)], [StubArtifact(12)]])
+        source = ArtifactSource(BlackboardFetcher.forArtifactType(case, StubType(39)), pageSize=2)
+        self.assertEqual([artifact.getArtifactID() for artifact in source.iterArtifacts()], [3, 8, 12])
+        self.assertEqual(case.clauses, [
+            "blackboard_artifacts.artifact_type_id = 39 ORDER BY blackboard_artifacts.artifact_id LIMIT 2",
+            "blackboard_artifacts.artifact_type_id = 39 AND blackboard_artifacts.artifact_id > 8 ORDER BY blackboard_artifacts.artifact_id LIMIT 2"])
+
+    def test_set_name_is_quoted(self):
+        case = StubCase([])
+        fetcher = BlackboardFetcher.forSetName(case, StubType(10), "O'Brien's wallets")
+        self.assertEqual(fetcher.countArtifacts(), 42)
+        self.assertTrue(case.query.closed)
+        self.assertEqual(case.clauses, ["SELECT COUNT(*) AS count FROM blackboard_artifacts WHERE blackboard_artifacts.artifact_id IN "
+                                        "(SELECT artifact_id FROM blackboard_attributes WHERE attribute_type_id = 10 AND value_text = 'O''Brien''s wallets')"])
+
+
+class Streaming(unittest.TestCase):
+    def test_speed(self):
+        # throughput and peak memory of streaming a synthetic blackboard; the
+        # peak should not grow with the number of artifacts
+        if not BENCH:
+            return
+        try:
+            import tracemalloc
+        except ImportError:
+            tracemalloc = None
+        peaks = []
+        for count in (100000, 1000000):
+            source = ArtifactSource(SyntheticBlackboard(count, lambda n: "user%d@example.com" % n))
+            if tracemalloc:
+                tracemalloc.start()
+            start = time.time()
+            hits = 0
+            for artifact, attribute in source.iterAttributes(None):
+                hits += 1
+            elapsed = time.time() - start
+            peak = 0
+            if tracemalloc:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            peaks.append(peak)
+            print("%d artifacts: %.2f s, %d artifacts/s, peak %d KiB" % (count, elapsed, hits / elapsed, peak // 1024))
+        self.assertTrue(peaks[-1] <= 2 * peaks[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from __future__ import print_function
+
+import binascii
+import random
+import time
+import unittest
+
+from hashlib import sha256
+
+from jm_base58 import Base58CheckValidator, decode, decodeCheck, decodeInt, encode, encodeCheck, isValidBase58Check
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+GENESIS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+
+
+def to_bytes(n, length, endianess='big'):
+    h = '%x' % n
+    s = binascii.unhexlify(('0'*(len(h) % 2) + h).zfill(length*2))
+    return s if endianess == 'big' else s[::-1]
+
+
+def old_check_bc(bc):
+    # the check the report modules used before the codec; raises ValueError
+    # for characters outside the alphabet
+    digits58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+    n = 0
+    for char in bc:
+        n = n * 58 + digits58.index(char)
+    bcbytes = to_bytes(n, 25, 'big')
+    return bcbytes[-4:] == sha256(sha256(bcbytes[:-4]).digest()).digest()[:4]
+
+
+def randomBytes(generator, length):
+    return bytes(bytearray(generator.randrange(256) for i in range(length)))
+
+
+def candidates(count, seed=17):
+    # about half valid addresses (P2PKH and P2SH), the rest with one character changed
+    generator = random.Random(seed)
+    result = []
+    for i in range(count):
+        address = encodeCheck(generator.choice((b"\0", b"\5")) + randomBytes(generator, 20))
+        if i % 2:
+            n = generator.randrange(1, len(address))
+            address = address[:n] + generator.choice("23456789ABCDEFGH") + address[n + 1:]
+        result.append(address)
+    return result
+
+
+class Codec(unittest.TestCase):
+    def test_round_trip(self):
+        generator = random.Random(58)
+        for length in (0, 1, 2, 21, 25, 37, 38):
+            for i in range(50):
+                data = randomBytes(generator, length)
+                self.assertEqual(decode(encode(data)), data)
+                self.assertEqual(decodeCheck(encodeCheck(data)), data)
+
+    def test_leading_zero_bytes(self):
+        self.assertEqual(encode(b"\0\0\1"), "112")
+        self.assertEqual(decode("112"), b"\0\0\1")
+        self.assertEqual(encode(b"\0\0"), "11")
+        self.assertEqual(decode("11"), b"\0\0")
+        self.assertEqual(encode(b""), "")
+        self.assertEqual(decode(GENESIS)[:1], b"\0")
+        self.assertEqual(len(decode(GENESIS)), 25)
+
+    def test_known_address(self):
+        self.assertEqual(binascii.hexlify(decodeCheck(GENESIS)), b"0062e907b15cbf27d5425399ebf6f0fb50ebb88f18")
+        self.assertEqual(encodeCheck(decodeCheck(GENESIS)), GENESIS)
+
+    def test_bad_characters(self):
+        for text in ("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfN0", "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNO", "1A1zP1eP5QGefi2DMPTfTL5SLmv7Divf-a",
+                     u"1A1zP1eP5QGefi2DMPTfTL5SLmv7Divf\u00e9a", u"1A1zP1eP5QGefi2DMPTfTL5SLmv7Divf\u20aca"):
+            self.assertRaises(ValueError, decodeInt, text)
+            self.assertRaises(ValueError, decode, text)
+            self.assertFalse(isValidBase58Check(text))
+
+    def test_bad_checksum(self):
+        self.assertEqual(decodeCheck("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb"), None)
+        self.assertEqual(decodeCheck("1"), None)
+        self.assertFalse(isValidBase58Check("1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb"))
+
+    def test_same_as_old_check(self):
+        texts = candidates(2000) + [GENESIS, "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy", "1", "", "z" * 40,
+                                    "5HueCGU8rMjxEXxiPuD5BDku4MkFqeZyd4dZ1jvhTVqvbTLvyTJ"]
+        self.assertEqual([isValidBase58Check(text) for text in texts], [old_check_bc(text) for text in texts])
+        self.assertTrue(sum(isValidBase58Check(text) for text in texts) > 900)
+
+
+class Validator(unittest.TestCase):
+    def test_hits_and_misses(self):
+        validator = Base58CheckValidator()
+        self.assertEqual(validator.isValidMany([GENESIS, "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb", GENESIS, "0OIl"]),
+                         [True, False, True, False])
+        self.assertEqual((validator.hits, validator.misses), (1, 3))
+        self.assertEqual(validator.getStats(), "1 cache hits, 3 cache misses")
+
+    def test_least_recently_used_is_evicted(self):
+        validator = Base58CheckValidator(cacheSize=2)
+        a, b, c = candidates(3)
+        validator.isValid(a)
+        validator.isValid(b)
+        validator.isValid(a)
+        validator.isValid(c)
+        self.assertEqual(list(validator.cache), [a, c])
+        validator.isValid(b)
+        self.assertEqual((validator.hits, validator.misses), (1, 4))
+
+    def test_speed(self):
+        # 1M candidates, 25k distinct: the old check, the codec and the memoised codec
+        if not BENCH:
+            return
+        distinct = candidates(25000)
+        texts = [distinct[i % len(distinct)] for i in range(1000000)]
+        timings = []
+        for label, check in (("old check_bc", lambda texts: [old_check_bc(text) for text in texts]),
+                             ("codec", lambda texts: [isValidBase58Check(text) for text in texts]),
+                             ("memoised", Base58CheckValidator().isValidMany)):
+            start = time.time()
+            valid = check(texts)
+            timings.append(time.time() - start)
+            print("%d candidates, %-12s: %.2f s, %d/s" % (len(texts), label, timings[-1], len(texts) / timings[-1]))
+        self.assertTrue(timings[2] * 10 < timings[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+from __future__ import print_function
+
+import binascii
+import hashlib
+import random
+import unittest
+
+from collections import OrderedDict
+
+from ecdsa import SigningKey, SECP256k1
+
+from jm_base58 import encodeCheck
+from jm_bitcoin_report import BlockchainReport, getAddressFromPrivateKey
+from jm_secp256k1 import N
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+class DictKeywordHit(object):
+    # a keyword hit as it was before __slots__
+
+    def __init__(self, keyword):
+        self.keyword = keyword
+        self.hits = 0
+        self.sources = []
+        self.moreSources = False
+
+
+def wif(secret, compressed=False):
+    return encodeCheck(b"\x80" + binascii.unhexlify("%064x" % secret) + (b"\x01" if compressed else b""))
+
+
+def ecdsaAddress(secret, compressed=False):
+    # the address of secret, derived with the ecdsa package
+    point = SigningKey.from_secret_exponent(secret, curve=SECP256k1).get_verifying_key().pubkey.point
+    x = binascii.unhexlify("%064x" % point.x())
+    if compressed:
+        pubkey = (b"\x03" if point.y() & 1 else b"\x02") + x
+    else:
+        pubkey = b"\x04" + x + binascii.unhexlify("%064x" % point.y())
+    return encodeCheck(b"\x00" + hashlib.new("ripemd160", hashlib.sha256(pubkey).digest()).digest())
+
+
+class PrivateKeys(unittest.TestCase):
+    def test_known_keys(self):
+        for key, address in (("5HueCGU8rMjxEXxiPuD5BDku4MkFqeZyd4dZ1jvhTVqvbTLvyTJ", "1GAehh7TsJAHuUAeKZcXf5CnwuGuGgyX2S"),
+                             ("5HpHagT65TZzG1PH3CSu63k8DbpvD8s5ip4nEB3kEsreAnchuDf", "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm"),
+                             ("KwDiBf89QgGbjEhKnhXJuH7LrciVrZi3qYjgd9M7rFU73sVHnoWn", "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH")):
+            self.assertEqual(getAddressFromPrivateKey(key), address, key)
+
+    def test_same_as_ecdsa(self):
+        generator = random.Random(21)
+        for secret in [1, 2, N - 1] + [generator.randrange(1, N) for i in range(20)]:
+            for compressed in (False, True):
+                self.assertEqual(getAddressFromPrivateKey(wif(secret, compressed)), ecdsaAddress(secret, compressed))
+
+    def test_invalid_secrets_are_rejected(self):
+        for secret in (0, N, N + 1, 2 ** 256 - 1):
+            for compressed in (False, True):
+                self.assertEqual(getAddressFromPrivateKey(wif(secret, compressed)), None, secret)
+
+    def test_not_a_key(self):
+        key = wif(12345)
+        self.assertEqual(getAddressFromPrivateKey(key[:-1] + ("2" if key[-1] != "2" else "3")), None)
+        self.assertEqual(getAddressFromPrivateKey("5HueCGU8rMjxEXxiPuD5BDku4MkFqeZyd4dZ1jvhTVqvbTLvyT0"), None)
+        self.assertEqual(getAddressFromPrivateKey("1GAehh7TsJAHuUAeKZcXf5CnwuGuGgyX2S"), None)
+        self.assertEqual(getAddressFromPrivateKey(encodeCheck(b"\x80" + b"\x01" * 32 + b"\x02")), None)
+
+
+class Hits(unittest.TestCase):
+    def test_repeated_hits_collapse(self):
+        report = BlockchainReport()
+        for sourceFile in ("a.txt", "b.txt", "a.txt"):
+            report.addHit("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", sourceFile)
+        report.addHit("3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy", "c.txt")
+        hits = list(report.getAllHits())
+        self.assertEqual([hit.keyword for hit in hits], ["1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy"])
+        self.assertEqual(hits[0].hits, 3)
+        self.assertEqual(hits[0].getSources(), "a.txt, b.txt")
+        self.assertEqual(report.getStats(), "4 hits, 2 distinct, 0 wallet addresses, 0 private keys")
+
+    def test_sources_are_capped(self):
+        report = BlockchainReport(maxSources=2)
+        for sourceFile in ("a.txt", "b.txt", "c.txt", "a.txt"):
+            report.addHit("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", sourceFile)
+        self.assertEqual(list(report.getAllHits())[0].getSources(), "a.txt, b.txt, ...")
+
+    def test_records_share_their_hit(self):
+        report = BlockchainReport()
+        report.addHit("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", "a.txt")
+        report.addHit("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", "b.txt")
+        hit = list(report.getAllHits())[0]
+        report.addBlockchainRecord(hit.keyword, 0, "n.a.", "0.00000000", "0.00000000", hit)
+        record = list(report.getAllRecords())[0]
+        self.assertEqual((record.getHits(), record.getSources()), (2, "a.txt, b.txt"))
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_bytes_per_hit(self):
+        # memory held per distinct keyword hit, against dict-based objects in the same index
+        if not BENCH:
+            return
+        try:
+            import tracemalloc
+        except ImportError:
+            return
+        count = 200000
+        keywords = ["1Wallet%027d" % i for i in range(count)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        hits = OrderedDict((keyword, DictKeywordHit(keyword)) for keyword in keywords)
+        for hit in hits.values():
+            hit.sources.append("wallet.dat")
+        dictBytes = (tracemalloc.get_traced_memory()[0] - before) / float(count)
+        del hits
+        before = tracemalloc.get_traced_memory()[0]
+        report = BlockchainReport()
+        for keyword in keywords:
+            report.addHit(keyword, "wallet.dat")
+        reportBytes = (tracemalloc.get_traced_memory()[0] - before) / float(count)
+        tracemalloc.stop()
+        print("%d hits: %.0f bytes/hit with dict objects, %.0f bytes/hit in the report" % (count, dictBytes, reportBytes))
+        self.assertTrue(reportBytes < dictBytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
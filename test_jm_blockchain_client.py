@@ -0,0 +1,140 @@
+import json
+import unittest
+
+from jm_blockchain_client import BlockchainClient, MockBlockchainBackend
+from jm_blockchain_client import NOT_AVAILABLE, formatBalance
+
+
+class FakeResponse(object):
+
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    def read(self):
+        return self.body.encode("utf-8")
+
+    def getheader(self, name):
+        return self.headers.get(name)
+
+
+class FakeConnection(object):
+    # answers /balance and /q/addressfirstseen like blockchain.info: a balance
+    # request naming any address in rejected is refused with a 400 as a whole
+
+    def __init__(self, balances, rejected=(), failures=()):
+        self.balances = balances
+        self.rejected = set(rejected)
+        self.failures = list(failures)
+        self.paths = []
+        self.path = None
+
+    def request(self, method, path):
+        self.paths.append(path)
+        self.path = path
+
+    def getresponse(self):
+        if self.failures:
+            return self.failures.pop(0)
+        if self.path.startswith("/q/addressfirstseen/"):
+            return FakeResponse(200, "1231006505")
+        addresses = self.path[len("/balance?active="):].split("|")
+        if self.rejected.intersection(addresses):
+            return FakeResponse(400, "Checksum does not validate")
+        return FakeResponse(200, json.dumps(dict((address, self.balances[address]) for address in addresses)))
+
+    def close(self):
+        pass
+
+
+class FakeClient(BlockchainClient):
+
+    def __init__(self, connection, **kwargs):
+        BlockchainClient.__init__(self, sleep=lambda seconds: None, **kwargs)
+        self.fake = connection
+
+    def connect(self):
+        return self.fake
+
+
+def balances(count):
+    return dict(("1addr%d" % i, {"final_balance": i, "n_tx": 0, "total_received": 2 * i}) for i in range(count))
+
+
+class FormatBalance(unittest.TestCase):
+    def test_satoshis(self):
+        self.assertEqual(formatBalance(0), "0.00000000")
+        self.assertEqual(formatBalance(1), "0.00000001")
+        self.assertEqual(formatBalance(123456789), "1.23456789")
+
+    def test_large_balance(self):
+        self.assertEqual(formatBalance(2099999997690000), "20999999.97690000")
+
+
+class Client(unittest.TestCase):
+    def test_batches(self):
+        connection = FakeConnection(balances(250))
+        client = FakeClient(connection)
+        results = client.lookupMany(sorted(connection.balances))
+        self.assertEqual(len(connection.paths), 3)
+        self.assertEqual(results["1addr7"], ("0.00000007", "0.00000014", "n.a."))
+
+    def test_one_request_per_batch_of_active_addresses(self):
+        connection = FakeConnection(dict(("1addr%d" % i, {"final_balance": i, "n_tx": 3, "total_received": i})
+                                         for i in range(250)))
+        results = FakeClient(connection).lookupMany(sorted(connection.balances))
+        self.assertEqual(len(connection.paths), 3)
+        self.assertEqual(set(result[2] for result in results.values()), set(["n.a."]))
+
+    def test_first_seen_only_with_transactions(self):
+        connection = FakeConnection({"1used": {"final_balance": 0, "n_tx": 2, "total_received": 5},
+                                     "1unused": {"final_balance": 0, "n_tx": 0, "total_received": 0}})
+        results = FakeClient(connection, firstSeen=True).lookupMany(["1used", "1unused"])
+        self.assertEqual(connection.paths[1:], ["/q/addressfirstseen/1used"])
+        self.assertNotEqual(results["1used"][2], "n.a.")
+        self.assertEqual(results["1unused"][2], "n.a.")
+
+    def test_rejected_address_only_loses_its_own_balance(self):
+        connection = FakeConnection(balances(100), rejected=["1addr42"])
+        client = FakeClient(connection)
+        results = client.lookupMany(sorted(connection.balances))
+        self.assertEqual(results["1addr42"], NOT_AVAILABLE)
+        for address in connection.balances:
+            if address != "1addr42":
+                self.assertNotEqual(results[address], NOT_AVAILABLE, address)
+        # halving isolates the address in about 2 * log2(100) requests
+        self.assertTrue(len(connection.paths) <= 15, len(connection.paths))
+        self.assertEqual(client.failures, client.splits + 1)
+
+    def test_retries_server_errors(self):
+        connection = FakeConnection(balances(3), failures=[FakeResponse(503, ""),
+                                                           FakeResponse(429, "", {"Retry-After": "2"})])
+        waits = []
+        client = FakeClient(connection)
+        client.sleep = waits.append
+        results = client.lookupMany(sorted(connection.balances))
+        self.assertEqual(results["1addr2"][0], "0.00000002")
+        self.assertEqual(client.retried, 2)
+        self.assertEqual(waits, [1.0, 2])
+
+    def test_gives_up_after_retries(self):
+        connection = FakeConnection(balances(2), failures=[FakeResponse(500, "")] * 4)
+        client = FakeClient(connection)
+        results = client.lookupMany(sorted(connection.balances))
+        self.assertEqual(set(results.values()), set([NOT_AVAILABLE]))
+        self.assertEqual(client.failures, 1)
+        self.assertEqual(client.splits, 0)
+
+
+class Mock(unittest.TestCase):
+    def test_batches_and_default(self):
+        backend = MockBlockchainBackend({"1known": ("1.00000000", "2.00000000", "n.a.")}, batchSize=2)
+        results = backend.lookupMany(["1known", "1other", "1third"])
+        self.assertEqual(results["1known"][0], "1.00000000")
+        self.assertEqual(results["1other"], NOT_AVAILABLE)
+        self.assertEqual(backend.requests, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
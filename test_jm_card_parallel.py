@@ -0,0 +1,101 @@
+from __future__ import print_function
+
+import random
+import time
+import unittest
+
+from jm_card_parallel import ParallelCardValidator, cpuCount
+from jm_card_report import validateCards
+from jm_iin_index import IINIndex
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+def cardNumbers(count, seed=16):
+    # a mix of brands and lengths, about a tenth of them Luhn valid, and a few non-digit hits
+    generator = random.Random(seed)
+    numbers = []
+    for i in range(count):
+        number = "%0*d" % (generator.choice((13, 15, 16, 16, 16, 19)), generator.randrange(10 ** 12, 10 ** 13) * 1000 + i % 1000)
+        numbers.append(number if i % 97 else number[:4] + "-" + number[4:])
+    return numbers
+
+
+class Validate(unittest.TestCase):
+    iinIndex = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.iinIndex = IINIndex().load()
+
+    def check(self, ccNumbers, **kwargs):
+        validator = ParallelCardValidator(self.iinIndex, minParallel=0, **kwargs)
+        try:
+            self.assertEqual(validator.validate(ccNumbers), validateCards(ccNumbers, self.iinIndex))
+        finally:
+            validator.close()
+        return validator
+
+    def test_threads(self):
+        validator = self.check(cardNumbers(1003), workers=4, useProcesses=False, chunkSize=100)
+        self.assertEqual(validator.parallelBatches, 1)
+
+    def test_processes(self):
+        validator = self.check(cardNumbers(1003), workers=3, useProcesses=True, chunkSize=64)
+        self.assertEqual(validator.parallelBatches, 1)
+
+    def test_more_workers_than_chunks(self):
+        self.check(cardNumbers(150), workers=8, useProcesses=False, chunkSize=100)
+
+    def test_single_worker(self):
+        validator = self.check(cardNumbers(500), workers=1, useProcesses=True, chunkSize=7)
+        self.assertEqual((validator.batches, validator.parallelBatches), (1, 0))
+        self.assertEqual(validator.pool, None)
+
+    def test_empty(self):
+        for useProcesses in (False, True):
+            self.check([], workers=2, useProcesses=useProcesses)
+
+    def test_small_batches_stay_serial(self):
+        validator = ParallelCardValidator(self.iinIndex, workers=4, useProcesses=False, minParallel=1000)
+        self.assertEqual(validator.validate(cardNumbers(999)), validateCards(cardNumbers(999), self.iinIndex))
+        self.assertEqual(validator.parallelBatches, 0)
+
+    def test_pool_is_reused(self):
+        validator = ParallelCardValidator(self.iinIndex, workers=2, useProcesses=True, chunkSize=50, minParallel=0)
+        try:
+            for count in (120, 77):
+                ccNumbers = cardNumbers(count, seed=count)
+                pool = validator.pool
+                self.assertEqual(validator.validate(ccNumbers), validateCards(ccNumbers, self.iinIndex))
+                self.assertTrue(pool is None or validator.pool is pool)
+        finally:
+            validator.close()
+        self.assertEqual(validator.pool, None)
+
+    def test_speed(self):
+        # card numbers validated per second with 1, 2, 4 and 8 workers
+        if not BENCH:
+            return
+        ccNumbers = cardNumbers(1000000)
+        expected = validateCards(ccNumbers, self.iinIndex)
+        print("%d CPUs" % cpuCount())
+        for useProcesses in (False, True):
+            for workers in (1, 2, 4, 8):
+                validator = ParallelCardValidator(self.iinIndex, workers=workers, useProcesses=useProcesses, minParallel=0)
+                try:
+                    # the first batch pays for starting the pool
+                    validator.validate(ccNumbers[:workers * validator.chunkSize])
+                    start = time.time()
+                    result = validator.validate(ccNumbers)
+                    elapsed = time.time() - start
+                finally:
+                    validator.close()
+                self.assertEqual(result, expected)
+                print("%s, %d workers: %.2f s, %d cards/s" % ("processes" if useProcesses else "threads", workers,
+                                                               elapsed, len(ccNumbers) / elapsed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+from __future__ import print_function
+
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from jm_card_report import CardPrefilter, CardReport, CardReportWriter
+from jm_card_report import is_luhn_valid, luhn_checksum, luhnSum, luhnValidMany
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+def digits_of(number):
+    return [int(i) for i in str(number)]
+
+
+def oldLuhnValid(card_number):
+    # the digit list implementation the table-driven check replaced
+    digits = digits_of(card_number)
+    total = sum(digits[-1::-2])
+    for digit in digits[-2::-2]:
+        total += sum(digits_of(2 * digit))
+    return total % 10 == 0
+
+
+class RecordingSheet(object):
+
+    def __init__(self):
+        self.cells = {}
+
+    def write(self, row, column, value, style=None):
+        self.cells[(row, column)] = value
+
+    def rows(self):
+        count = max(row for row, column in self.cells) + 1
+        return [tuple(self.cells.get((row, column)) for column in range(3)) for row in range(1, count)]
+
+
+class RecordingBook(object):
+
+    def __init__(self):
+        self.sheets = {}
+
+    def add_sheet(self, name):
+        sheet = self.sheets[name] = RecordingSheet()
+        return sheet
+
+
+# Luhn valid, Luhn valid with a run of zeros, not valid (twice), repeated digit (Luhn valid)
+HITS = ["4111111111111111", "4000000000000002", "4111111111111112", "4111111111111112", "0000000000000000"]
+
+
+class Luhn(unittest.TestCase):
+    def test_known_numbers(self):
+        self.assertTrue(is_luhn_valid("4111111111111111"))
+        self.assertTrue(is_luhn_valid(378282246310005))
+        self.assertFalse(is_luhn_valid("4111111111111112"))
+        self.assertEqual(luhn_checksum("4111111111111112"), 1)
+        self.assertEqual(luhnSum("79927398713"), 70)
+
+    def test_same_as_digit_lists(self):
+        # every length the report can see, including the padded and long paths
+        generator = random.Random(4111)
+        numbers = ["%0*d" % (n, generator.randrange(10 ** n)) for n in range(1, 30) for i in range(200)]
+        self.assertEqual(luhnValidMany(numbers), [oldLuhnValid(number) for number in numbers])
+        self.assertEqual([is_luhn_valid(number) for number in numbers], [oldLuhnValid(number) for number in numbers])
+
+    def test_not_digits(self):
+        numbers = ["4111-1111-1111-1111", "4111 1111 1111 1111", "411111111111111x", "4111111111111111"]
+        self.assertEqual(luhnValidMany(numbers), [False, False, False, True])
+        self.assertFalse(is_luhn_valid("4111-1111-1111-1111"))
+        self.assertRaises(ValueError, luhn_checksum, "4111-1111-1111-1111")
+
+    def test_speed(self):
+        # 10M synthetic 16 digit PANs through the old and the batched check
+        if not BENCH:
+            return
+        generator = random.Random(4111)
+        numbers = ["%016d" % generator.randrange(10 ** 16) for i in range(1000000)] * 10
+        start = time.time()
+        expected = [oldLuhnValid(number) for number in numbers]
+        old = time.time() - start
+        start = time.time()
+        valid = luhnValidMany(numbers)
+        new = time.time() - start
+        print("%d PANs: %.2f s with digit lists, %.2f s with luhnValidMany (%.1fx)" % (len(numbers), old, new, old / new))
+        self.assertEqual(valid, expected)
+        self.assertTrue(old > 10 * new)
+
+
+class Rejects(unittest.TestCase):
+    def report(self, removeFalsePositives):
+        prefilter = CardPrefilter()
+        ccNumbers = list(HITS)
+        sourceFiles = ["file%d" % i for i in range(len(HITS))]
+        if removeFalsePositives:
+            ccNumbers, sourceFiles = prefilter.filterHits(ccNumbers, sourceFiles)
+        else:
+            prefilter.countHits(ccNumbers)
+        cardReport = CardReport()
+        cardReport.addHits(ccNumbers, sourceFiles)
+        writer = CardReportWriter(None, "unused.xls", aggregated=True, dropInvalid=removeFalsePositives)
+        writer.book = RecordingBook()
+        writer.sheetFalsePositives = RecordingSheet()
+        writer.write(cardReport)
+        writer.writeRejects(prefilter)
+        return writer, dict((reason, (hits, status)) for reason, hits, status in writer.book.sheets["Rejects"].rows())
+
+    def test_flagged_when_kept(self):
+        writer, rejects = self.report(False)
+        self.assertEqual(writer.writtenRows, 4)
+        self.assertEqual(rejects[CardPrefilter.ZEROS], (1, CardReportWriter.FLAGGED))
+        self.assertEqual(rejects[CardPrefilter.REPEATED_DIGIT], (1, CardReportWriter.FLAGGED))
+        self.assertEqual(rejects[CardPrefilter.SEQUENTIAL], (0, CardReportWriter.FLAGGED))
+        # the Not Valid rows are in the report, and counted
+        self.assertEqual(rejects[CardReportWriter.NOT_VALID], (2, CardReportWriter.FLAGGED))
+        self.assertEqual(writer.droppedHits, 0)
+
+    def test_rejected_when_removed(self):
+        writer, rejects = self.report(True)
+        self.assertEqual(writer.writtenRows, 1)
+        self.assertEqual(rejects[CardPrefilter.ZEROS], (1, CardReportWriter.REJECTED))
+        self.assertEqual(rejects[CardReportWriter.NOT_VALID], (2, CardReportWriter.REJECTED))
+        self.assertEqual((writer.droppedRows, writer.droppedHits), (1, 2))
+
+
+class Writer(unittest.TestCase):
+    def test_non_ascii_issuer(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(tmpdir, "FEA-CC-JM.csv")
+            writer = CardReportWriter(fileName)
+            writer.writeHit("4111111111111111", True, "file", (u"Visa", "Valid", u"Banco Econ\u00f3mico"))
+            writer.close()
+            with io.open(fileName, encoding="utf-8") as f:
+                self.assertEqual(f.read().splitlines()[1], u"4111111111111111;Valid;file;Visa;Valid;Banco Econ\u00f3mico")
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class Prefilter(unittest.TestCase):
+    def test_reasons(self):
+        prefilter = CardPrefilter()
+        self.assertEqual(prefilter.check("4111111111111111"), None)
+        self.assertEqual(prefilter.check("41111111111"), CardPrefilter.BAD_LENGTH)
+        self.assertEqual(prefilter.check("41111111111111111111"), CardPrefilter.BAD_LENGTH)
+        self.assertEqual(prefilter.check("4111-1111-1111-1111"), CardPrefilter.NOT_DIGITS)
+        self.assertEqual(prefilter.check("5555555555555555"), CardPrefilter.REPEATED_DIGIT)
+        self.assertEqual(prefilter.check("1234567890123456"), CardPrefilter.SEQUENTIAL)
+        self.assertEqual(prefilter.check("6543210987654321"), CardPrefilter.SEQUENTIAL)
+        self.assertEqual(prefilter.check("4000000000000002"), CardPrefilter.ZEROS)
+
+    def test_count_keeps_hits(self):
+        prefilter = CardPrefilter()
+        prefilter.countHits(HITS)
+        self.assertFalse(prefilter.removing)
+        self.assertEqual((prefilter.checked, prefilter.getRejected()), (5, 2))
+
+    def test_filter_removes_hits(self):
+        prefilter = CardPrefilter()
+        kept, sources = prefilter.filterHits(HITS, list("abcde"))
+        self.assertTrue(prefilter.removing)
+        self.assertEqual(kept, ["4111111111111111", "4111111111111112", "4111111111111112"])
+        self.assertEqual(sources, ["a", "c", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import socket
+import threading
+import unittest
+
+import jm_domain_lookup
+from jm_domain_lookup import DomainResolver, UNKNOWN, socketLookup
+
+
+class StubResolver(object):
+    # lookup(name) stand-in: names in hang block until released, names in
+    # flaky fail that many times before answering, names in down always fail
+
+    def __init__(self, existing=(), hang=(), flaky=None, down=()):
+        self.existing = set(existing)
+        self.hang = set(hang)
+        self.flaky = dict(flaky or {})
+        self.down = set(down)
+        self.release = threading.Event()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, name):
+        with self.lock:
+            self.calls.append(name)
+            if self.flaky.get(name):
+                self.flaky[name] -= 1
+                raise socket.error("temporary failure")
+        if name in self.hang:
+            self.release.wait()
+        if name in self.down:
+            raise socket.error("resolver unreachable")
+        return name in self.existing
+
+
+class Resolver(unittest.TestCase):
+    def resolver(self, stub, **kwargs):
+        kwargs.setdefault("backoff", 0)
+        return DomainResolver(lookup=stub, **kwargs)
+
+    def test_valid_and_invalid(self):
+        stub = StubResolver(existing=["example.com"])
+        valid, invalid, unknown = self.resolver(stub).resolveAll(["example.com", "nx.example", "example.com"])
+        self.assertEqual(valid, ["example.com"])
+        self.assertEqual(invalid, ["nx.example"])
+        self.assertEqual(unknown, [])
+        self.assertEqual(sorted(stub.calls), ["example.com", "nx.example"])
+
+    def test_retries_transient_failures(self):
+        stub = StubResolver(existing=["example.com"], flaky={"example.com": 2})
+        resolver = self.resolver(stub, retries=2)
+        self.assertEqual(resolver.resolve("example.com"), True)
+        self.assertEqual(resolver.queries, 3)
+        self.assertEqual(resolver.failures, 0)
+
+    def test_failure_after_retries_is_unknown(self):
+        stub = StubResolver(existing=["example.com"], down=["example.com"])
+        resolver = self.resolver(stub, retries=1)
+        valid, invalid, unknown = resolver.resolveAll(["example.com"])
+        self.assertEqual((valid, invalid, unknown), ([], [], ["example.com"]))
+        self.assertEqual(resolver.queries, 2)
+        self.assertEqual(resolver.failures, 1)
+
+    def test_timeout_is_unknown(self):
+        stub = StubResolver(existing=["slow.example", "example.com"], hang=["slow.example"])
+        resolver = self.resolver(stub, timeout=0.05, retries=1)
+        try:
+            valid, invalid, unknown = resolver.resolveAll(["slow.example", "example.com"])
+        finally:
+            stub.release.set()
+        self.assertEqual(valid, ["example.com"])
+        self.assertEqual(invalid, [])
+        self.assertEqual(unknown, ["slow.example"])
+        self.assertEqual(stub.calls.count("slow.example"), 2)
+
+    def test_hung_lookups_do_not_add_threads(self):
+        hung = ["hung%d.example" % i for i in range(40)]
+        stub = StubResolver(existing=["example.com"], hang=hung)
+        resolver = self.resolver(stub, maxInFlight=4, maxHelpers=6, timeout=0.02, retries=1)
+        threads = threading.active_count()
+        try:
+            valid, invalid, unknown = resolver.resolveAll(hung)
+            self.assertEqual(sorted(unknown), sorted(hung))
+            self.assertEqual(resolver.helpers, 6)
+            self.assertTrue(threading.active_count() <= threads + 6)
+            # every lookup thread is stuck, so queries time out without more threads
+            self.assertEqual(resolver.resolveAll(["example.com"]), ([], [], ["example.com"]))
+            self.assertEqual(resolver.helpers, 6)
+        finally:
+            stub.release.set()
+        # once released, the same threads serve the next queries
+        resolver.results.clear()
+        resolver.timeout = 1.0
+        self.assertEqual(resolver.resolveAll(["example.com", "nx.example"]), (["example.com"], ["nx.example"], []))
+        self.assertEqual(resolver.helpers, 6)
+
+    def test_lookup_threads_are_reused(self):
+        stub = StubResolver(existing=["example.com"])
+        resolver = self.resolver(stub, maxInFlight=2)
+        resolver.resolveAll(["host%d.example" % i for i in range(100)])
+        self.assertTrue(resolver.helpers <= 4)
+        self.assertEqual(resolver.queries, 100)
+
+    def test_on_result(self):
+        stub = StubResolver(existing=["example.com"], down=["down.example"])
+        results = {}
+        self.resolver(stub, retries=0).resolveAll(["example.com", "nx.example", "down.example"],
+                                                 lambda name, valid: results.__setitem__(name, valid))
+        self.assertEqual(results, {"example.com": True, "nx.example": False, "down.example": UNKNOWN})
+
+
+class SocketLookup(unittest.TestCase):
+    def setUp(self):
+        self.gethostbyname = socket.gethostbyname
+
+    def tearDown(self):
+        socket.gethostbyname = self.gethostbyname
+
+    def fail_with(self, code):
+        def gethostbyname(name):
+            raise socket.gaierror(code, "lookup failed")
+        socket.gethostbyname = gethostbyname
+
+    def test_name_not_found(self):
+        self.fail_with(socket.EAI_NONAME)
+        self.assertEqual(socketLookup("nx.example"), False)
+
+    def test_temporary_failure_raises(self):
+        self.fail_with(socket.EAI_AGAIN)
+        self.assertRaises(socket.gaierror, socketLookup, "example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
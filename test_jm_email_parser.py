@@ -0,0 +1,69 @@
+from __future__ import print_function
+
+import re
+import time
+import unittest
+
+from jm_email_parser import EMAIL_PATTERN, parseEmail, parseEmails
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+def oldParse(email):
+    # what the report did per record before the address was parsed once: two
+    # uncompiled regex calls and a split for each of the domain and the TLD
+    email = email.lower()
+    alphaCheck = not re.match('^[_a-z0-9-]+(\\.[_a-z0-9-]+)*@[a-z0-9-]+(\\.[a-z0-9-]+)*(\\.[a-z]{2,4})$', email.lower()) == None
+    alphaCheck = not re.match('^[_a-z0-9-]+(\\.[_a-z0-9-]+)*@[a-z0-9-]+(\\.[a-z0-9-]+)*(\\.[a-z]{2,4})$', email.lower()) == None
+    return (email, email.split("@")[-1].lower(), email.split(".")[-1], alphaCheck)
+
+
+class Parse(unittest.TestCase):
+    def test_parts(self):
+        self.assertEqual(parseEmail("John.Doe@Mail.Example.COM"),
+                         ("john.doe@mail.example.com", "john.doe", "mail.example.com", "com", True))
+
+    def test_syntax(self):
+        for email in ("a@b.co", "first_last-1@sub.domain.info", "x@a-b.museum.org"):
+            self.assertTrue(EMAIL_PATTERN.match(email), email)
+        for email in ("a@b", "a..b@c.com", "a b@c.com", "a@b.c", "a@b.travel", "@b.com", "a@.com"):
+            self.assertFalse(EMAIL_PATTERN.match(email), email)
+
+    def test_last_at_sign(self):
+        email, localPart, domain, tld, alphaCheck = parseEmail("a@b@c.org")
+        self.assertEqual((localPart, domain, tld), ("a@b", "c.org", "org"))
+        self.assertFalse(alphaCheck)
+
+    def test_no_at_sign(self):
+        self.assertEqual(parseEmail("nobody"), ("nobody", "", "nobody", "nobody", False))
+
+    def test_batch_shares_tuples(self):
+        parsed = parseEmails(["A@b.com", "c@d.org", "A@b.com"])
+        self.assertEqual([p[0] for p in parsed], ["a@b.com", "c@d.org", "a@b.com"])
+        self.assertTrue(parsed[0] is parsed[2])
+
+    def test_same_as_old_parse(self):
+        for email in ("John.Doe@Mail.Example.COM", "a@b@c.org", "bad address@x.com"):
+            email2, localPart, domain, tld, alphaCheck = parseEmail(email)
+            self.assertEqual((email2, domain, tld, alphaCheck), oldParse(email))
+
+    def test_speed(self):
+        # 1M addresses, 50k of them distinct, as in a large keyword hit list
+        if not BENCH:
+            return
+        distinct = ["user%d@host%d.example.com" % (i, i % 997) for i in range(50000)]
+        emails = [distinct[i % 50000] for i in range(1000000)]
+        start = time.time()
+        for email in emails:
+            oldParse(email)
+        old = time.time() - start
+        start = time.time()
+        parseEmails(emails)
+        new = time.time() - start
+        print("1M addresses: %.2f s record by record, %.2f s with parseEmails" % (old, new))
+        self.assertTrue(new < old)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+from __future__ import print_function
+
+import time
+import unittest
+
+from jm_domain_lookup import DomainResolver
+from jm_email_report import EmailReport, lookupDomains
+from jm_verdict_cache import VerdictCache
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+def resolverFor(existing, down=()):
+    def lookup(name):
+        if name in down:
+            raise IOError("resolver unreachable")
+        return name in existing
+    return DomainResolver(lookup=lookup, retries=0, timeout=0)
+
+
+class Store(unittest.TestCase):
+    def setUp(self):
+        self.report = EmailReport(set(["COM", "ORG"]))
+        self.report.addNewEmailRecords(
+            ["a@example.com", "b@example.com", "a@example.com", "a@example.com", "x@nowhere.zz", "bad!@example.org"],
+            ["one.txt", "one.txt", "one.txt", "two.txt", "one.txt", "one.txt"])
+
+    def test_domains(self):
+        self.assertEqual(self.report.getTotalRecords(), 6)
+        self.assertEqual(self.report.getListOfUniqueDomains(), ["example.com", "example.org"])
+        self.assertEqual(self.report.getHitsForDomain("example.com"), 4)
+        self.assertEqual(self.report.getHitsForDomain("unknown.com"), 0)
+        self.report.setDomains("example.org", True)
+        self.report.setDomains("example.com", True)
+        self.report.setDomains("example.org", False)
+        self.assertEqual(self.report.getListOfValidDomains(), ["example.com"])
+        self.assertEqual([rec.domainChecked for rec in self.report.getAllRecords()], [True] * 4 + [False, True])
+
+    def test_valid_emails(self):
+        # one entry per (email, source file), only for addresses passing the syntax and TLD checks
+        self.assertEqual(self.report.getListOfValidEmailAddresses(),
+                         [("a@example.com", "one.txt"), ("b@example.com", "one.txt"), ("a@example.com", "two.txt")])
+
+    def test_wayback_result_shared_by_domain(self):
+        self.report.setWaybackResult("example.com", "20060101000000;http://web.archive.org/example.com")
+        self.assertEqual(set(rec.wb for rec in self.report.getAllRecords() if rec.getDomain() == "example.com"),
+                         set(["20060101000000;http://web.archive.org/example.com"]))
+        self.assertEqual(self.report.getRecordById(4).wb, "n.a.;")
+
+    def test_unique_rows(self):
+        # the rows have no source file column, so repeated addresses collapse
+        rows = self.report.getUniqueReportRows()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0], "a@example.com;1;com;1;example.com;0;0;n.a.;")
+        self.assertEqual(self.report.getRecordById(6), None)
+        self.assertEqual(self.report.getRecordById(-1), None)
+
+    def test_shared_strings(self):
+        records = self.report.getAllRecords()
+        self.assertTrue(records[0].getDomain() is records[1].getDomain())
+        self.assertTrue(records[0].getSourceFile() is records[1].getSourceFile())
+
+    def test_speed(self):
+        # the store and its queries should scale linearly with the number of records
+        if not BENCH:
+            return
+        perRecord = []
+        for count in (10000, 100000, 1000000):
+            start = time.time()
+            report = EmailReport(set(["COM", "ORG"]))
+            emails = ["user%d@domain%d.com" % (i, i % (count // 10)) for i in range(count)]
+            sources = ["file%d.txt" % (i % 1000) for i in range(count)]
+            report.addNewEmailRecords(emails, sources)
+            domains = report.getListOfUniqueDomains()
+            for domain in domains[::2]:
+                report.setDomains(domain, True)
+            for domain in domains[1::2]:
+                report.setDomains(domain, False)
+                report.setWaybackResult(domain, "NoRecord")
+            hits = sum(report.getHitsForDomain(domain) for domain in report.getListOfValidDomains())
+            rows = report.getUniqueReportRows()
+            elapsed = time.time() - start
+            perRecord.append(elapsed / count)
+            print("%d records: %.2f s, %.2f us/record (%d valid hits, %d rows)" % (count, elapsed, elapsed / count * 1e6, hits, len(rows)))
+        self.assertTrue(perRecord[-1] < 3 * perRecord[0])
+
+
+class DictEmailRecord(object):
+    # an email record as it was before __slots__, with its own copy of every string
+
+    def __init__(self, email, sourceFile):
+        self.email = email
+        self.domain = email.split("@")[-1]
+        self.tld = email.split(".")[-1]
+        self.alphaCheck = True
+        self.sourceFile = sourceFile
+        self.tldCheck = True
+        self.domainCheck = False
+        self.wb = "n.a.;"
+        self.domainChecked = False
+
+
+class Memory(unittest.TestCase):
+    def test_records_have_no_dict(self):
+        report = EmailReport(set(["COM"]))
+        report.addNewEmailRecord("a@example.com", "one.txt")
+        self.assertFalse(hasattr(report.getAllRecords()[0], "__dict__"))
+
+    def test_bytes_per_record(self):
+        # memory held per record by the store, against plain dict-based records
+        if not BENCH:
+            return
+        try:
+            import tracemalloc
+        except ImportError:
+            return
+        count = 200000
+        emails = ["user%d@domain%d.com" % (i, i % 1000) for i in range(count)]
+        sources = ["file%d.txt" % (i % 100) for i in range(count)]
+        # "".join() gives each hit its own copy of the source name, as the case database does
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        records = [DictEmailRecord(email, "".join(source)) for email, source in zip(emails, sources)]
+        dictBytes = (tracemalloc.get_traced_memory()[0] - before) / float(count)
+        del records
+        before = tracemalloc.get_traced_memory()[0]
+        report = EmailReport(set(["COM"]))
+        report.addNewEmailRecords(emails, ["".join(source) for source in sources])
+        storeBytes = (tracemalloc.get_traced_memory()[0] - before) / float(count)
+        tracemalloc.stop()
+        print("%d records: %.0f bytes/record with dict records, %.0f bytes/record in the store (with indexes)" % (count, dictBytes, storeBytes))
+        self.assertTrue(storeBytes < dictBytes)
+
+
+class LookupDomains(unittest.TestCase):
+    def setUp(self):
+        self.report = EmailReport(set(["COM", "ORG"]))
+        for email in ("a@example.com", "b@example.com", "c@nx.org", "d@down.com"):
+            self.report.addNewEmailRecord(email, "source.txt")
+        self.cache = VerdictCache(":memory:")
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_verdicts(self):
+        invalid = lookupDomains(self.report, resolverFor(["example.com"], down=["down.com"]), self.cache)
+        self.assertEqual(invalid, ["nx.org"])
+        self.assertEqual(self.report.getListOfValidDomains(), ["example.com"])
+        rows = dict((row.split(";")[0], row.split(";")[5:7]) for row in self.report.getReportRows())
+        self.assertEqual(rows["a@example.com"], ["1", "1"])
+        self.assertEqual(rows["c@nx.org"], ["1", "0"])
+        # no answer from the resolver: reported as not checked
+        self.assertEqual(rows["d@down.com"], ["0", "0"])
+
+    def test_unknown_is_not_cached(self):
+        lookupDomains(self.report, resolverFor(["example.com"], down=["down.com"]), self.cache)
+        self.assertEqual(self.cache.getMany("dns", ["example.com", "nx.org", "down.com"]),
+                         {"example.com": (True, None), "nx.org": (False, None)})
+        # the next run only queries the domain that had no answer
+        queried = []
+        resolver = resolverFor(["down.com"])
+        lookup = resolver.lookup
+        resolver.lookup = lambda name: queried.append(name) or lookup(name)
+        invalid = lookupDomains(self.report, resolver, self.cache)
+        self.assertEqual(queried, ["down.com"])
+        self.assertEqual(invalid, ["nx.org"])
+        self.assertEqual(sorted(self.report.getListOfValidDomains()), ["down.com", "example.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jm_iin_index import IINIndex, IIN_UNKNOWN
+
+
+TABLE = u"""# low,high,brand,lengths,issuer
+4,4,Visa,13|16|19,
+51,55,Mastercard,16,
+2221,2720,Mastercard,16,
+41111111,41111111,Visa,16,Banco Econ\u00f3mico
+"45","45","Visa",16,"Caixa, S.A."
+"""
+
+
+class Load(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.tmpdir, "FEA_iin-ranges.csv")
+        with open(self.fileName, "wb") as f:
+            f.write(TABLE.encode("utf-8"))
+        self.index = IINIndex(self.fileName).load()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_non_ascii_issuer(self):
+        self.assertEqual(self.index.classify("4111111111111111"), ("Visa", "Valid", u"Banco Econ\u00f3mico"))
+
+    def test_quoted_fields(self):
+        self.assertEqual(self.index.classify("4500000000000000"), ("Visa", "Valid", "Caixa, S.A."))
+
+    def test_ranges(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.index.classify("4000000000000"), ("Visa", "Valid", ""))
+        self.assertEqual(self.index.classify("41111111111111"), ("Visa", "Not Valid", u"Banco Econ\u00f3mico"))
+        self.assertEqual(self.index.classify("5300000000000000"), ("Mastercard", "Valid", ""))
+        self.assertEqual(self.index.classify("2720990000000000"), ("Mastercard", "Valid", ""))
+        self.assertEqual(self.index.classify("2721000000000000"), IIN_UNKNOWN)
+        self.assertEqual(self.index.classify("x111111111111111"), IIN_UNKNOWN)
+
+    def test_empty_table(self):
+        with open(self.fileName, "wb") as f:
+            f.write(b"# no ranges\n")
+        self.assertRaises(ValueError, IINIndex(self.fileName).load)
+
+
+class Snapshot(unittest.TestCase):
+    def test_bundled_table(self):
+        index = IINIndex().load()
+        self.assertEqual(index.classify("4111111111111111")[:2], ("Visa", "Valid"))
+        self.assertEqual(index.classify("378282246310005")[:2], ("American Express", "Valid"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from jm_rate_limiter import TokenBucket
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        # a hair past the requested time, as a real sleep would be, so float
+        # rounding cannot leave the bucket just short of a token
+        self.now += seconds + 1e-9
+
+
+class Bucket(unittest.TestCase):
+    def bucket(self, rate, capacity=None):
+        self.clock = FakeClock()
+        return TokenBucket(rate, capacity, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_then_wait(self):
+        bucket = self.bucket(5)
+        for i in range(5):
+            self.assertEqual(bucket.tryAcquire(), 0)
+        self.assertAlmostEqual(bucket.tryAcquire(), 0.2)
+
+    def test_refill_is_capped(self):
+        bucket = self.bucket(2, capacity=3)
+        for i in range(3):
+            bucket.tryAcquire()
+        self.clock.now += 60
+        for i in range(3):
+            self.assertEqual(bucket.tryAcquire(), 0)
+        self.assertTrue(bucket.tryAcquire() > 0)
+
+    def test_slow_rate_allows_one(self):
+        bucket = self.bucket(0.5)
+        self.assertEqual(bucket.tryAcquire(), 0)
+        self.assertAlmostEqual(bucket.tryAcquire(), 2.0)
+
+    def test_acquire_sleeps_only_when_needed(self):
+        bucket = self.bucket(4)
+        for i in range(4):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+        for i in range(8):
+            bucket.acquire()
+        self.assertEqual(len(self.clock.sleeps), 8)
+        self.assertAlmostEqual(bucket.waitTime, 2.0)
+        # 12 requests at 4 per second with a burst of 4 take two seconds
+        self.assertAlmostEqual(self.clock.now - 1000.0, 2.0, places=6)
+
+    def test_clock_going_backwards(self):
+        bucket = self.bucket(1)
+        bucket.tryAcquire()
+        self.clock.now -= 10
+        self.assertTrue(bucket.tryAcquire() > 0)
+        self.assertEqual(bucket.updated, 1000.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
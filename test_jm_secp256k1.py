@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from ecdsa import SigningKey, SECP256k1
+
+from jm_secp256k1 import N, publicKey
+
+
+def ecdsaPublicKey(secret):
+    point = SigningKey.from_secret_exponent(secret, curve=SECP256k1).get_verifying_key().pubkey.point
+    return point.x(), point.y()
+
+
+class PublicKey(unittest.TestCase):
+    def test_generator(self):
+        self.assertEqual(publicKey(1), (SECP256k1.generator.x(), SECP256k1.generator.y()))
+
+    def test_edges(self):
+        # N-1 is -G; the others exercise rows with a single non-zero digit
+        for secret in (2, 3, 255, 256, 257, 2 ** 128, 2 ** 255, N - 2, N - 1):
+            self.assertEqual(publicKey(secret), ecdsaPublicKey(secret), secret)
+        x, y = publicKey(N - 1)
+        self.assertEqual((x, SECP256k1.curve.p() - y), publicKey(1))
+
+    def test_random_secrets(self):
+        generator = random.Random(256)
+        for i in range(100):
+            secret = generator.randrange(1, N)
+            self.assertEqual(publicKey(secret), ecdsaPublicKey(secret), secret)
+
+    def test_out_of_range(self):
+        for secret in (0, N, N + 1, 2 ** 256, -1):
+            self.assertRaises(ValueError, publicKey, secret)
+
+
+if __name__ == "__main__":
+    unittest.main()
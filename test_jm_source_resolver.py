@@ -0,0 +1,84 @@
+import re
+import unittest
+
+from jm_source_resolver import SourceFileResolver, iterChunks
+
+
+class StubFile(object):
+
+    def __init__(self, objId, name):
+        self.objId = objId
+        self.name = name
+
+    def getId(self):
+        return self.objId
+
+    def getName(self):
+        return self.name
+
+
+class StubCase(object):
+    # SleuthkitCase stand-in: answers findAllFilesWhere for "obj_id IN (...)"
+    # and "obj_id = n" clauses from a dict of object id -> file names
+
+    def __init__(self, files):
+        self.files = files
+        self.queries = []
+
+    def findAllFilesWhere(self, whereClause):
+        self.queries.append(whereClause)
+        ids = [int(objId) for objId in re.findall(r"\d+", whereClause)]
+        return [StubFile(objId, name) for objId in ids for name in self.files.get(objId, ())]
+
+
+class Resolver(unittest.TestCase):
+    def setUp(self):
+        self.case = StubCase(dict((objId, ["file%d.txt" % objId]) for objId in range(1, 11)))
+
+    def test_prefetch_in_chunks(self):
+        resolver = SourceFileResolver(self.case, chunkSize=4)
+        resolver.prefetch([1, 2, 3, 2, 1, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(self.case.queries, ["obj_id IN (1,2,3,4)", "obj_id IN (5,6,7,8)", "obj_id IN (9)"])
+        self.assertEqual([resolver.getSourceFile(objId) for objId in (9, 1, 5)], ["file9.txt", "file1.txt", "file5.txt"])
+        self.assertEqual(len(self.case.queries), 3)
+        self.assertEqual((resolver.hits, resolver.misses), (3, 0))
+
+    def test_prefetch_skips_cached(self):
+        resolver = SourceFileResolver(self.case)
+        resolver.prefetch([1, 2])
+        resolver.prefetch([2, 3, 1])
+        self.assertEqual(self.case.queries, ["obj_id IN (1,2)", "obj_id IN (3)"])
+
+    def test_miss_is_resolved_alone(self):
+        resolver = SourceFileResolver(self.case)
+        self.assertEqual(resolver.getSourceFile(7), "file7.txt")
+        self.assertEqual(resolver.getSourceFile(7), "file7.txt")
+        self.assertEqual(len(self.case.queries), 1)
+        self.assertEqual((resolver.hits, resolver.misses), (1, 1))
+
+    def test_unknown_and_shared_ids(self):
+        self.case.files[10].append("file10-copy.txt")
+        resolver = SourceFileResolver(self.case)
+        resolver.prefetch([10, 42])
+        self.assertEqual(resolver.getSourceFile(10), "file10.txt & file10-copy.txt")
+        self.assertEqual(resolver.getSourceFile(42), "")
+        self.assertEqual(len(self.case.queries), 1)
+
+    def test_least_recently_used_evicted(self):
+        resolver = SourceFileResolver(self.case, cacheSize=2)
+        resolver.prefetch([1, 2])
+        resolver.getSourceFile(1)
+        resolver.prefetch([3])
+        self.assertEqual(list(resolver.cache), [1, 3])
+        resolver.getSourceFile(2)
+        self.assertEqual(self.case.queries[-1], "obj_id IN (2)")
+
+
+class Chunks(unittest.TestCase):
+    def test_chunks(self):
+        self.assertEqual(list(iterChunks(iter(range(7)), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(iterChunks([], 3)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from jm_tld_registry import TLDRegistry
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+IANA_TEXT = "# Version 2026101800, Last Updated Sun Oct 18 07:07:01 2026 UTC\nCOM\nORG\nXN--P1AI\n"
+
+
+class Registry(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cacheFile = os.path.join(self.dir, "tlds.txt")
+        self.ianaFile = os.path.join(self.dir, "iana.txt")
+        with open(self.ianaFile, "w") as f:
+            f.write(IANA_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def registry(self, url=None):
+        # a file that does not exist stands in for an unreachable iana.org
+        return TLDRegistry(self.cacheFile, url=url or "file://" + os.path.join(self.dir, "offline.txt"))
+
+    def writeCache(self, text, age=0):
+        with open(self.cacheFile, "w") as f:
+            f.write(text)
+        mtime = time.time() - age
+        os.utime(self.cacheFile, (mtime, mtime))
+
+    def test_parse(self):
+        version, tlds = TLDRegistry.parse("# Version 1\n# comment\n\ncom\n Net \n")
+        self.assertEqual(version, "Version 1")
+        self.assertEqual(tlds, frozenset(["COM", "NET"]))
+
+    def test_fresh_cache(self):
+        self.writeCache("# Version 1\nCOM\n")
+        registry = self.registry("file://" + self.ianaFile).load()
+        self.assertEqual(registry.source, "cache")
+        self.assertEqual(len(registry), 1)
+
+    def test_refresh(self):
+        self.writeCache("# Version 1\nCOM\n", age=2 * TLDRegistry.MAX_AGE)
+        registry = self.registry("file://" + self.ianaFile).load()
+        self.assertEqual(registry.source, "iana.org")
+        self.assertTrue(registry.version.startswith("Version 2026101800"))
+        self.assertTrue(registry.isValid("xn--p1ai"))
+        with open(self.cacheFile) as f:
+            self.assertEqual(f.read(), IANA_TEXT)
+
+    def test_stale_cache_when_offline(self):
+        self.writeCache("# Version 1\nCOM\n", age=2 * TLDRegistry.MAX_AGE)
+        registry = self.registry().load()
+        self.assertEqual(registry.source, "cache (stale)")
+        self.assertTrue(registry.isValid("com"))
+
+    def test_fallback_when_offline(self):
+        registry = self.registry().load()
+        self.assertEqual(registry.source, "bundled fallback list")
+        self.assertTrue(registry.isValid("com"))
+        self.assertFalse(registry.isValid("notatld"))
+
+    def test_empty_cache_is_ignored(self):
+        self.writeCache("# Version 1\n")
+        self.assertEqual(self.registry().load().source, "bundled fallback list")
+
+
+class Lookup(unittest.TestCase):
+    def test_speed(self):
+        # startup cost of loading the bundled list and cost per lookup of the
+        # frozenset against the list the TLDs used to be kept in
+        if not BENCH:
+            return
+        runs = 100
+        start = time.time()
+        for i in range(runs):
+            registry = TLDRegistry(url="file:///nonexistent").loadFile(TLDRegistry.SNAPSHOT_FILE, "bundled")
+        print("load %d TLDs: %.2f ms" % (len(registry), (time.time() - start) * 1000 / runs))
+        asList = sorted(registry.tlds)
+        names = ["COM", "ZW", "NOTATLD", "XN--P1AI"] * 25000
+        timings = {}
+        for label, tlds in (("list", asList), ("frozenset", registry.tlds)):
+            start = time.time()
+            for name in names:
+                name in tlds
+            timings[label] = (time.time() - start) * 1e6 / len(names)
+            print("%-9s: %.3f us per lookup" % (label, timings[label]))
+        self.assertTrue(timings["frozenset"] * 10 < timings["list"])
+
+
+if __name__ == "__main__":
+    unittest.main()
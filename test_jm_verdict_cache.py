@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jm_verdict_cache import VerdictCache
+
+DAY = 24 * 3600
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Cache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VerdictCache(":memory:", positiveTTL=30 * DAY, negativeTTL=DAY, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_get_and_put(self):
+        self.cache.put("dns", "example.com", True)
+        self.cache.putMany("wayback", [("example.com", True, "20060101000000;http://web.archive.org/example.com"),
+                                       ("nx.org", False, "NoRecord")])
+        self.assertEqual(self.cache.get("dns", "example.com"), (True, None))
+        self.assertEqual(self.cache.get("dns", "nx.org"), None)
+        self.assertEqual(self.cache.getMany("wayback", ["example.com", "nx.org", "other.net"]),
+                         {"example.com": (True, "20060101000000;http://web.archive.org/example.com"),
+                          "nx.org": (False, "NoRecord")})
+
+    def test_latest_verdict_wins(self):
+        self.cache.put("dns", "example.com", False)
+        self.cache.put("dns", "example.com", True)
+        self.assertEqual(self.cache.get("dns", "example.com"), (True, None))
+
+    def test_positive_and_negative_ttl(self):
+        self.cache.putMany("dns", [("example.com", True, None), ("nx.org", False, None)])
+        self.clock.now += DAY - 1
+        self.assertEqual(sorted(self.cache.getMany("dns", ["example.com", "nx.org"])), ["example.com", "nx.org"])
+        self.clock.now += 1
+        self.assertEqual(list(self.cache.getMany("dns", ["example.com", "nx.org"])), ["example.com"])
+        self.clock.now += 29 * DAY
+        self.assertEqual(self.cache.getMany("dns", ["example.com", "nx.org"]), {})
+        self.assertEqual(self.cache.expired, 3)
+
+    def test_ttl_override(self):
+        self.cache.put("blockchain", "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", True, "0|0|n.a.", ttl=3600)
+        self.clock.now += 3599
+        self.assertNotEqual(self.cache.get("blockchain", "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2"), None)
+        self.clock.now += 1
+        self.assertEqual(self.cache.get("blockchain", "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2"), None)
+
+    def test_many_names(self):
+        names = ["host%d.example.com" % i for i in range(3 * VerdictCache.CHUNK_SIZE + 1)]
+        self.cache.putMany("dns", [(name, True, None) for name in names])
+        self.assertEqual(len(self.cache.getMany("dns", names + ["unknown.com"])), len(names))
+
+    def test_evict(self):
+        cache = VerdictCache(":memory:", negativeTTL=DAY, maxEntries=2, clock=self.clock)
+        for name in ("a.com", "b.com", "c.com", "d.com"):
+            cache.put("dns", name, True)
+            self.clock.now += 1
+        cache.put("dns", "expired.com", False)
+        self.clock.now += DAY
+        cache.evict()
+        self.assertEqual(sorted(cache.getMany("dns", ["a.com", "b.com", "c.com", "d.com", "expired.com"])), ["c.com", "d.com"])
+        self.assertEqual(cache.evicted, 2)
+        cache.close()
+
+    def test_stats(self):
+        self.cache.putMany("dns", [("example.com", True, None), ("nx.org", False, None)])
+        self.cache.getMany("dns", ["example.com", "nx.org", "other.net"])
+        self.clock.now += DAY
+        self.cache.get("dns", "nx.org")
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.expired, self.cache.stored), (2, 2, 1, 2))
+        self.assertEqual(self.cache.getStats(), "2 hits, 2 misses (1 expired), 2 stored, 0 evicted")
+
+
+class Persistence(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "FEA_verdicts.db")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_verdicts_survive_a_new_instance(self):
+        cache = VerdictCache(self.path, clock=self.clock)
+        cache.putMany("dns", [("example.com", True, None), ("nx.org", False, None)])
+        cache.close()
+        self.clock.now += 3600
+        cache = VerdictCache(self.path, clock=self.clock)
+        self.assertEqual(cache.getMany("dns", ["example.com", "nx.org"]), {"example.com": (True, None), "nx.org": (False, None)})
+        cache.close()
+
+    def test_expired_verdicts_are_dropped_on_close(self):
+        cache = VerdictCache(self.path, clock=self.clock)
+        cache.putMany("dns", [("example.com", True, None), ("nx.org", False, None)])
+        cache.close()
+        self.clock.now += VerdictCache.NEGATIVE_TTL
+        VerdictCache(self.path, clock=self.clock).close()
+        self.clock.now -= VerdictCache.NEGATIVE_TTL
+        cache = VerdictCache(self.path, clock=self.clock)
+        self.assertEqual(list(cache.getMany("dns", ["example.com", "nx.org"])), ["example.com"])
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
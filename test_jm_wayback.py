@@ -0,0 +1,167 @@
+from __future__ import print_function
+
+import json
+import threading
+import time
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+
+from jm_wayback import WaybackClient, formatWaybackResult
+
+# set to True to run the (slow) benchmarks
+BENCH = False
+
+
+SNAPSHOT = {"archived_snapshots": {"closest": {"available": True, "status": "200",
+            "timestamp": "20060101000000", "url": "http://web.archive.org/web/20060101000000/archived.example"}}}
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    # /wayback/available answers like archive.org; any other path is redirected
+    # to it, to the server's redirectTo location if set, relative otherwise
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        if self.server.redirectTo is not None or url.path != "/wayback/available":
+            self.send_response(301)
+            self.send_header("Location", (self.server.redirectTo or "") + "/wayback/available?" + url.query)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        domain = parse_qs(url.query)["url"][0]
+        if domain == "broken.example":
+            self.send_response(404)
+            body = b"not found"
+        else:
+            self.send_response(200)
+            body = json.dumps(SNAPSHOT if domain == "archived.example" else {"archived_snapshots": {}}).encode("utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ArchiveServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubArchive(object):
+    # latency is the time in seconds the archive takes to answer each request
+
+    def __init__(self, redirectTo=None, latency=0):
+        self.server = ArchiveServer(("127.0.0.1", 0), ArchiveHandler)
+        self.server.paths = []
+        self.server.redirectTo = redirectTo
+        self.server.latency = latency
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Client(unittest.TestCase):
+    def setUp(self):
+        self.archive = StubArchive()
+
+    def tearDown(self):
+        self.archive.close()
+
+    def client(self, port, **kwargs):
+        return WaybackClient(host="127.0.0.1", port=port, https=False, rateLimit=None, backoff=0, **kwargs)
+
+    def test_https_by_default(self):
+        self.assertTrue(WaybackClient().https)
+
+    def test_lookup(self):
+        client = self.client(self.archive.port, maxConnections=2)
+        results = client.lookupAll(["archived.example", "missing.example", "archived.example"])
+        self.assertEqual(results, {"archived.example": formatWaybackResult(SNAPSHOT),
+                                   "missing.example": "NoRecord"})
+        self.assertEqual(client.requests, 2)
+
+    def test_follows_redirect_to_other_server(self):
+        # like archive.org sending plain HTTP requests to HTTPS
+        old = StubArchive(redirectTo="http://127.0.0.1:%d" % self.archive.port)
+        try:
+            client = self.client(old.port, maxConnections=1)
+            results = client.lookupAll(["archived.example", "missing.example"])
+        finally:
+            old.close()
+        self.assertEqual(results["archived.example"], formatWaybackResult(SNAPSHOT))
+        self.assertEqual(results["missing.example"], "NoRecord")
+        # the worker stays on the new location after the first redirect
+        self.assertEqual(len(old.server.paths), 1)
+        self.assertEqual(len(self.archive.server.paths), 2)
+        self.assertEqual(client.failures, 0)
+
+    def test_follows_relative_redirect(self):
+        client = self.client(self.archive.port)
+        client.PATH = "/old/available"
+        results = client.lookupAll(["archived.example"])
+        self.assertEqual(results["archived.example"], formatWaybackResult(SNAPSHOT))
+        self.assertEqual(self.archive.server.paths, ["/old/available?url=archived.example",
+                                                     "/wayback/available?url=archived.example"])
+
+    def test_redirect_loop_fails(self):
+        loop = StubArchive()
+        loop.server.redirectTo = "http://127.0.0.1:%d" % loop.port
+        try:
+            client = self.client(loop.port)
+            results = client.lookupAll(["archived.example"])
+        finally:
+            loop.close()
+        self.assertEqual(results, {})
+        self.assertEqual(len(loop.server.paths), WaybackClient.MAX_REDIRECTS + 1)
+        self.assertEqual(client.failures, 1)
+
+    def test_client_error_is_not_retried(self):
+        client = self.client(self.archive.port)
+        self.assertEqual(client.lookupAll(["broken.example"]), {})
+        self.assertEqual(client.retried, 0)
+        self.assertEqual(client.failures, 1)
+
+
+class Concurrency(unittest.TestCase):
+    def test_speed(self):
+        # lookups per second against an archive answering in 50 ms, with one
+        # connection (the old sequential lookups) and with several keep-alive ones
+        if not BENCH:
+            return
+        archive = StubArchive(latency=0.05)
+        try:
+            domains = ["domain%d.example" % i for i in range(400)]
+            rates = {}
+            for connections in (1, 4, 16):
+                client = WaybackClient(host="127.0.0.1", port=archive.port, https=False, rateLimit=None,
+                                       maxConnections=connections)
+                start = time.time()
+                results = client.lookupAll(domains)
+                elapsed = time.time() - start
+                self.assertEqual(len(results), len(domains))
+                rates[connections] = len(domains) / elapsed
+                print("%2d connections: %.2f s, %.1f lookups/s" % (connections, elapsed, rates[connections]))
+        finally:
+            archive.close()
+        self.assertTrue(rates[4] > 3 * rates[1])
+
+
+if __name__ == "__main__":
+    unittest.main()